@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from auth import get_current_user
-from utils.json_store import read_json, write_json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from auth import get_current_user, invalidate_principal
+from utils.json_store import read_json_view
+from utils.collection import USERS
 from audit import log_event
-import os
+from audit.logger import audit_stats, query_events
+from chat.state_manager import flow_stats
+from llm import aclient, client
+from llm.cache import cache_stats as llm_cache_stats
+from llm.scheduler import scheduler_stats
+from lock import LOCKS
+from utils.json_store import cache_stats as store_cache_stats
 
 router = APIRouter(prefix="/admin")
 
@@ -14,9 +22,9 @@ def admin_overview(user=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin only")
 
     return {
-        "meetings": read_json("meetings.json"),
-        "tickets": read_json("tickets.json"),
-        "equipment": read_json("equipment.json")
+        "meetings": read_json_view("meetings.json"),
+        "tickets": read_json_view("tickets.json"),
+        "equipment": read_json_view("equipment.json")
     }
 
 # ---------------- SUPERUSER ----------------
@@ -27,10 +35,10 @@ def all_data(user=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Superuser only")
 
     return {
-        "users": read_json("users.json"),
-        "meetings": read_json("meetings.json"),
-        "tickets": read_json("tickets.json"),
-        "equipment": read_json("equipment.json")
+        "users": read_json_view("users.json"),
+        "meetings": read_json_view("meetings.json"),
+        "tickets": read_json_view("tickets.json"),
+        "equipment": read_json_view("equipment.json")
     }
 
 @router.post("/user/suspend/{user_id}")
@@ -38,14 +46,9 @@ def suspend_user(user_id: str, user=Depends(get_current_user)):
     if user["role"] != "superuser":
         raise HTTPException(status_code=403, detail="Superuser only")
 
-    users = read_json("users.json")
-    target = next((u for u in users if u["id"] == user_id), None)
-
-    if not target:
+    if not USERS.update(user_id, {"active": False}):
         raise HTTPException(status_code=404, detail="User not found")
-
-    target["active"] = False
-    write_json("users.json", users)
+    invalidate_principal(user_id)
 
     log_event(user["id"], "USER_SUSPENDED", user_id)
     return {"status": "suspended"}
@@ -55,26 +58,67 @@ def unsuspend_user(user_id: str, user=Depends(get_current_user)):
     if user["role"] != "superuser":
         raise HTTPException(status_code=403, detail="Superuser only")
 
-    users = read_json("users.json")
-    target = next((u for u in users if u["id"] == user_id), None)
-
-    if not target:
+    if not USERS.update(user_id, {"active": True}):
         raise HTTPException(status_code=404, detail="User not found")
-
-    target["active"] = True
-    write_json("users.json", users)
+    invalidate_principal(user_id)
 
     log_event(user["id"], "USER_UNSUSPENDED", user_id)
     return {"status": "unsuspended"}
 
 @router.get("/audit-log")
-def get_audit_log(user=Depends(get_current_user)):
+def get_audit_log(
+    actor_id: Optional[str] = None,
+    action: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    user=Depends(get_current_user),
+):
+    """
+    Audit events, newest first. Pass next_cursor back as cursor
+    for the following page; None means there are no more events.
+    """
     if user["role"] != "superuser":
         raise HTTPException(status_code=403, detail="Superuser only")
 
-    path = "backend/storage/audit.log"
-    if not os.path.exists(path):
-        return Response("", media_type="text/plain")
+    try:
+        return query_events(
+            limit=limit,
+            actor_id=actor_id,
+            action=action,
+            entity_id=entity_id,
+            entity_type=entity_type,
+            since=since,
+            until=until,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics")
+def metrics(user=Depends(get_current_user)):
+    """
+    In-process gauges and counters: storage cache and lock waits,
+    flow store, LLM cache, scheduler, endpoints and audit writer.
+    """
+    if user["role"] != "superuser":
+        raise HTTPException(status_code=403, detail="Superuser only")
 
-    with open(path, "r", encoding="utf-8") as f:
-        return Response(f.read(), media_type="text/plain")
+    return {
+        "storage": {
+            "cache": store_cache_stats(),
+            "lock_waits": LOCKS.stats(),
+        },
+        "flows": flow_stats(),
+        "llm": {
+            "cache": llm_cache_stats(),
+            "scheduler": scheduler_stats(),
+            "endpoints": client.endpoint_stats(),
+            "flights": client.flight_stats(),
+            "async_flights": aclient.flight_stats(),
+        },
+        "audit": audit_stats(),
+    }
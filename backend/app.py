@@ -1,11 +1,24 @@
 # backend/app.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 
+from audit.logger import shutdown as shutdown_audit
+from llm.intent import aload as load_intent_classifier
+
 from auth.routes import router as auth_router
 from chat.routes import router as chat_router
 
-app = FastAPI(title="IntelliDesk API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Read the intent model before the first chat request needs it
+    await load_intent_classifier()
+    yield
+    # Write out buffered audit events before the process exits
+    shutdown_audit()
+
+app = FastAPI(title="IntelliDesk API", lifespan=lifespan)
 
 @app.get("/health")
 def health():
@@ -1,15 +1,179 @@
 # backend/audit/logger.py
+#
+# Append-only audit log.
+#
+# log_event() only serializes the record and puts the line on a bounded
+# queue; a background writer thread drains it in batches and appends
+# each batch with a single write. A batch is flushed when it reaches
+# AUDIT_BATCH_SIZE lines or AUDIT_FLUSH_INTERVAL seconds after its
+# first line, whichever comes first.
+#
+#   AUDIT_FSYNC     off   → leave durability to the OS (default)
+#                   batch → fsync after every batch
+#   AUDIT_OVERFLOW  sync  → queue full: write the line inline (default,
+#                           nothing is lost, request pays the I/O)
+#                   block → queue full: wait for space
+#                   drop  → queue full: discard and count the event
+#
+# flush() waits until everything logged so far is on disk; shutdown()
+# is called from the FastAPI lifespan (and atexit) so buffered events
+# survive a clean stop.
+#
+# Segment rotation and the query index live in audit.segments.
 
 from datetime import datetime
+import atexit
 import json
 import os
-from threading import Lock
+import queue
+import time
+from threading import Event, Lock, Thread
 from typing import Optional, Dict, Any
 
+from audit.segments import open_log
+
 AUDIT_DIR = "backend/storage"
 AUDIT_FILE = os.path.join(AUDIT_DIR, "audit.log")
 
-_lock = Lock()
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "256"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2"))
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "off")
+AUDIT_OVERFLOW = os.getenv("AUDIT_OVERFLOW", "sync")
+
+
+def _write_lines(items) -> None:
+    """
+    Append (line, keys) pairs to the active segment.
+    """
+    open_log(AUDIT_FILE).append(items, fsync=AUDIT_FSYNC == "batch")
+
+
+class _Marker:
+    """
+    Queue item asking the writer to flush (and optionally stop).
+    """
+
+    __slots__ = ("done", "stop")
+
+    def __init__(self, stop: bool = False):
+        self.done = Event()
+        self.stop = stop
+
+
+class _AuditWriter:
+    """
+    Background thread draining queued audit lines in batches.
+    Started on first use; restarted after shutdown() if needed.
+    """
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.inline = 0
+
+    def _ensure_started(self) -> queue.Queue:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._queue is None:
+                    self._queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+                self._thread = Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def submit(self, item) -> None:
+        q = self._ensure_started()
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        if AUDIT_OVERFLOW == "block":
+            q.put(item)
+        elif AUDIT_OVERFLOW == "drop":
+            self.dropped += 1
+        else:
+            self.inline += 1
+            _write_lines([item])
+
+    def _drain(self, q: queue.Queue) -> Optional[_Marker]:
+        """
+        Write one batch. Returns the marker that ended it, if any.
+        """
+        batch = []
+        marker = None
+
+        item = q.get()
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+
+        while True:
+            if isinstance(item, _Marker):
+                marker = item
+                break
+
+            batch.append(item)
+            if len(batch) >= AUDIT_BATCH_SIZE:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+        if batch:
+            try:
+                _write_lines(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except OSError:
+                # Disk trouble must not kill the writer; count as lost
+                self.dropped += len(batch)
+
+        return marker
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            marker = self._drain(q)
+            if marker is not None:
+                marker.done.set()
+                if marker.stop:
+                    return
+
+    def flush(self, timeout: float = 5.0, stop: bool = False) -> bool:
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            q = self._queue
+        if not running:
+            return True
+
+        marker = _Marker(stop=stop)
+        q.put(marker)
+        ok = marker.done.wait(timeout)
+
+        if stop and ok:
+            self._thread.join(timeout)
+        return ok
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "inline": self.inline,
+        }
+
+
+_WRITER = _AuditWriter()
 
 
 def log_event(
@@ -23,8 +187,6 @@ def log_event(
     before: Optional[Dict[str, Any]] = None,
     after: Optional[Dict[str, Any]] = None,
 ):
-    os.makedirs(AUDIT_DIR, exist_ok=True)
-
     record = {
         "ts": datetime.utcnow().isoformat(timespec="seconds") + "Z",
         "request_id": request_id,
@@ -41,8 +203,49 @@ def log_event(
         "after": after,
     }
 
+    # Serialized here so later changes to before/after are not captured
     line = json.dumps(record, separators=(",", ":"), sort_keys=True)
 
-    with _lock:
-        with open(AUDIT_FILE, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
+    keys = (record["ts"], actor_id, action, entity_id)
+    _WRITER.submit((line + "\n", keys))
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """
+    Block until every event logged so far is written.
+    """
+    return _WRITER.flush(timeout)
+
+
+def shutdown(timeout: float = 5.0) -> bool:
+    """
+    Flush and stop the writer thread (FastAPI lifespan / atexit).
+    """
+    return _WRITER.flush(timeout, stop=True)
+
+
+def query_events(*, limit: int = 100, **filters) -> Dict[str, Any]:
+    """
+    One page of events, newest first.
+    Filters: actor_id, action, entity_id, entity_type, since, until, cursor.
+    Returns {"events": [...], "next_cursor": str | None}.
+    """
+    events = []
+    next_cursor = None
+
+    for cursor, event in open_log(AUDIT_FILE).query(**filters):
+        if len(events) == limit:
+            break
+        events.append(event)
+        next_cursor = cursor
+    else:
+        next_cursor = None
+
+    return {"events": events, "next_cursor": next_cursor}
+
+
+def audit_stats() -> dict:
+    return _WRITER.stats()
+
+
+atexit.register(shutdown)
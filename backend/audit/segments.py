@@ -0,0 +1,475 @@
+# backend/audit/segments.py
+#
+# Segmented audit log with per-segment sidecar indexes.
+#
+#   audit.log                active segment (appended by audit.logger)
+#   audit-000001.log[.gz]    closed segments, oldest first
+#   audit-000001.idx         sidecar index of a closed segment
+#
+# The active segment is closed when it passes AUDIT_SEGMENT_BYTES
+# (AUDIT_ROTATE=size) or when the UTC day changes (AUDIT_ROTATE=day).
+# Closed segments are gzipped when AUDIT_GZIP=1.
+#
+# A sidecar maps actor id, action and entity id to the events holding
+# them, and keeps each event's timestamp and byte offset (in the
+# uncompressed segment). Queries only read segments whose time range
+# and posting lists can match, and only the matching lines of those.
+# The active segment's index lives in memory. Several worker processes
+# may share the log: appends and rotations hold an exclusive lock on
+# audit.lock (queries a shared one), the active segment's number is
+# taken from the closed segments on disk, and each process indexes the
+# lines other processes appended before it appends or queries. Without
+# fcntl (Windows) only one process may write the log.
+#
+# Queries return newest events first. A cursor "<segment>:<offset>"
+# points at the last event returned; the active segment already owns
+# the number it will be closed under, so cursors survive rotation.
+
+import gzip
+import json
+import os
+import re
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:                 # Windows
+    fcntl = None
+
+AUDIT_ROTATE = os.getenv("AUDIT_ROTATE", "size")          # size | day
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+AUDIT_GZIP = os.getenv("AUDIT_GZIP", "0") == "1"
+
+_FIELDS = ("actor", "action", "entity")
+
+# Events read per lock acquisition
+_READ_CHUNK = 256
+
+
+def _keys(record: dict) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """
+    (ts, actor id, action, entity id) of one audit record.
+    """
+    actor = record.get("actor")
+    entity = record.get("entity")
+    return (
+        record.get("ts") or "",
+        actor.get("id") if isinstance(actor, dict) else actor,
+        record.get("action"),
+        entity.get("id") if isinstance(entity, dict) else entity,
+    )
+
+
+class _Index:
+    """
+    Event positions of one segment plus posting lists per field.
+    Postings hold event numbers in ascending (append) order.
+    """
+
+    def __init__(self):
+        self.offsets: List[int] = []
+        self.ts: List[str] = []
+        self.postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in _FIELDS}
+        self.last_ts = ""
+
+    def add(self, offset: int, keys) -> None:
+        i = len(self.offsets)
+        ts, actor, action, entity = keys
+        self.offsets.append(offset)
+        self.ts.append(ts)
+        if ts > self.last_ts:
+            self.last_ts = ts
+        for field, value in zip(_FIELDS, (actor, action, entity)):
+            if value is not None:
+                self.postings[field].setdefault(str(value), []).append(i)
+
+    @property
+    def first_ts(self) -> str:
+        return self.ts[0] if self.ts else ""
+
+    def candidates(self, filters: Dict[str, str]) -> List[int]:
+        """
+        Event numbers matching all field filters, ascending.
+        """
+        lists = []
+        for field, value in filters.items():
+            posting = self.postings[field].get(str(value))
+            if not posting:
+                return []
+            lists.append(posting)
+
+        if not lists:
+            return list(range(len(self.offsets)))
+
+        lists.sort(key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            keep = set(other)
+            result = [i for i in result if i in keep]
+        return result
+
+    def to_json(self) -> dict:
+        return {"offsets": self.offsets, "ts": self.ts, "postings": self.postings}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_Index":
+        index = cls()
+        index.offsets = data["offsets"]
+        index.ts = data["ts"]
+        index.postings = data["postings"]
+        index.last_ts = max(index.ts, default="")
+        return index
+
+    def extend(self, content: bytes, offset: int = 0) -> None:
+        """
+        Index the lines of content, which starts at offset.
+        """
+        for line in content.splitlines(keepends=True):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                self.add(offset, _keys(record))
+            offset += len(line)
+
+    @classmethod
+    def scan(cls, content: bytes) -> "_Index":
+        index = cls()
+        index.extend(content)
+        return index
+
+
+class SegmentedLog:
+    """
+    One audit log (active file + closed segments).
+    Appends come from each process's audit writer thread; queries
+    may run concurrently from request threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.directory = os.path.dirname(path) or "."
+        self.stem = os.path.splitext(os.path.basename(path))[0]
+        self._pattern = re.compile(
+            re.escape(self.stem) + r"-(\d{6})\.(log|log\.gz|idx)$"
+        )
+        self._lock = Lock()
+        self._lock_path = os.path.join(self.directory, f"{self.stem}.lock")
+        self._active: Optional[_Index] = None
+        self._active_seq = 0
+        # Bytes of the active segment covered by self._active
+        self._active_size = 0
+        self._closed: Dict[int, _Index] = {}
+
+    # ---------------- PATHS ----------------
+
+    def _segment_path(self, seq: int, gz: bool) -> str:
+        suffix = ".log.gz" if gz else ".log"
+        return os.path.join(self.directory, f"{self.stem}-{seq:06d}{suffix}")
+
+    def _index_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{self.stem}-{seq:06d}.idx")
+
+    def _closed_seqs(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        seqs = set()
+        for name in names:
+            m = self._pattern.match(name)
+            if m and m.group(2) != "idx":
+                seqs.add(int(m.group(1)))
+        return sorted(seqs)
+
+    # ---------------- LOADING ----------------
+
+    def _read_segment(self, seq: int) -> bytes:
+        gz = self._segment_path(seq, True)
+        if os.path.exists(gz):
+            with gzip.open(gz, "rb") as f:
+                return f.read()
+        with open(self._segment_path(seq, False), "rb") as f:
+            return f.read()
+
+    def _closed_index(self, seq: int) -> _Index:
+        index = self._closed.get(seq)
+        if index is not None:
+            return index
+
+        try:
+            with open(self._index_path(seq), "r", encoding="utf-8") as f:
+                index = _Index.from_json(json.load(f))
+        except (FileNotFoundError, ValueError, KeyError):
+            # Sidecar lost (crash during rotation): rebuild it once
+            index = _Index.scan(self._read_segment(seq))
+            self._write_index(seq, index)
+
+        self._closed[seq] = index
+        return index
+
+    def _write_index(self, seq: int, index: _Index) -> None:
+        tmp = self._index_path(seq) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index.to_json(), f, separators=(",", ":"))
+        os.replace(tmp, self._index_path(seq))
+
+    @contextmanager
+    def _disk_lock(self, exclusive: bool):
+        """
+        Lock between processes. Caller holds self._lock.
+        """
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._lock_path, "ab") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _refresh_active(self) -> _Index:
+        """
+        Catch the active index up with the files, which other processes
+        may have appended to or rotated. Caller holds self._lock and
+        the disk lock.
+        """
+        seqs = self._closed_seqs()
+        seq = (seqs[-1] if seqs else 0) + 1
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+
+        if self._active is None or seq != self._active_seq or size < self._active_size:
+            # First use, or the segment was closed elsewhere
+            self._active, self._active_seq, self._active_size = _Index(), seq, 0
+
+        if size > self._active_size:
+            with open(self.path, "rb") as f:
+                f.seek(self._active_size)
+                tail = f.read(size - self._active_size)
+            self._active.extend(tail, self._active_size)
+            self._active_size += len(tail)
+        return self._active
+
+    # ---------------- ROTATION ----------------
+
+    def _should_rotate(self, index: _Index, first_ts: str) -> bool:
+        if not index.offsets:
+            return False
+        if AUDIT_ROTATE == "day":
+            return index.ts[-1][:10] != first_ts[:10]
+        try:
+            return os.path.getsize(self.path) >= AUDIT_SEGMENT_BYTES
+        except FileNotFoundError:
+            return False
+
+    def _rotate(self) -> None:
+        """
+        Close the active segment. Caller holds self._lock and the
+        exclusive disk lock.
+        """
+        seq, index = self._active_seq, self._active
+
+        # Sidecar first: a segment without one is rebuilt on demand
+        self._write_index(seq, index)
+        closed = self._segment_path(seq, False)
+        os.replace(self.path, closed)
+
+        if AUDIT_GZIP:
+            tmp = self._segment_path(seq, True) + ".tmp"
+            with open(closed, "rb") as src, gzip.open(tmp, "wb") as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            os.replace(tmp, self._segment_path(seq, True))
+            os.remove(closed)
+
+        self._closed[seq] = index
+        self._active = _Index()
+        self._active_seq = seq + 1
+        self._active_size = 0
+
+    # ---------------- APPEND ----------------
+
+    def append(self, items, fsync: bool = False) -> None:
+        """
+        Append (line, keys) pairs as one write.
+        """
+        if not items:
+            return
+
+        with self._lock, self._disk_lock(exclusive=True):
+            index = self._refresh_active()
+            if self._should_rotate(index, items[0][1][0]):
+                self._rotate()
+                index = self._active
+
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                payload = []
+                positions = []
+                for line, keys in items:
+                    data = line.encode("utf-8")
+                    positions.append((offset, keys))
+                    payload.append(data)
+                    offset += len(data)
+
+                f.write(b"".join(payload))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            for position, keys in positions:
+                index.add(position, keys)
+            self._active_size = offset
+
+    # ---------------- QUERY ----------------
+
+    def _segments_newest_first(self) -> Iterator[Tuple[int, _Index]]:
+        with self._lock, self._disk_lock(exclusive=False):
+            active = self._refresh_active()
+            active_seq = self._active_seq
+            closed = [s for s in self._closed_seqs() if s < active_seq]
+
+        yield active_seq, active
+        # Sidecars are loaded only when the query gets that far back
+        for seq in reversed(closed):
+            with self._lock:
+                index = self._closed_index(seq)
+            yield seq, index
+
+    def query(
+        self,
+        *,
+        actor_id: Optional[str] = None,
+        action: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        entity_type: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Tuple[str, dict]]:
+        """
+        Lazily yield (cursor, event), newest first.
+        since / until are inclusive ISO-8601 UTC timestamps.
+        """
+        filters = {
+            field: value
+            for field, value in zip(_FIELDS, (actor_id, action, entity_id))
+            if value is not None
+        }
+
+        after_seq, after_offset = None, None
+        if cursor:
+            try:
+                seq_s, offset_s = cursor.split(":", 1)
+                after_seq, after_offset = int(seq_s), int(offset_s)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+
+        for seq, index in self._segments_newest_first():
+            if after_seq is not None and seq > after_seq:
+                continue
+            if since and index.last_ts and index.last_ts < since:
+                continue
+            if until and index.first_ts and index.first_ts > until:
+                continue
+
+            # Snapshot: the writer may append to the active index
+            count = len(index.offsets)
+            hits = [
+                i for i in index.candidates(filters)
+                if i < count
+                and (not since or index.ts[i] >= since)
+                and (not until or index.ts[i] <= until)
+                and (seq != after_seq or index.offsets[i] < after_offset)
+            ]
+            if not hits:
+                continue
+
+            for offset, event in self._read_events(seq, index, hits[::-1]):
+                if entity_type is not None:
+                    entity = event.get("entity")
+                    if not isinstance(entity, dict) or entity.get("type") != entity_type:
+                        continue
+                yield f"{seq}:{offset}", event
+
+    def _read_events(self, seq: int, index: _Index, hits: List[int]) -> Iterator[Tuple[int, dict]]:
+        content = None
+        for start in range(0, len(hits), _READ_CHUNK):
+            chunk = hits[start:start + _READ_CHUNK]
+
+            if content is None:
+                # Under the locks so a rotation cannot swap the file mid-read
+                with self._lock, self._disk_lock(exclusive=False):
+                    events = self._read_plain(seq, index, chunk)
+                if events is not None:
+                    yield from events
+                    continue
+                # Gzipped segments are immutable: decompress once, unlocked
+                content = self._read_segment(seq)
+
+            yield from self._from_content(content, index, chunk)
+
+    def _read_plain(self, seq: int, index: _Index, chunk: List[int]) -> Optional[list]:
+        # Another process may have closed the segment since the query began
+        path = self._segment_path(seq, False)
+        if not os.path.exists(path):
+            if os.path.exists(self._segment_path(seq, True)):
+                return None
+            path = self.path
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        events = []
+        with f:
+            for i in chunk:
+                offset = index.offsets[i]
+                f.seek(offset)
+                event = self._parse(f.readline())
+                if event is not None:
+                    events.append((offset, event))
+        return events
+
+    def _from_content(self, content: bytes, index: _Index, hits) -> Iterator[Tuple[int, dict]]:
+        for i in hits:
+            offset = index.offsets[i]
+            end = content.find(b"\n", offset)
+            event = self._parse(content[offset:] if end < 0 else content[offset:end])
+            if event is not None:
+                yield offset, event
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[dict]:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        return event if isinstance(event, dict) else None
+
+
+_LOGS: Dict[str, SegmentedLog] = {}
+_logs_lock = Lock()
+
+
+def open_log(path: str) -> SegmentedLog:
+    """
+    Shared SegmentedLog for an active-segment path.
+    """
+    with _logs_lock:
+        log = _LOGS.get(path)
+        if log is None:
+            log = _LOGS[path] = SegmentedLog(path)
+        return log
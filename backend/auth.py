@@ -1,12 +1,101 @@
 from fastapi import Header, HTTPException
 import jwt
-from utils.json_store import read_json
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from utils.collection import USERS
 import os
 from config import settings
 
 JWT_SECRET = settings.JWT_SECRET
 JWT_ALGO = settings.JWT_ALGO
 
+# ===============================
+# PRINCIPAL / TOKEN CACHES
+# ===============================
+#
+# Verified tokens are cached by SHA-256 of the token until their
+# "exp"; resolved users are cached by id. Handlers that change a
+# user's "active" flag call invalidate_principal() so a suspension
+# takes effect on the very next request. The TTL only bounds how long
+# a change made by ANOTHER worker process can go unnoticed.
+
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+PRINCIPAL_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_TTL_SECONDS", "5"))
+
+_tokens: "OrderedDict[str, tuple]" = OrderedDict()   # sha256 → (payload, exp)
+_principals: dict = {}                                 # user_id → (user, cached_at)
+# Bumped by invalidate_principal(): a lookup that started before the
+# invalidation must not cache what it read
+_generations: dict = {}                                # user_id → int
+_epoch = 0                                             # bumped on invalidate all
+_cache_lock = Lock()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _verify_token(token: str) -> dict:
+    key = _token_key(token)
+    now = time.time()
+
+    with _cache_lock:
+        cached = _tokens.get(key)
+        if cached is not None:
+            payload, exp = cached
+            if exp > now:
+                _tokens.move_to_end(key)
+                return payload
+            del _tokens[key]
+
+    # Raises jwt.InvalidTokenError (incl. ExpiredSignatureError)
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+
+    exp = payload.get("exp")
+    if exp is not None:
+        with _cache_lock:
+            _tokens[key] = (payload, float(exp))
+            while len(_tokens) > TOKEN_CACHE_SIZE:
+                _tokens.popitem(last=False)
+
+    return payload
+
+
+def _resolve_principal(user_id: str):
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _principals.get(user_id)
+        if cached is not None and now - cached[1] < PRINCIPAL_TTL_SECONDS:
+            return cached[0]
+        generation = (_epoch, _generations.get(user_id, 0))
+
+    user = USERS.get(user_id)
+
+    if user is not None:
+        with _cache_lock:
+            if generation == (_epoch, _generations.get(user_id, 0)):
+                _principals[user_id] = (user, now)
+
+    return user
+
+
+def invalidate_principal(user_id: str = None) -> None:
+    """
+    Drop the cached principal for user_id (all users if None).
+    Call after changing a user's active flag or role.
+    """
+    global _epoch
+    with _cache_lock:
+        if user_id is None:
+            _principals.clear()
+            _epoch += 1
+        else:
+            _principals.pop(user_id, None)
+            _generations[user_id] = _generations.get(user_id, 0) + 1
+
 
 def get_current_user(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
@@ -15,14 +104,13 @@ def get_current_user(authorization: str = Header(...)):
     token = authorization.split(" ", 1)[1]
 
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+        payload = _verify_token(token)
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    users = read_json("users.json")
-    user = next((u for u in users if u["id"] == payload["user_id"]), None)
+    user = _resolve_principal(payload["user_id"])
 
     if not user or not user["active"]:
         raise HTTPException(status_code=403, detail="User suspended or not found")
 
-    return user
\ No newline at end of file
+    return user
@@ -1,32 +1,79 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+import asyncio
 import jwt
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from utils.json_store import read_json
+from threading import BoundedSemaphore
+from utils.collection import USERS
+from utils.passwords import dummy_verify, hash_password, needs_rehash, verify_password
 from config import settings
 
 JWT_SECRET = settings.JWT_SECRET
 JWT_ALGO = settings.JWT_ALGO
 JWT_EXP_MINUTES = 720
 
+# ===============================
+# PASSWORD VERIFICATION POOL
+# ===============================
+#
+# Hashing is deliberately slow, so it runs (with the user lookup) on a
+# small dedicated pool instead of the event loop. At most LOGIN_MAX_PENDING logins may be
+# running or queued; beyond that login answers 503 right away, so a
+# login storm cannot starve the rest of the API.
+
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", str(LOGIN_WORKERS * 8)))
+
+_login_pool = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+_login_slots = BoundedSemaphore(LOGIN_MAX_PENDING)
+
 router = APIRouter(prefix="/auth")
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
+
+def _authenticate(username: str, password: str):
+    """
+    Runs on the login pool. The user if the password matches, else
+    None. Upgrades legacy plaintext or outdated hashes after a
+    successful check.
+    """
+    user = USERS.find_one(username=username)
+
+    if user is None:
+        dummy_verify(password)
+        return None
+
+    stored = user.get("password")
+    if not verify_password(password, stored):
+        return None
+
+    if needs_rehash(stored):
+        USERS.update(user["id"], {"password": hash_password(password)})
+
+    return user
+
+
 @router.post("/login")
-def login(req: LoginRequest):
-    users = read_json("users.json")
+async def login(req: LoginRequest):
+    if not _login_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many login attempts, retry shortly",
+            headers={"Retry-After": "1"},
+        )
 
-    user = next(
-        (u for u in users
-         if u["username"] == req.username
-         and u["password"] == req.password),
-        None
-    )
+    try:
+        loop = asyncio.get_running_loop()
+        user = await loop.run_in_executor(_login_pool, _authenticate, req.username, req.password)
+    finally:
+        _login_slots.release()
 
-    if not user:
+    if user is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not user["active"]:
@@ -0,0 +1,134 @@
+# backend/benchmarks/chat_load.py
+#
+# Many concurrent chats waiting on a slow model, on one worker.
+#
+#   blocking  the old path: sync handler on a 40-thread pool
+#             (the FastAPI / AnyIO default for sync routes)
+#   async     chat.controller.chat on one event loop
+#
+# Every chat is a new user: orchestrator call + ticket model call,
+# each taking --latency-ms at the stub Ollama. Also reports how late
+# a 10 ms event-loop ticker ran (loop lag) while the chats waited.
+#
+#   cd backend
+#   python -m benchmarks.chat_load [--chats 2000] [--blocking-chats 200] [--latency-ms 1000]
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audit import logger
+from benchmarks.stub_ollama import AsyncStubOllama
+from chat import controller
+from chat.flow_router import route_new_message
+from chat.state_manager import append_history, create_flow, get_flow
+from llm import aclient, cache, client, intent, scheduler
+
+REPLY = {
+    "route": "tickets",
+    "confidence": 0.9,
+    "steps": ["Restart the router.", "Reconnect to the corporate WiFi."],
+    "resolved": True,
+}
+
+THREADPOOL_SIZE = 40
+
+
+def _blocking_chat(user_id: str, message: str) -> dict:
+    flow = create_flow(user_id, message, "bench")
+    append_history(flow["flow_id"], "user", message)
+    flow = get_flow(user_id, flow["flow_id"]) or flow
+    return route_new_message(flow, "bench")
+
+
+def _blocking(chats: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(THREADPOOL_SIZE) as pool:
+        results = list(pool.map(
+            lambda i: _blocking_chat(f"blocking-{i}", "wifi not connecting"),
+            range(chats),
+        ))
+    assert all(r["type"] == "ticket" for r in results)
+    return time.perf_counter() - t0
+
+
+async def _async(chats: int) -> dict:
+    lag = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - t - 0.01)
+
+    tick = asyncio.create_task(ticker())
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(
+        controller.chat(
+            controller.ChatRequest(message="wifi not connecting"),
+            None,
+            {"id": f"async-{i}"},
+        )
+        for i in range(chats)
+    ))
+    elapsed = time.perf_counter() - t0
+
+    stop.set()
+    await tick
+    assert all(r["type"] == "ticket" for r in results)
+
+    lag.sort()
+    return {
+        "elapsed": elapsed,
+        "lag_p99_ms": lag[int(len(lag) * 0.99) - 1] * 1e3 if lag else 0.0,
+        "lag_max_ms": lag[-1] * 1e3 if lag else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--blocking-chats", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    # FLOW_ROUTED events go to a scratch audit log
+    logger.AUDIT_FILE = os.path.join(tempfile.mkdtemp(prefix="audit-bench-"), "audit.log")
+
+    # Every chat must reach the model
+    cache.LLM_CACHE = False
+    client.LLM_SINGLE_FLIGHT = False
+    # The stub serves every request in parallel: no admission control
+    scheduler.LLM_SCHEDULER = False
+    intent.INTENT_CLASSIFIER = False
+
+    # Let every chat hold its own connection to the stub
+    aclient.OLLAMA_MAX_CONNECTIONS = max(aclient.OLLAMA_MAX_CONNECTIONS, args.chats)
+    aclient.OLLAMA_POOL_IDLE = max(aclient.OLLAMA_POOL_IDLE, args.chats)
+
+    with AsyncStubOllama(reply=REPLY, base_latency_ms=args.latency_ms) as stub:
+        client.OLLAMA_URL = stub.url
+        ideal = 2 * args.latency_ms / 1e3
+
+        blocking = _blocking(args.blocking_chats)
+        print(
+            f"blocking  {args.blocking_chats:>5} chats  {blocking:6.1f}s  "
+            f"{args.blocking_chats / blocking:7.1f} chats/s  (model time per chat {ideal:.1f}s)"
+        )
+
+        r = asyncio.run(_async(args.chats))
+        print(
+            f"async     {args.chats:>5} chats  {r['elapsed']:6.1f}s  "
+            f"{args.chats / r['elapsed']:7.1f} chats/s  "
+            f"loop lag p99 {r['lag_p99_ms']:.1f} ms, max {r['lag_max_ms']:.1f} ms"
+        )
+        print(f"stub requests {stub.requests}, connections {stub.connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# backend/benchmarks/coalesce_bench.py
+#
+# Upstream calls made for bursts of LLM requests, counted at a stub
+# Ollama taking --latency-ms per call.
+#
+#   sync     --burst threads send the same greeting through
+#            llm.client.ollama_generate
+#   async    the same burst through llm.aclient.aollama_generate
+#   mixed    --burst requests over --distinct prompts, arriving over
+#            ~--spread-ms, as batch=True orchestrator calls with a
+#            --window-ms micro-batching window
+#
+# Each case runs with single-flight off and on; the run fails if the
+# counts are not what coalescing promises.
+#
+#   cd backend
+#   python -m benchmarks.coalesce_bench [--burst 200] [--latency-ms 200]
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from benchmarks.stub_ollama import AsyncStubOllama, StubOllama
+from llm import aclient, client, scheduler
+
+MODEL = "orchestrator-model"
+GREETING = "hi"
+
+
+def _sync(stub: StubOllama, burst: int) -> tuple:
+    before = stub.requests
+    start = threading.Barrier(burst)
+
+    def call():
+        start.wait()
+        client.ollama_generate(model=MODEL, prompt=GREETING)
+
+    threads = [threading.Thread(target=call) for _ in range(burst)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return stub.requests - before, time.perf_counter() - t0
+
+
+async def _async(stub: AsyncStubOllama, prompts: list, spread_ms: float, batch: bool) -> tuple:
+    before = stub.requests
+    rng = random.Random(3)
+
+    async def call(prompt):
+        await asyncio.sleep(rng.random() * spread_ms / 1e3)
+        return await aclient.aollama_generate(model=MODEL, prompt=prompt, batch=batch)
+
+    t0 = time.perf_counter()
+    replies = await asyncio.gather(*(call(p) for p in prompts))
+    assert len(set(replies)) == 1
+    return stub.requests - before, time.perf_counter() - t0
+
+
+def _report(case: str, flight: bool, calls: int, requests: int, elapsed: float, extra: str = "") -> None:
+    print(
+        f"{case:<6} single-flight {'on ' if flight else 'off'}  "
+        f"{requests:>5} requests  {calls:>5} upstream calls  {elapsed:6.2f}s{extra}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--spread-ms", type=float, default=50)
+    parser.add_argument("--window-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    aclient.OLLAMA_MAX_CONNECTIONS = max(aclient.OLLAMA_MAX_CONNECTIONS, args.burst)
+    # Count calls, not queueing: the stub serves every request in parallel
+    scheduler.LLM_SCHEDULER = False
+
+    with StubOllama(base_latency_ms=args.latency_ms) as stub:
+        client.OLLAMA_URL = stub.url
+        for flight in (False, True):
+            client.LLM_SINGLE_FLIGHT = flight
+            calls, elapsed = _sync(stub, args.burst)
+            _report("sync", flight, calls, args.burst, elapsed)
+            assert calls == (1 if flight else args.burst)
+
+    with AsyncStubOllama(base_latency_ms=args.latency_ms) as stub:
+        client.OLLAMA_URL = stub.url
+        same = [GREETING] * args.burst
+        for flight in (False, True):
+            client.LLM_SINGLE_FLIGHT = flight
+            calls, elapsed = asyncio.run(_async(stub, same, 0, batch=False))
+            _report("async", flight, calls, args.burst, elapsed)
+            assert calls == (1 if flight else args.burst)
+
+        rng = random.Random(5)
+        mixed = [f"prompt {rng.randrange(args.distinct)}" for _ in range(args.burst)]
+        aclient.LLM_BATCH_WINDOW_MS = args.window_ms
+        for flight in (False, True):
+            client.LLM_SINGLE_FLIGHT = flight
+            batches = aclient.flight_stats()["batches"]
+            stub.max_in_flight = 0
+            calls, elapsed = asyncio.run(_async(stub, mixed, args.spread_ms, batch=True))
+            batches = aclient.flight_stats()["batches"] - batches
+            _report(
+                "mixed", flight, calls, args.burst, elapsed,
+                f"  {batches} batches, {calls / batches:.1f} calls/batch, "
+                f"peak {stub.max_in_flight} at the model",
+            )
+            assert calls == (len(set(mixed)) if flight else args.burst)
+
+
+if __name__ == "__main__":
+    main()
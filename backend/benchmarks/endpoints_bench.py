@@ -0,0 +1,154 @@
+# backend/benchmarks/endpoints_bench.py
+#
+# llm.endpoints against several stub Ollama servers, each with
+# --parallel generation slots.
+#
+#   scale     --calls distinct calls through 1 endpoint, then through
+#             --endpoints endpoints (least outstanding requests)
+#   affinity  --flows portal flows of --turns turns, each turn's prompt
+#             extending the last; the stubs keep recent prompts in a
+#             simulated KV cache, so a turn served where the flow's
+#             previous turn ran only prefills the new part. With and
+#             without flow affinity.
+#   failover  one endpoint is stopped a third of the way through
+#             --calls calls: every call must still succeed, and the
+#             dead endpoint must be ejected
+#
+#   cd backend
+#   python -m benchmarks.endpoints_bench [--endpoints 3] [--calls 240] [--latency-ms 300]
+
+import argparse
+import asyncio
+import time
+from contextlib import ExitStack
+
+from benchmarks.stub_ollama import AsyncStubOllama
+from llm import aclient, client, endpoints, scheduler
+
+MODEL = "portal-model"
+
+# One portal turn: ~250 tokens of history
+TURN = "user: I need a room for the design review with the vendor team. " * 15
+
+
+def _stubs(stack: ExitStack, n: int, args, **kwargs) -> list:
+    return [
+        stack.enter_context(AsyncStubOllama(
+            base_latency_ms=args.latency_ms, parallel=args.parallel, **kwargs
+        ))
+        for _ in range(n)
+    ]
+
+
+def _use(stubs: list, args) -> None:
+    client.OLLAMA_ENDPOINTS = ";".join(s.url for s in stubs)
+    # As many slots as the pool has, no per-model caps, queueing every call
+    scheduler._SCHEDULER = scheduler.Scheduler(
+        concurrency=args.parallel * len(stubs),
+        limits={},
+        queue_max=10 ** 6,
+        max_wait=(600, 600, 600),
+    )
+
+
+async def _calls(n: int, offset: int = 0) -> None:
+    await asyncio.gather(*(
+        aclient.aollama_generate(model=MODEL, prompt=f"call {offset + i}") for i in range(n)
+    ))
+
+
+async def _flows(flows: int, turns: int, affinity: bool) -> list:
+    latencies = []
+
+    async def flow(k: int):
+        prompt = f"flow {k}\n"
+        for _ in range(turns):
+            prompt += TURN
+            t0 = time.perf_counter()
+            await aclient.aollama_generate(
+                model=MODEL, prompt=prompt, affinity=f"flow-{k}" if affinity else None
+            )
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(flow(k) for k in range(flows)))
+    return latencies
+
+
+def scale(args) -> None:
+    for n in (1, args.endpoints):
+        with ExitStack() as stack:
+            stubs = _stubs(stack, n, args)
+            _use(stubs, args)
+            t0 = time.perf_counter()
+            asyncio.run(_calls(args.calls))
+            elapsed = time.perf_counter() - t0
+            print(
+                f"scale     {n} endpoint(s)  {args.calls} calls  {elapsed:5.2f}s  "
+                f"{args.calls / elapsed:6.1f} calls/s  per endpoint {[s.requests for s in stubs]}"
+            )
+
+
+def affinity(args) -> None:
+    for pinned in (False, True):
+        with ExitStack() as stack:
+            stubs = _stubs(stack, args.endpoints, args, prefill_us_per_token=1000, kv_cache=64)
+            _use(stubs, args)
+            latencies = asyncio.run(_flows(args.flows, args.turns, pinned))
+            prompt = sum(s.prompt_chars for s in stubs)
+            prefill = sum(s.prefill_chars for s in stubs)
+            stats = client.endpoint_stats()
+            print(
+                f"affinity  {'on ' if pinned else 'off'}  turn mean {sum(latencies) / len(latencies) * 1e3:6.0f} ms  "
+                f"prefilled {prefill / prompt:6.1%} of prompt chars  "
+                f"(hits {stats['affinity_hits']}, moves {stats['affinity_moves']})"
+            )
+
+
+def failover(args) -> None:
+    with ExitStack() as stack:
+        stubs = _stubs(stack, args.endpoints, args)
+        _use(stubs, args)
+        first = args.calls // 3
+        url = stubs[-1].url
+
+        async def run():
+            await _calls(first)
+            stubs[-1].stop()
+            dead = stubs[-1].requests
+            await _calls(args.calls - first, offset=first)
+            return dead
+
+        t0 = time.perf_counter()
+        dead = asyncio.run(run())
+        elapsed = time.perf_counter() - t0
+
+        stats = client.endpoint_stats()["endpoints"]
+        print(
+            f"failover  {args.calls} calls ok in {elapsed:5.2f}s  "
+            f"dead endpoint: {stats[url]['ejections']} ejection(s), "
+            f"{stubs[-1].requests - dead} requests served after stop, "
+            f"per endpoint {[s['served'] for s in stats.values()]}"
+        )
+        assert stats[url]["ejections"] >= 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=240)
+    parser.add_argument("--flows", type=int, default=24)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    # Fail over to the remaining endpoints at once
+    endpoints.OLLAMA_EJECT_AFTER = 1
+
+    scale(args)
+    affinity(args)
+    failover(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# backend/benchmarks/flow_bench.py
+#
+# chat.state_manager lookups and expiry sweeping at many concurrent flows.
+# Flows are inserted with save_flow (no orchestrator / LLM calls).
+#
+#   cd backend && python -m benchmarks.flow_bench [n_flows] [memory|sqlite]
+
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from chat import flow_store
+from chat import state_manager as sm
+
+
+def _timeit(fn, args: list) -> float:
+    start = time.perf_counter()
+    for a in args:
+        fn(*a)
+    return round((time.perf_counter() - start) / len(args) * 1e6, 3)
+
+
+def _owner_scan(flow_id: str):
+    # What the legacy append_history did before the flow_id index
+    for uid, flows in sm._STORE._by_user.items():
+        if flow_id in flows:
+            return uid
+    return None
+
+
+def main(n: int, kind: str = "memory") -> dict:
+    if kind == "sqlite":
+        flow_store.FLOW_STORE_PATH = os.path.join(
+            tempfile.mkdtemp(prefix="flow-bench-"), "flows.db")
+    sm._STORE = flow_store.open_store(kind)
+
+    rng = random.Random(5)
+    n_users = max(1, n // 2)
+
+    start = time.perf_counter()
+    flow_ids = []
+    for i in range(n):
+        user_id = f"u{i % n_users}"
+        flow_id = f"flow-{i:08x}"
+        sm.save_flow(user_id, {
+            "flow_id": flow_id,
+            "user_id": user_id,
+            "type": "ticket",
+        })
+        flow_ids.append((user_id, flow_id))
+    populate_s = time.perf_counter() - start
+
+    sample = rng.sample(flow_ids, min(2_000, n))
+    scan_sample = sample[:50]
+
+    us_per_op = {
+        "get_flow": _timeit(sm.get_flow, sample),
+        "get_active_flows": _timeit(sm.get_active_flows, [(u,) for u, _ in sample]),
+        "append_history_legacy": _timeit(
+            sm.append_history, [(f, "user", "hello") for _, f in sample]),
+        "append_history": _timeit(
+            sm.append_history, [(u, f, "user", "hello") for u, f in sample]),
+        "update_flow_data": _timeit(
+            sm.update_flow_data, [(f, {"issue": "vpn"}) for _, f in sample]),
+    }
+    if kind == "memory":
+        us_per_op["owner_scan_baseline"] = _timeit(
+            _owner_scan, [(f,) for _, f in scan_sample])
+
+    report = {
+        "store": kind,
+        "flows": n,
+        "users": n_users,
+        "populate_s": round(populate_s, 3),
+        "us_per_op": us_per_op,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+    # update_flow_data used to be a silent no-op
+    user_id, flow_id = sample[0]
+    assert sm.get_flow(user_id, flow_id)["data"] == {"issue": "vpn"}
+
+    # Bulk expiry: every flow re-saved already expired, swept in batches
+    ttl, sm.FLOW_TTL_SECONDS = sm.FLOW_TTL_SECONDS, -1
+    for user_id, flow_id in flow_ids:
+        sm.update_flow_step(user_id, flow_id, "collect")
+    sm.FLOW_TTL_SECONDS = ttl
+
+    start = time.perf_counter()
+    evicted = 0
+    while True:
+        batch = sm._sweep_expired(sm._now_ts())
+        evicted += batch
+        if batch < sm.FLOW_SWEEP_BATCH:
+            break
+    sweep_s = time.perf_counter() - start
+
+    report["sweep"] = {
+        "evicted": evicted,
+        "us_per_eviction": round(sweep_s / max(evicted, 1) * 1e6, 3),
+        "stats_after": sm.flow_stats(),
+    }
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        sys.argv[2] if len(sys.argv) > 2 else "memory",
+    )
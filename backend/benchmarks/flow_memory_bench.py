@@ -0,0 +1,122 @@
+# backend/benchmarks/flow_memory_bench.py
+#
+# Memory held by live chat flows: legacy dict flows vs the slotted
+# chat.flow_model.Flow / HistoryEntry objects.
+#
+# Each variant runs in its own subprocess so RSS is not shared.
+#
+#   cd backend
+#   python -m benchmarks.flow_memory_bench [--flows 50000] [--turns 10]
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def _text(*parts) -> str:
+    # Built at runtime like request payloads, so nothing is shared
+    return "".join(parts)
+
+
+def _dict_flow(i: int, turns: int) -> dict:
+    flow_id = f"flow-{i:08x}"
+    return {
+        "id": flow_id,
+        "flow_id": flow_id,
+        "user_id": f"u{i}",
+        "type": _text("meet", "ing"),
+        "data": {},
+        "history": [
+            {
+                "role": _text("us", "er") if t % 2 == 0 else _text("assis", "tant"),
+                "content": f"turn {t} of conversation {i}",
+            }
+            for t in range(turns)
+        ],
+        "step": _text("col", "lect"),
+        "current_date": _text("01/07/", "2026"),
+        "expires_at": 1_800_000_000 + i,
+        "version": 1,
+    }
+
+
+def _slotted_flow(i: int, turns: int):
+    from chat.flow_model import Flow, HistoryEntry
+
+    return Flow(
+        flow_id=f"flow-{i:08x}",
+        user_id=f"u{i}",
+        type=_text("meet", "ing"),
+        history=[
+            HistoryEntry(
+                _text("us", "er") if t % 2 == 0 else _text("assis", "tant"),
+                f"turn {t} of conversation {i}",
+            )
+            for t in range(turns)
+        ],
+        step=_text("col", "lect"),
+        current_date=_text("01/07/", "2026"),
+        expires_at=1_800_000_000 + i,
+        version=1,
+    )
+
+
+def run_variant(variant: str, flows: int, turns: int) -> dict:
+    import chat.flow_model  # noqa: F401  (import cost outside the measurement)
+
+    build = _dict_flow if variant == "dict" else _slotted_flow
+
+    rss_before = _rss_mb()
+    store = {f"flow-{i:08x}": build(i, turns) for i in range(flows)}
+    rss_delta = _rss_mb() - rss_before
+
+    return {
+        "variant": variant,
+        "flows": len(store),
+        "turns": turns,
+        "rss_delta_mb": round(rss_delta, 1),
+        "bytes_per_flow": int(rss_delta * 1024 * 1024 / flows),
+    }
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="flow memory benchmark")
+    parser.add_argument("--flows", type=int, default=50_000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.flows, args.turns)))
+        return {}
+
+    results = []
+    for variant in ("dict", "slotted"):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.flow_memory_bench",
+             "--variant", variant,
+             "--flows", str(args.flows),
+             "--turns", str(args.turns)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout))
+
+    report = {"results": results}
+    dict_rss = results[0]["rss_delta_mb"]
+    if dict_rss:
+        report["rss_saving_pct"] = round(100 * (1 - results[1]["rss_delta_mb"] / dict_rss), 1)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# backend/benchmarks/http_bench.py
+#
+# Per-call overhead of ollama_generate against a local stub Ollama:
+# a fresh connection per call (plain requests.post, the old client)
+# vs the pooled keep-alive session (utils.http_client).
+#
+#   cd backend
+#   python -m benchmarks.http_bench [--calls 2000] [--threads 1,8]
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_ollama import StubOllama
+from llm import client, scheduler
+
+
+def _unpooled(*, model: str, prompt: str):
+    resp = requests.post(
+        f"{client.OLLAMA_URL}/api/generate",
+        json={"model": model, "prompt": prompt, "stream": False},
+        timeout=120,
+    )
+    resp.raise_for_status()
+    return resp.json().get("response", "")
+
+
+def _run(stub: StubOllama, fn, calls: int, threads: int) -> dict:
+    connections = stub.connections
+    latencies = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        fn(model="bench", prompt="book a room tomorrow at 3pm")
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "calls_per_s": calls / elapsed,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        "connections": stub.connections - connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", default="1,8")
+    args = parser.parse_args()
+
+    # Measure the transport only: every call reaches the stub, unqueued
+    client.LLM_SINGLE_FLIGHT = False
+    scheduler.LLM_SCHEDULER = False
+
+    with StubOllama() as stub:
+        client.OLLAMA_URL = stub.url
+
+        # warm-up
+        _run(stub, client.ollama_generate, 50, 1)
+        _run(stub, _unpooled, 50, 1)
+
+        print(f"{'threads':>7} {'client':>9} {'calls/s':>9} {'mean µs':>9} {'p99 µs':>9} {'conns':>6}")
+        for threads in (int(t) for t in args.threads.split(",")):
+            for label, fn in (("per-call", _unpooled), ("pooled", client.ollama_generate)):
+                r = _run(stub, fn, args.calls, threads)
+                print(
+                    f"{threads:>7} {label:>9} {r['calls_per_s']:>9.0f} "
+                    f"{r['mean_us']:>9.0f} {r['p99_us']:>9.0f} {r['connections']:>6}"
+                )
+
+
+if __name__ == "__main__":
+    main()
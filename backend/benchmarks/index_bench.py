@@ -0,0 +1,88 @@
+# backend/benchmarks/index_bench.py
+#
+# Linear scans vs utils.collection indexes.
+#
+#   cd backend && python -m benchmarks.index_bench [n_records]
+
+import json
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+from utils import json_store
+from utils.collection import Collection
+
+
+def _timeit(fn, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(n: int) -> dict:
+    json_store.BASE_PATH = tempfile.mkdtemp(prefix="index-bench-")
+    json_store.write_json("tickets.json", synthetic.tickets(n))
+    json_store.write_json("equipment.json", synthetic.equipment(n))
+
+    tickets = Collection("tickets.json", indexes=("created_by", "assigned_admin", "status"))
+    equipment = Collection("equipment.json", indexes=("status", "secret_code"))
+
+    target_id = f"TCK-{n // 2:08x}"
+    # Last pending item: the worst case for a linear scan
+    pending = [e for e in json_store.read_json_view("equipment.json")
+               if e["status"] == "pending_approval"][-1]
+    secret = pending["secret_code"]
+
+    # Build indexes once (what the first request after a change pays)
+    start = time.perf_counter()
+    tickets.get(target_id)
+    equipment.get(pending["equipment_id"])
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    view = json_store.read_json_view("tickets.json")
+    eq_view = json_store.read_json_view("equipment.json")
+
+    cases = {
+        "ticket_by_id": (
+            lambda: next((t for t in view if t["id"] == target_id), None),
+            lambda: tickets.get(target_id),
+        ),
+        "tickets_assigned_to_admin": (
+            lambda: [t for t in view if t["assigned_admin"] == "a3"],
+            lambda: tickets.find(assigned_admin="a3"),
+        ),
+        "pending_equipment_by_secret": (
+            lambda: next((e for e in eq_view
+                          if e["status"] == "pending_approval"
+                          and e["secret_code"] == secret), None),
+            lambda: equipment.find_one(status="pending_approval", secret_code=secret),
+        ),
+    }
+
+    results = {"records": n, "index_build_ms": round(build_ms, 2), "cases": {}}
+    for name, (linear, indexed) in cases.items():
+        assert linear() == indexed() or (
+            isinstance(linear(), list) and list(linear()) == list(indexed())
+        )
+        lin = _timeit(linear, repeat=20)
+        idx = _timeit(indexed)
+        results["cases"][name] = {
+            "linear_us": round(lin, 2),
+            "indexed_us": round(idx, 2),
+            "speedup": round(lin / idx, 1),
+        }
+
+    # Incremental maintenance cost of one write through the collection
+    start = time.perf_counter()
+    tickets.insert({"id": "TCK-new", "created_by": "u1", "assigned_admin": None,
+                    "status": "open", "attempts": 0, "history": []})
+    results["insert_ms"] = round((time.perf_counter() - start) * 1e3, 2)
+
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(json.dumps(main(n), indent=2))
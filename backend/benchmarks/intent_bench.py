@@ -0,0 +1,128 @@
+# backend/benchmarks/intent_bench.py
+#
+# llm.intent on synthetic labeled first messages (English and Hinglish
+# templates in the style of the orchestrator Modelfile examples).
+#
+# Reports accuracy, coverage (messages answered without the LLM) and
+# latency per threshold on two held-out sets:
+#   templated  a split of the synthetic messages (same distribution)
+#   modelfile  the hand-written orchestrator Modelfile examples, never
+#              seen in training (different phrasing: the harder test)
+# and create_flow latency with and without the classifier against a
+# stub orchestrator taking --latency-ms.
+#
+#   cd backend
+#   python -m benchmarks.intent_bench [--n 4000] [--latency-ms 300]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from audit import logger
+from benchmarks.stub_ollama import StubOllama
+from llm import cache, client, intent
+
+TEMPLATES = {
+    "meeting_booking": (
+        "book a {room} {when}", "{room} book kar do {when}", "schedule a {meeting} {when}",
+        "I need a {room} {when} for {n} people", "{room} chahiye {when}",
+        "reschedule the {meeting} to {when}", "cancel my {meeting} {when}",
+        "can you reserve the {room} {when}", "{meeting} set up karo {when}",
+    ),
+    "equipment_assignment": (
+        "I need a new {item}", "{item} chahiye", "please assign me a {item}",
+        "can I borrow a {item} {when}", "{item} assign kar do please",
+        "returning my old {item}", "need a {item} and a {item2} for my desk",
+        "my {item} is old, please give a new one", "{item} replacement do",
+    ),
+    "tickets": (
+        "{thing} not working", "{thing} kaam nahi kar raha", "{thing} is very slow",
+        "{thing} crash ho raha hai", "cannot connect to {thing}", "{thing} error aa raha hai",
+        "my {thing} keeps freezing", "{thing} down hai", "unable to login to {thing}",
+        "{thing} issue since morning, please fix",
+    ),
+    "greeting_reply": (
+        "{greet}", "{greet} {who}", "{greet}, {smalltalk}", "{smalltalk}",
+        "{thanks}", "{thanks} {who}", "{bye}",
+    ),
+}
+
+SLOTS = {
+    "room": ("meeting room", "conference room", "boardroom", "training room", "interview room"),
+    "meeting": ("client meeting", "team sync", "standup", "review meeting", "interview"),
+    "when": ("tomorrow", "kal 11 baje", "at 3pm", "friday afternoon", "next week", "today evening"),
+    "n": ("4", "6", "10", "12"),
+    "item": ("laptop", "monitor", "keyboard", "mouse", "headset", "charger", "webcam", "docking station"),
+    "item2": ("mouse", "keyboard", "charger", "headset"),
+    "thing": ("wifi", "vpn", "outlook", "email", "printer", "system", "laptop", "teams", "internet", "password reset"),
+    "greet": ("hi", "hello", "hey", "namaste", "good morning", "good evening", "yo"),
+    "who": ("team", "bhai", "boss", "there", "everyone"),
+    "smalltalk": ("kaise ho", "how are you", "kya haal hai", "what's up", "tell me a joke", "aaj weather kaisa hai"),
+    "thanks": ("thanks", "thank you", "shukriya", "thanks a lot"),
+    "bye": ("bye", "good night", "take care", "see you"),
+}
+
+
+def dataset(n: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    routes = list(TEMPLATES)
+    out = []
+    for _ in range(n):
+        route = rng.choice(routes)
+        text = rng.choice(TEMPLATES[route])
+        text = text.format(**{k: rng.choice(v) for k, v in SLOTS.items()})
+        if rng.random() < 0.2:
+            text = text.capitalize() + rng.choice(("!", "?", "."))
+        out.append((text, route))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=4000)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    train, test = intent.split(dataset(args.n), 0.25)
+    modelfile = intent.examples_from_modelfile()
+
+    t0 = time.perf_counter()
+    model = intent.IntentModel().fit(train)
+    print(f"trained on {len(train)} examples in {time.perf_counter() - t0:.1f}s, "
+          f"{len(model.weights)} weights")
+
+    for name, held_out in (("templated", test), ("modelfile", modelfile)):
+        print(f"{name} held-out, {len(held_out)} messages, "
+              f"accuracy {intent.evaluate(model, held_out, 1.0)['accuracy']:.1%}:")
+        print(f"{'threshold':>9} {'coverage':>9} {'covered acc':>12} {'p50 ms':>8} {'p99 ms':>8}")
+        for threshold in (0.6, 0.75, 0.85, 0.95):
+            r = intent.evaluate(model, held_out, threshold)
+            print(f"{threshold:>9.2f} {r['coverage']:>9.1%} {r['covered_accuracy']:>12.1%} "
+                  f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+    # create_flow: every message to the orchestrator vs classifier first
+    from chat import state_manager
+
+    # FLOW_ROUTED events go to a scratch audit log
+    logger.AUDIT_FILE = os.path.join(tempfile.mkdtemp(prefix="audit-bench-"), "audit.log")
+
+    cache.LLM_CACHE = False
+    sample = [t for t, _ in test[:150]] + [t for t, _ in modelfile]
+    reply = {"route": "tickets", "confidence": 0.9}
+    with StubOllama(reply=reply, base_latency_ms=args.latency_ms) as stub:
+        client.OLLAMA_URL = stub.url
+        for label, enabled in (("orchestrator only", False), ("classifier first", True)):
+            intent._model, intent._loaded = (model if enabled else None), True
+            before = stub.requests
+            t0 = time.perf_counter()
+            for i, text in enumerate(sample):
+                state_manager.create_flow(f"bench-{label}-{i}", text, "bench")
+            elapsed = (time.perf_counter() - t0) / len(sample)
+            print(f"create_flow {label:<18} {elapsed * 1e3:7.1f} ms/message, "
+                  f"{stub.requests - before} orchestrator calls for {len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
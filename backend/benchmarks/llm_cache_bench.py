@@ -0,0 +1,116 @@
+# backend/benchmarks/llm_cache_bench.py
+#
+# llm.cache on a skewed stream of first messages: a few phrasings
+# ("hi", "wifi not working", ...) dominate, with case, spacing and
+# punctuation variants and a long tail of one-off messages.
+#
+# Reports per-model hit rates and mean latency per call with the cache
+# off and on, against a stub Ollama taking --latency-ms per call, then
+# reopens the disk tier to show entries surviving a restart.
+#
+#   cd backend
+#   python -m benchmarks.llm_cache_bench [--messages 1000] [--latency-ms 100]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.stub_ollama import StubOllama
+from llm import cache, client
+from llm.orchestrator_llm import run_orchestrator
+from llm.ticket_llm import run_ticket_llm
+
+REPLY = {
+    "route": "tickets",
+    "confidence": 0.9,
+    "steps": ["Restart the router.", "Reconnect to the corporate WiFi."],
+    "resolved": True,
+}
+
+COMMON = (
+    "hi", "hello", "book a meeting room tomorrow", "wifi not working",
+    "I need a laptop", "vpn not connecting", "printer not printing",
+    "my system is slow", "forgot password", "thanks",
+)
+
+
+def _variant(rng: random.Random, text: str) -> str:
+    if rng.random() < 0.3:
+        text = text.capitalize()
+    if rng.random() < 0.3:
+        text = text + rng.choice(("!", "?", ".", "!!"))
+    if rng.random() < 0.2:
+        text = "  " + text.replace(" ", "  ") + " "
+    return text
+
+
+def messages(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(COMMON))]
+    out = []
+    for i in range(n):
+        if rng.random() < 0.25:
+            out.append(f"issue #{i}: {rng.choice(COMMON)} since {rng.randint(1, 12)}pm")
+        else:
+            out.append(_variant(rng, rng.choices(COMMON, weights)[0]))
+    return out
+
+
+def _run(msgs: list) -> float:
+    t0 = time.perf_counter()
+    for m in msgs:
+        run_orchestrator(m)
+        run_ticket_llm(m)
+    return (time.perf_counter() - t0) / (2 * len(msgs))
+
+
+def _reset(enabled: bool) -> None:
+    cache.LLM_CACHE = enabled
+    cache._caches.clear()
+    cache._disk = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    msgs = messages(args.messages)
+    tmp = tempfile.mkdtemp()
+    cache.LLM_CACHE_PATH = os.path.join(tmp, "llm_cache.db")
+
+    with StubOllama(reply=REPLY, base_latency_ms=args.latency_ms) as stub:
+        client.OLLAMA_URL = stub.url
+
+        sample = msgs[: max(1, args.messages // 10)]
+        _reset(False)
+        off = _run(sample)
+        print(f"cache off  {off * 1e3:8.1f} ms/call  ({len(sample)} messages)")
+
+        _reset(True)
+        before = stub.requests
+        on = _run(msgs)
+        print(
+            f"cache on   {on * 1e3:8.1f} ms/call  ({len(msgs)} messages, "
+            f"{stub.requests - before} upstream calls for {2 * len(msgs)})"
+        )
+        for model, s in cache.cache_stats().items():
+            print(f"  {model:<20} hit rate {s['hit_rate']:6.1%}  entries {s['entries']}")
+
+        # "Restart": empty memory tiers, same disk file
+        _reset(True)
+        before = stub.requests
+        warm = _run(msgs)
+        print(
+            f"restarted  {warm * 1e3:8.1f} ms/call  "
+            f"({stub.requests - before} upstream calls, disk tier warm)"
+        )
+        for model, s in cache.cache_stats().items():
+            print(f"  {model:<20} hit rate {s['hit_rate']:6.1%}  disk hits {s['disk_hits']}")
+
+
+if __name__ == "__main__":
+    main()
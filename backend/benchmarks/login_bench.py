@@ -0,0 +1,150 @@
+# backend/benchmarks/login_bench.py
+#
+# Login throughput at 10k users.
+#
+# Drives auth_routes.login directly on an asyncio loop with many
+# concurrent clients, while a probe task measures event-loop lag
+# (what every other endpoint, e.g. /api/chat, would see).
+#
+#   cd backend
+#   python -m benchmarks.login_bench [--users 10000] [--clients 64] [--duration 5]
+#
+# Only the users sampled for login get real scrypt hashes; hashing
+# all 10k at the production work factor would dominate the run.
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+
+
+def _percentiles(samples_s: list) -> dict:
+    if not samples_s:
+        return {"n": 0}
+    ms = sorted(s * 1e3 for s in samples_s)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def _lookup(users: list, sample: list) -> dict:
+    from utils.collection import USERS
+
+    USERS.find_one(username=sample[0]["username"])  # build index
+
+    def timeit(fn) -> float:
+        start = time.perf_counter()
+        for u in sample:
+            fn(u["username"])
+        return round((time.perf_counter() - start) / len(sample) * 1e6, 2)
+
+    return {
+        "linear_scan_us": timeit(lambda name: next(
+            (u for u in users if u["username"] == name), None)),
+        "indexed_us": timeit(lambda name: USERS.find_one(username=name)),
+    }
+
+
+async def _storm(sample: list, clients: int, duration: float) -> dict:
+    from fastapi import HTTPException
+
+    import auth_routes
+
+    rng = random.Random(7)
+    stop = time.perf_counter() + duration
+    status = {}
+    latencies = []
+
+    async def client():
+        while time.perf_counter() < stop:
+            user = rng.choice(sample)
+            # 1 in 10 attempts uses a wrong password
+            password = user["plain"] if rng.random() > 0.1 else "wrong"
+            req = auth_routes.LoginRequest(username=user["username"], password=password)
+
+            start = time.perf_counter()
+            try:
+                await auth_routes.login(req)
+                code = 200
+            except HTTPException as e:
+                code = e.status_code
+            latencies.append(time.perf_counter() - start)
+            status[code] = status.get(code, 0) + 1
+
+            if code == 503:
+                await asyncio.sleep(0.01)
+
+    lag = []
+
+    async def probe():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - start - 0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(probe(), *(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "clients": clients,
+        "workers": auth_routes.LOGIN_WORKERS,
+        "max_pending": auth_routes.LOGIN_MAX_PENDING,
+        "status": {str(k): v for k, v in sorted(status.items())},
+        "verified_per_sec": round(
+            (status.get(200, 0) + status.get(401, 0)) / elapsed, 1),
+        "latency": _percentiles(latencies),
+        "event_loop_lag": _percentiles(lag),
+    }
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="login throughput benchmark")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    from benchmarks import synthetic
+    from utils import json_store
+    from utils.passwords import SCRYPT_LOG2_N, hash_password
+
+    json_store.BASE_PATH = tempfile.mkdtemp(prefix="login-bench-")
+
+    users = synthetic.users(args.users)
+    for u in users:
+        u["active"] = True
+
+    sample = random.Random(3).sample(users, min(args.sample, len(users)))
+    for u in sample:
+        u["plain"] = u["password"]
+        u["password"] = hash_password(u["plain"])
+
+    stored = [{k: v for k, v in u.items() if k != "plain"} for u in users]
+    json_store.write_json("users.json", stored)
+
+    hash_start = time.perf_counter()
+    hash_password("probe")
+    hash_ms = (time.perf_counter() - hash_start) * 1e3
+
+    report = {
+        "users": args.users,
+        "scrypt_log2_n": SCRYPT_LOG2_N,
+        "hash_ms": round(hash_ms, 2),
+        "lookup": _lookup(stored, sample),
+        "storm": asyncio.run(_storm(sample, args.clients, args.duration)),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
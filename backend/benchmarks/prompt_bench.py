@@ -0,0 +1,140 @@
+# backend/benchmarks/prompt_bench.py
+#
+# run_portal_llm prompt size and latency by conversation length,
+# full history vs the token-budgeted window (llm.history).
+#
+# By default a stub Ollama simulates prefill time proportional to the
+# prompt; pass --ollama-url to measure against a real server instead.
+#
+#   cd backend
+#   python -m benchmarks.prompt_bench [--turns 5,20,50] [--prefill-us-per-token 200]
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.stub_ollama import StubOllama
+from llm import client, history, portal_llm
+
+ANSWERS = (
+    "I need a meeting room tomorrow for the quarterly planning review",
+    "around 8 people, maybe 10 if the regional leads join remotely",
+    "from 3pm to 4:30pm if possible, otherwise any slot after lunch",
+    "yes we need a projector and a webex link for the remote people",
+    "the title should be Q3 planning sync with finance and ops",
+    "actually make it 12 people, two more from procurement are coming",
+)
+
+QUESTIONS = (
+    "How many people will attend the meeting?",
+    "What time should the meeting start and end?",
+    "Do you need any equipment or an online meeting link?",
+    "What should the meeting title be?",
+    "Is there anything else I should note for this booking?",
+)
+
+
+def _flow(turns: int, seed: int = 11) -> dict:
+    rng = random.Random(seed)
+    entries = []
+    for i in range(turns):
+        if i % 2 == 0:
+            entries.append({"role": "user", "content": rng.choice(ANSWERS)})
+        else:
+            entries.append({"role": "assistant", "content": rng.choice(QUESTIONS)})
+    return {
+        "type": "meeting",
+        "current_date": "01/07/2026",
+        "data": {},
+        "history": entries,
+    }
+
+
+def _legacy_prompt(flow: dict) -> str:
+    parts = [
+        f'intent: "{flow["type"]}"',
+        f'current_date: "{flow["current_date"]}"',
+    ]
+    for h in flow["history"]:
+        parts.append(f"{h['role'].upper()}: {h['content']}")
+    return "\n".join(parts)
+
+
+def _latency(flow: dict, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        portal_llm.run_portal_llm(flow)
+        samples.append((time.perf_counter() - start) * 1e3)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 2),
+        "p50_ms": round(samples[len(samples) // 2], 2),
+    }
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="portal prompt benchmark")
+    parser.add_argument("--turns", default="5,20,50")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--prefill-us-per-token", type=float, default=200.0)
+    parser.add_argument("--ollama-url")
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.ollama_url:
+        client.OLLAMA_URL = args.ollama_url
+    else:
+        stub = StubOllama(prefill_us_per_token=args.prefill_us_per_token).start()
+        client.OLLAMA_URL = stub.url
+
+    report = {
+        "budget_tokens": history.HISTORY_TOKEN_BUDGET,
+        "keep_turns": history.HISTORY_KEEP_TURNS,
+        "upstream": args.ollama_url or f"stub ({args.prefill_us_per_token} us/token)",
+        "turns": [],
+    }
+
+    try:
+        for turns in (int(t) for t in args.turns.split(",") if t):
+            flow = _flow(turns)
+            legacy = _legacy_prompt(flow)
+            windowed = history.build_prompt(
+                [f'intent: "{flow["type"]}"', f'current_date: "{flow["current_date"]}"'],
+                flow,
+            )
+
+            full_budget = history.HISTORY_TOKEN_BUDGET
+            history.HISTORY_TOKEN_BUDGET = 10 ** 9
+            history.HISTORY_KEEP_TURNS, keep = 10 ** 9, history.HISTORY_KEEP_TURNS
+            try:
+                legacy_latency = _latency(flow, args.repeat)
+            finally:
+                history.HISTORY_TOKEN_BUDGET = full_budget
+                history.HISTORY_KEEP_TURNS = keep
+
+            report["turns"].append({
+                "turns": turns,
+                "full_history": {
+                    "chars": len(legacy),
+                    "est_tokens": history.estimate_tokens(legacy),
+                    "latency": legacy_latency,
+                },
+                "windowed": {
+                    "chars": len(windowed),
+                    "est_tokens": history.estimate_tokens(windowed),
+                    "latency": _latency(flow, args.repeat),
+                },
+            })
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
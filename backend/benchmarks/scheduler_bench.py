@@ -0,0 +1,90 @@
+# backend/benchmarks/scheduler_bench.py
+#
+# Routing latency during a troubleshooting surge, against a stub Ollama
+# with --parallel generation slots and --latency-ms per generation.
+#
+# --surge ticket-model calls arrive at once; shortly after, --routes
+# orchestrator calls arrive one every 100 ms. Run with llm.scheduler
+# off (every call goes straight to the server, which serves them in
+# arrival order) and on (per-model caps, routing first, bounded queues).
+#
+# Reports routing latency, and how the surge was answered: served,
+# or rejected (429 / 503) and how quickly.
+#
+#   cd backend
+#   python -m benchmarks.scheduler_bench [--surge 200] [--routes 20] [--latency-ms 500]
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.stub_ollama import AsyncStubOllama
+from llm import aclient, client, scheduler
+
+
+async def _timed(model: str, prompt: str, delay: float) -> tuple:
+    await asyncio.sleep(delay)
+    t0 = time.perf_counter()
+    try:
+        await aclient.aollama_generate(model=model, prompt=prompt)
+        outcome = 200
+    except scheduler.Overloaded as e:
+        outcome = e.status
+    return outcome, time.perf_counter() - t0
+
+
+async def _run(surge: int, routes: int) -> tuple:
+    tickets = [_timed("ticket-model", f"issue {i}", 0) for i in range(surge)]
+    routing = [_timed("orchestrator-model", f"hello {i}", 0.2 + i * 0.1) for i in range(routes)]
+    results = await asyncio.gather(*tickets, *routing)
+    return results[:surge], results[surge:]
+
+
+def _pct(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--surge", type=int, default=200)
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    aclient.OLLAMA_MAX_CONNECTIONS = max(aclient.OLLAMA_MAX_CONNECTIONS, args.surge + args.routes)
+    aclient.OLLAMA_POOL_IDLE = aclient.OLLAMA_MAX_CONNECTIONS
+
+    with AsyncStubOllama(base_latency_ms=args.latency_ms, parallel=args.parallel) as stub:
+        client.OLLAMA_URL = stub.url
+
+        for enabled in (False, True):
+            scheduler.LLM_SCHEDULER = enabled
+            scheduler._SCHEDULER = scheduler.Scheduler(concurrency=args.parallel)
+
+            t0 = time.perf_counter()
+            tickets, routing = asyncio.run(_run(args.surge, args.routes))
+            elapsed = time.perf_counter() - t0
+
+            route_lat = [t for _, t in routing]
+            print(
+                f"scheduler {'on ' if enabled else 'off'}  {elapsed:5.1f}s  "
+                f"routing p50 {_pct(route_lat, 0.5):5.2f}s  p95 {_pct(route_lat, 0.95):5.2f}s  "
+                f"max {max(route_lat):5.2f}s"
+            )
+
+            by_status = Counter(status for status, _ in tickets)
+            for status in sorted(by_status):
+                lat = [t for s, t in tickets if s == status]
+                label = "served" if status == 200 else f"rejected {status}"
+                print(
+                    f"  tickets {label:<13} {by_status[status]:>5}  "
+                    f"p50 {_pct(lat, 0.5):6.3f}s  max {max(lat):6.3f}s"
+                )
+            assert all(status == 200 for status, _ in routing)
+
+
+if __name__ == "__main__":
+    main()
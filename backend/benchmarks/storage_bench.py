@@ -0,0 +1,259 @@
+# backend/benchmarks/storage_bench.py
+#
+# Storage benchmark for utils.json_store at realistic collection sizes.
+# No external services: synthetic users / meetings / tickets / equipment
+# are written to a temp directory.
+#
+# Each size runs in its own subprocess so peak RSS is per size.
+# Results are JSON, so runs can be compared between commits:
+#
+#   cd backend
+#   python -m benchmarks.storage_bench --sizes 1000,10000,100000 --out before.json
+#   python -m benchmarks.storage_bench --sizes 1000,10000,100000 --out after.json
+#
+# Options:
+#   --sizes     comma-separated record counts (default 1000,10000,100000,1000000)
+#   --threads   concurrent threads for the contention test (default 8)
+#   --duration  seconds per contention test (default 3)
+#   --backend   json | sqlite (default: STORAGE_BACKEND or json)
+#   --format    pretty | compact | binary (default: STORAGE_FORMAT or pretty)
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def _percentiles(samples_s: list) -> dict:
+    ms = sorted(s * 1e3 for s in samples_s)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def _repeat_for(n: int) -> int:
+    return max(3, min(200, 2_000_000 // max(n, 1)))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+# ======================================================
+# SINGLE SIZE (runs in a subprocess)
+# ======================================================
+
+def _contention(json_store, threads: int, duration: float) -> dict:
+    """
+    Mixed load: every thread reads users.json (auth path) and
+    tickets.json, and every 10th op inserts a ticket.
+    """
+    # Warm the cache: measure steady state, not the first parse
+    json_store.read_json_view("users.json")
+    json_store.read_json_view("tickets.json")
+
+    stop = time.perf_counter() + duration
+    counts = [0] * threads
+    latencies = [[] for _ in range(threads)]
+
+    def worker(idx: int):
+        i = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            if i % 10 == 0:
+                json_store.insert_record("tickets.json", {
+                    "id": f"TCK-bench-{idx}-{i}",
+                    "issue": "bench",
+                    "status": "open",
+                    "created_by": "u1",
+                    "attempts": 0,
+                    "assigned_admin": None,
+                    "history": [],
+                })
+            elif i % 2:
+                json_store.read_json_view("users.json")
+            else:
+                json_store.read_json_view("tickets.json")
+            latencies[idx].append(time.perf_counter() - start)
+            i += 1
+        counts[idx] = i
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    from lock import LOCKS
+
+    return {
+        "threads": threads,
+        "ops": sum(counts),
+        "ops_per_sec": round(sum(counts) / elapsed, 1),
+        "latency": _percentiles([s for per in latencies for s in per]),
+        "lock_wait": LOCKS.stats(),
+    }
+
+
+def _audit(tmp: str, n: int) -> dict:
+    from audit import logger
+
+    logger.AUDIT_DIR = tmp
+    logger.AUDIT_FILE = os.path.join(tmp, "audit.log")
+
+    def event():
+        logger.log_event(
+            request_id="req-bench",
+            actor_id="u1",
+            actor_role="user",
+            action="TICKET_CREATED",
+            entity_type="ticket",
+            entity_id="TCK-bench",
+        )
+
+    result = {"append": _time(event, min(n, 5_000))}
+    result["flush"] = _time(logger.flush, 1)
+    result["writer"] = logger.audit_stats()
+    result["file_bytes"] = os.path.getsize(logger.AUDIT_FILE)
+    return result
+
+
+def run_size(n: int, threads: int, duration: float) -> dict:
+    from benchmarks import synthetic
+    from utils import json_store
+
+    tmp = tempfile.mkdtemp(prefix=f"storage-bench-{n}-")
+    json_store.BASE_PATH = tmp
+    repeat = _repeat_for(n)
+
+    result = {"records": n, "collections": {}}
+
+    for filename, generate in synthetic.GENERATORS.items():
+        # users.json stays small in practice; cap it like a real org
+        count = min(n, 10_000) if filename == "users.json" else n
+        records = generate(count)
+
+        stats = {"records": count}
+        stats["write"] = _time(lambda: json_store.write_json(filename, records),
+                               max(3, repeat // 4))
+        stats["file_bytes"] = os.path.getsize(os.path.join(tmp, filename))
+
+        def cold_read():
+            json_store.clear_cache()
+            json_store.read_json(filename)
+
+        stats["read_cold"] = _time(cold_read, max(3, repeat // 4))
+        stats["read_warm_copy"] = _time(lambda: json_store.read_json(filename), repeat)
+        stats["read_warm_view"] = _time(lambda: json_store.read_json_view(filename), repeat)
+
+        seq = iter(range(10 ** 9))
+        key = "equipment_id" if filename == "equipment.json" else "id"
+        stats["insert_record"] = _time(
+            lambda: json_store.insert_record(filename, {key: f"bench-{next(seq)}"}),
+            max(3, repeat // 4),
+        )
+        result["collections"][filename] = stats
+        del records
+
+    result["contention"] = _contention(json_store, threads, duration)
+    result["audit_log"] = _audit(tmp, n)
+    result["cache"] = json_store.cache_stats()
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+# ======================================================
+# DRIVER
+# ======================================================
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="json_store storage benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--backend", default=os.getenv("STORAGE_BACKEND", "json"))
+    parser.add_argument("--format", default=os.getenv("STORAGE_FORMAT", "pretty"))
+    parser.add_argument("--out")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        print(json.dumps(run_size(args.single, args.threads, args.duration)))
+        return {}
+
+    env = dict(os.environ, STORAGE_BACKEND=args.backend, STORAGE_FORMAT=args.format)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "format": args.format,
+        },
+        "sizes": [],
+    }
+
+    for n in (int(s) for s in args.sizes.split(",") if s):
+        print(f"... {n} records", file=sys.stderr)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.storage_bench",
+             "--single", str(n),
+             "--threads", str(args.threads),
+             "--duration", str(args.duration)],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            report["sizes"].append({"records": n, "error": proc.stderr.strip()[-2000:]})
+            continue
+        report["sizes"].append(json.loads(proc.stdout))
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out)
+    else:
+        print(out)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/benchmarks/stream_bench.py
+#
+# Time until the user sees the first character of the reply:
+# run_portal_llm / run_ticket_llm blocking vs streamed (on_token),
+# against a stub Ollama generating one token every --token-ms.
+#
+#   cd backend
+#   python -m benchmarks.stream_bench [--token-ms 40] [--runs 5]
+
+import argparse
+import statistics
+import time
+
+from benchmarks.stub_ollama import StubOllama
+from llm import cache, client
+from llm.portal_llm import run_portal_llm
+from llm.ticket_llm import run_ticket_llm
+
+PORTAL_REPLY = {
+    "status": "incomplete",
+    "missing": "participants",
+    "question": "How many people will attend, and do you need a Webex link for remote participants?",
+}
+
+TICKET_REPLY = {
+    "steps": [
+        "Disconnect from the corporate WiFi and reconnect using your directory credentials.",
+        "If it still fails, restart your laptop and try again.",
+    ],
+    "resolved": True,
+}
+
+FLOW = {
+    "type": "meeting",
+    "current_date": "2026-10-18",
+    "data": {},
+    "history": [{"role": "user", "content": "book a meeting room tomorrow at 3pm"}],
+}
+
+
+def _measure(call, runs: int) -> dict:
+    first, total = [], []
+    for _ in range(runs):
+        seen = []
+        t0 = time.perf_counter()
+
+        def on_token(text):
+            if not seen:
+                seen.append(time.perf_counter() - t0)
+
+        result = call(on_token)
+        elapsed = time.perf_counter() - t0
+        total.append(elapsed)
+        first.append(seen[0] if seen else elapsed)
+    return {
+        "first_ms": statistics.median(first) * 1e3,
+        "total_ms": statistics.median(total) * 1e3,
+        "result": result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-ms", type=float, default=40.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Every run must reach the model
+    cache.LLM_CACHE = False
+
+    cases = (
+        ("portal", PORTAL_REPLY, lambda cb: run_portal_llm(FLOW, cb)),
+        ("ticket", TICKET_REPLY, lambda cb: run_ticket_llm("wifi not connecting", cb)),
+    )
+
+    print(f"{'model':>7} {'mode':>9} {'first char ms':>14} {'complete ms':>12}")
+    for name, reply, run in cases:
+        with StubOllama(reply=reply, token_ms=args.token_ms, base_latency_ms=150) as stub:
+            client.OLLAMA_URL = stub.url
+
+            blocking = _measure(lambda cb: run(None), args.runs)
+            streamed = _measure(run, args.runs)
+            assert blocking["result"] == streamed["result"] == reply
+
+            for mode, r in (("blocking", blocking), ("streamed", streamed)):
+                print(f"{name:>7} {mode:>9} {r['first_ms']:>14.0f} {r['total_ms']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
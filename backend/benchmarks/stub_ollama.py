@@ -0,0 +1,331 @@
+# backend/benchmarks/stub_ollama.py
+#
+# Minimal stand-in for the Ollama HTTP API used by benchmarks.
+# Simulates prefill cost proportional to prompt size, and counts
+# the requests it served. "stream": true requests are answered as
+# chunked NDJSON, one ~4-character token every token_ms.
+#
+#   with StubOllama(prefill_us_per_token=50) as stub:
+#       llm.client.OLLAMA_URL = stub.url
+#       ...
+#       stub.requests     # upstream calls served
+#       stub.connections  # TCP connections accepted
+#       stub.max_in_flight  # most requests being generated at once
+#
+# kv_cache=N keeps the last N prompts "in the KV cache": a prompt
+# extending one of them only pays prefill for the new part
+# (stub.prefill_chars counts what was actually prefilled).
+#
+# models=(...) serves only those models; others are answered 404,
+# as Ollama does for a model it does not have.
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = {
+    "status": "incomplete",
+    "missing": "date",
+    "question": "Which date should I book it for?",
+}
+
+
+class StubOllama:
+    def __init__(
+        self,
+        prefill_us_per_token: float = 0.0,
+        base_latency_ms: float = 0.0,
+        reply: dict = None,
+        token_ms: float = 0.0,
+        kv_cache: int = 0,
+        models: tuple = None,
+    ):
+        self.prefill_us_per_token = prefill_us_per_token
+        self.base_latency_ms = base_latency_ms
+        self.reply = reply or DEFAULT_REPLY
+        self.token_ms = token_ms
+        self.models = models
+        self.requests = 0
+        self.connections = 0
+        self.prompt_chars = 0
+        self.prefill_chars = 0
+        self._kv = deque(maxlen=kv_cache) if kv_cache else None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _prefill(self, payload: dict) -> None:
+        time.sleep(self._admit(payload))
+
+    def _admit(self, payload: dict) -> float:
+        """
+        Count the request; returns its simulated prefill time (s).
+        """
+        prompt = payload.get("prompt")
+        if prompt is None:
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+
+        with self._lock:
+            cached = 0
+            if self._kv is not None:
+                cached = max((len(os.path.commonprefix((prompt, p))) for p in self._kv), default=0)
+                self._kv.append(prompt)
+            self.requests += 1
+            self.prompt_chars += len(prompt)
+            self.prefill_chars += len(prompt) - cached
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        tokens = (len(prompt) - cached) / 4
+        return self.base_latency_ms / 1e3 + tokens * self.prefill_us_per_token / 1e6
+
+    def _missing(self, payload: dict) -> bool:
+        return self.models is not None and payload.get("model") not in self.models
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _tokens(self, payload: dict):
+        content = json.dumps(self.reply)
+        chat = "messages" in payload
+        for i in range(0, len(content), 4):
+            time.sleep(self.token_ms / 1e3)
+            piece = content[i:i + 4]
+            if chat:
+                yield {"message": {"role": "assistant", "content": piece}, "done": False}
+            else:
+                yield {"response": piece, "done": False}
+
+    def _handle(self, payload: dict) -> dict:
+        self._prefill(payload)
+        content = "".join(
+            c["message"]["content"] if "message" in c else c["response"]
+            for c in self._tokens(payload)
+        )
+        return self._reply(payload, content)
+
+    def _reply(self, payload: dict, content: str) -> dict:
+        if "messages" in payload:
+            return {"message": {"role": "assistant", "content": content}, "done": True}
+        return {"response": content, "done": True}
+
+    def start(self) -> "StubOllama":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Like Ollama (Go net/http): otherwise the separate header and
+            # body writes hit Nagle + delayed ACK on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                # Health checks (GET /api/tags)
+                body = b'{"models": []}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if stub._missing(payload):
+                    self._not_found(payload)
+                    return
+                try:
+                    if payload.get("stream"):
+                        self._stream(payload)
+                        return
+                    body = json.dumps(stub._handle(payload)).encode("utf-8")
+                finally:
+                    stub._release()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _not_found(self, payload):
+                body = json.dumps({"error": f"model '{payload.get('model')}' not found"}).encode("utf-8")
+                self.send_response(404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, payload):
+                stub._prefill(payload)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in itertools.chain(stub._tokens(payload), [{"done": True}]):
+                    line = json.dumps(chunk).encode("utf-8") + b"\n"
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # Load tests open thousands of connections at once
+            request_queue_size = 4096
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "StubOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class AsyncStubOllama(StubOllama):
+    """
+    StubOllama served by an asyncio server on its own thread, so
+    thousands of requests can wait on the simulated latency at once
+    (the threaded server needs a thread per connection).
+    Non-streaming requests only.
+
+    parallel=N serves N generations at a time, like Ollama's
+    OLLAMA_NUM_PARALLEL; later requests wait in arrival order.
+    """
+
+    def __init__(self, *args, parallel: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parallel = parallel
+        self._slots = None
+        self._loop = None
+        self._tasks = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+
+                payload = json.loads(await reader.readexactly(length) or b"{}")
+                if request_line.startswith(b"GET"):
+                    # Health checks (GET /api/tags)
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\n"
+                        b"Content-Type: application/json\r\n"
+                        b'Content-Length: 14\r\n\r\n{"models": []}'
+                    )
+                    await writer.drain()
+                    continue
+
+                if self._missing(payload):
+                    body = json.dumps({"error": f"model '{payload.get('model')}' not found"}).encode("utf-8")
+                    writer.write(
+                        b"HTTP/1.1 404 Not Found\r\n"
+                        b"Content-Type: application/json\r\n"
+                        b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                    )
+                    await writer.drain()
+                    continue
+
+                content = json.dumps(self.reply)
+                if self._slots is not None:
+                    await self._slots.acquire()
+                try:
+                    await asyncio.sleep(
+                        self._admit(payload) + len(content) / 4 * self.token_ms / 1e3
+                    )
+                finally:
+                    self._release()
+                    if self._slots is not None:
+                        self._slots.release()
+
+                body = json.dumps(self._reply(payload, content)).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._tasks.discard(task)
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop.stop()
+
+    def start(self) -> "AsyncStubOllama":
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            if self.parallel:
+                self._slots = asyncio.Semaphore(self.parallel)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve, "127.0.0.1", 0, backlog=4096)
+            )
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
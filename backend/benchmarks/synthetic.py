@@ -0,0 +1,86 @@
+# backend/benchmarks/synthetic.py
+#
+# Deterministic synthetic records shaped like the real collections.
+
+import random
+
+ADMINS = [f"a{i}" for i in range(1, 21)]
+STATUSES = ("open", "escalated", "resolved", "closed")
+
+
+def users(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        role = "admin" if i < len(ADMINS) else rng.choice(("user", "user", "user", "superuser"))
+        out.append({
+            "id": ADMINS[i] if i < len(ADMINS) else f"u{i}",
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "password": f"{rng.randrange(10000):04d}",
+            "role": role,
+            "active": rng.random() > 0.05,
+        })
+    return out
+
+
+def tickets(n: int, n_users: int = 1000, seed: int = 2) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        status = rng.choice(STATUSES)
+        out.append({
+            "id": f"TCK-{i:08x}",
+            "issue": rng.choice(("wifi not working", "laptop slow", "vpn down", "printer jam")),
+            "status": status,
+            "created_by": f"u{rng.randrange(n_users)}",
+            "attempts": rng.randrange(3),
+            "assigned_admin": rng.choice(ADMINS) if status != "open" else None,
+            "history": [{"ai": {"steps": ["Restart the device."], "resolved": False}}],
+        })
+    return out
+
+
+def meetings(n: int, n_users: int = 1000, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        online = rng.random() < 0.5
+        out.append({
+            "id": f"MTG-{i:08x}",
+            "title": f"Sync {i}",
+            "date": f"{rng.randrange(1, 29):02d}/{rng.randrange(1, 13):02d}",
+            "start_time": f"{rng.randrange(9, 18):02d}:{rng.choice(('00', '30'))}",
+            "duration": rng.choice(("00:30", "01:00", "01:30")),
+            "participants": rng.randrange(2, 21),
+            "type": "online" if online else "offline",
+            "room": f"Room {rng.randrange(1, 11)}",
+            "webex": f"WebEx-{rng.randrange(1, 5)}" if online else None,
+            "created_by": f"u{rng.randrange(n_users)}",
+        })
+    return out
+
+
+def equipment(n: int, seed: int = 4) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        pending = rng.random() < 0.1
+        out.append({
+            "equipment_id": f"EQ-{i:08x}",
+            "name": rng.choice(("Laptop", "Monitor", "Headset", "Projector")),
+            "status": "pending_approval" if pending else rng.choice(("available", "assigned")),
+            "requested_by": f"u{rng.randrange(1000)}" if pending else None,
+            "secret_code": f"{rng.randrange(10 ** 6):06d}" if pending else None,
+            "secret_expires_at": None,
+            "requested_at": None,
+        })
+    return out
+
+
+GENERATORS = {
+    "users.json": users,
+    "tickets.json": tickets,
+    "meetings.json": meetings,
+    "equipment.json": equipment,
+}
@@ -1,53 +1,179 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from uuid import uuid4
 from datetime import datetime
+import asyncio
+import json
+from typing import Hashable
 
 from auth import get_current_user
 from chat.state_manager import (
     get_active_flows,
-    create_flow,
+    get_flow,
+    acreate_flow,
     delete_flow,
     append_history,
     update_flow_data,
+    run_storage,
 )
-from chat.flow_router import route_new_message
+from chat.flow_router import aroute_new_message
+from chat.user_queue import AsyncUserQueue, UserBusy
+from llm.scheduler import Overloaded
 from audit.logger import log_event
 
 router = APIRouter(prefix="/api")
 
+# One user's messages are handled in order; see chat.user_queue
+_USER_QUEUE = AsyncUserQueue()
+
+# Streamed chats keep running after a client disconnects;
+# hold references so the tasks are not garbage collected
+_BACKGROUND = set()
+
 
 class ChatRequest(BaseModel):
     message: str
 
 
-@router.post("/chat")
-def chat(req: ChatRequest, request: Request, user=Depends(get_current_user)):
+def _message(req: ChatRequest) -> str:
     message = (req.message or "").strip()
     if not message:
         raise HTTPException(
             status_code=400,
             detail="message is required"
         )
+    return message
+
+
+def _key(request: Request, route: str) -> Hashable:
+    """
+    Retries of one request (same Idempotency-Key header, same route)
+    share its response. Anything else runs on its own: two identical
+    messages may be two turns ("yes", "1"). Identical model calls are
+    still shared by llm.client / llm.aclient single-flight.
+    """
+    token = request.headers.get("Idempotency-Key")
+    return (route, token) if token else object()
+
+
+# The chat routes are async: a chat waiting on the model is a
+# suspended coroutine, not a threadpool thread. Blocking storage
+# calls run on the state_manager storage executor.
+
+@router.post("/chat")
+async def chat(req: ChatRequest, request: Request, user=Depends(get_current_user)):
+    message = _message(req)
 
     request_id = f"req-{uuid4().hex[:8]}"
     user_id = user["id"]
+    key = _key(request, "chat")
 
+    try:
+        return await _USER_QUEUE.run(
+            user_id, key, lambda: _handle_message(user_id, message, request_id)
+        )
+    except UserBusy:
+        raise HTTPException(
+            status_code=429,
+            detail="Previous messages are still being processed",
+            headers={"Retry-After": "1"},
+        )
+    except Overloaded as e:
+        # The model server is saturated (llm.scheduler): answer now
+        # rather than after the upstream timeout
+        raise HTTPException(
+            status_code=e.status,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request, user=Depends(get_current_user)):
+    """
+    Same as /chat, as Server-Sent Events:
+      event: token  data: {"text": "..."}   reply text as it is generated
+      event: done   data: <the /chat response>
+      event: error  data: {"status": 429|500|503, "detail": "...",
+                           "retry_after": seconds (429/503 only)}
+    The flow is updated once the model has finished, even if the
+    client disconnects mid-stream. "done" carries the final reply
+    (e.g. the confirmation prompt), which may differ from the tokens.
+    """
+    message = _message(req)
+
+    request_id = f"req-{uuid4().hex[:8]}"
+    user_id = user["id"]
+    key = _key(request, "stream")
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_token(text: str) -> None:
+        events.put_nowait(("token", {"text": text}))
+
+    async def work() -> None:
+        try:
+            result = await _USER_QUEUE.run(
+                user_id, key,
+                lambda: _handle_message(user_id, message, request_id, on_token),
+            )
+            events.put_nowait(("done", result))
+        except UserBusy:
+            events.put_nowait(("error", {
+                "status": 429,
+                "detail": "Previous messages are still being processed",
+                "retry_after": 1,
+            }))
+        except Overloaded as e:
+            events.put_nowait(("error", {
+                "status": e.status,
+                "detail": str(e),
+                "retry_after": e.retry_after,
+            }))
+        except Exception:
+            events.put_nowait(("error", {"status": 500, "detail": "Chat request failed"}))
+
+    task = asyncio.create_task(work())
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+
+    async def sse():
+        while True:
+            event, data = await events.get()
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if event != "token":
+                return
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _record_message(user_id: str, flow, message: str):
+    append_history(flow["flow_id"], "user", message)
+    # Shared flow stores hand out copies: re-read to see the message
+    return get_flow(user_id, flow["flow_id"]) or flow
+
+
+async def _handle_message(user_id: str, message: str, request_id: str, on_token=None):
     # 1️⃣ Check active flows (multiple allowed)
-    flows = get_active_flows(user_id)
+    flows = await run_storage(get_active_flows, user_id)
 
     if flows:
         # Pick the most recent active flow
         flow = flows[-1]
 
-        append_history(flow["flow_id"], "user", message)
+        flow = await run_storage(_record_message, user_id, flow, message)
 
-        response = route_new_message(flow, request_id)
+        response = await aroute_new_message(flow, request_id, on_token)
 
         return response
 
     # 2️⃣ No active flow → run orchestrator ONCE
-    flow = create_flow(user_id, message, request_id)
+    flow = await acreate_flow(user_id, message, request_id)
 
     if flow is None:
         # Greeting / low confidence
@@ -59,7 +185,7 @@ def chat(req: ChatRequest, request: Request, user=Depends(get_current_user)):
             "summary": None,
         }
 
-    append_history(flow["flow_id"], "user", message)
+    flow = await run_storage(_record_message, user_id, flow, message)
 
-    response = route_new_message(flow, request_id)
-    return response
\ No newline at end of file
+    response = await aroute_new_message(flow, request_id, on_token)
+    return response
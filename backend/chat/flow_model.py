@@ -0,0 +1,169 @@
+# backend/chat/flow_model.py
+#
+# Compact in-memory representation of chat flows.
+#
+# Flow and HistoryEntry are slotted dataclasses: no per-instance
+# __dict__, no duplicated id/flow_id keys, and the small vocabularies
+# (roles, flow types, steps, dates) are interned so thousands of flows
+# share one string object each.
+#
+# Both keep a dict-compatible view (flow["history"], flow.get("data"),
+# flow["step"] = ...), so existing callers such as
+# flow_router.route_new_message work unchanged.
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+_intern = sys.intern
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    role: str
+    content: str
+
+    def __post_init__(self):
+        self.role = _intern(self.role)
+
+    # ---------------- DICT VIEW ----------------
+
+    def __getitem__(self, key: str):
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+    @classmethod
+    def coerce(cls, entry) -> "HistoryEntry":
+        if isinstance(entry, cls):
+            return entry
+        return cls(entry.get("role", ""), entry.get("content", ""))
+
+
+# Dict keys backed by Flow attributes ("id" is an alias of flow_id)
+_FIELDS = (
+    "flow_id", "user_id", "type", "data", "history",
+    "step", "current_date", "expires_at", "version",
+)
+
+
+@dataclass(slots=True)
+class Flow:
+    flow_id: str
+    user_id: str
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    history: List[HistoryEntry] = field(default_factory=list)
+    step: str = "collect"
+    current_date: str = ""
+    expires_at: int = 0
+    version: Optional[int] = None
+    # Keys outside the fixed shape, created only when used
+    extra: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        self.type = _intern(self.type)
+        self.step = _intern(self.step)
+        self.current_date = _intern(self.current_date)
+
+    # ---------------- DICT VIEW ----------------
+
+    def __getitem__(self, key: str):
+        if key == "id":
+            return self.flow_id
+        if key in _FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "id":
+            key = "flow_id"
+        if key in _FIELDS:
+            if key in ("type", "step", "current_date") and isinstance(value, str):
+                value = _intern(value)
+            elif key == "history":
+                value = [HistoryEntry.coerce(h) for h in value]
+            setattr(self, key, value)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key == "id" or key in _FIELDS or (self.extra is not None and key in self.extra)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        yield "id"
+        yield from _FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def items(self):
+        return ((k, self[k]) for k in self.keys())
+
+    def update(self, other=(), **kwargs) -> None:
+        for key, value in dict(other, **kwargs).items():
+            self[key] = value
+
+    # ---------------- CONVERSION ----------------
+
+    def to_dict(self) -> dict:
+        out = {
+            "id": self.flow_id,
+            "flow_id": self.flow_id,
+            "user_id": self.user_id,
+            "type": self.type,
+            "data": self.data,
+            "history": [h.to_dict() for h in self.history],
+            "step": self.step,
+            "current_date": self.current_date,
+            "expires_at": self.expires_at,
+            "version": self.version,
+        }
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    @classmethod
+    def from_dict(cls, raw: dict, today: str = "") -> "Flow":
+        """
+        Build from a legacy flow dict, filling any missing
+        runtime fields (what _ensure_runtime_fields used to do).
+        """
+        raw = dict(raw)
+        flow_id = raw.pop("flow_id", None) or raw.pop("id", None)
+        raw.pop("id", None)
+
+        flow = cls(
+            flow_id=flow_id,
+            user_id=raw.pop("user_id", ""),
+            type=raw.pop("type", ""),
+            data=raw.pop("data", None) or {},
+            history=[HistoryEntry.coerce(h) for h in raw.pop("history", None) or ()],
+            step=raw.pop("step", None) or "collect",
+            current_date=raw.pop("current_date", None) or today,
+            expires_at=raw.pop("expires_at", 0),
+            version=raw.pop("version", None),
+        )
+        if raw:
+            flow.extra = raw
+        return flow
@@ -3,56 +3,93 @@ from chat.state_manager import (
     update_flow_step,
     update_flow_data,
     delete_flow,
+    run_storage,
 )
-from llm.portal_llm import run_portal_llm
-from llm.ticket_llm import run_ticket_llm
+from llm.portal_llm import arun_portal_llm, run_portal_llm
+from llm.ticket_llm import arun_ticket_llm, run_ticket_llm
 from engines.meeting_engine import execute_meeting
 from audit.logger import log_event
 
+PORTAL_FLOWS = {"meeting", "equipment"}
 
-def route_new_message(flow: dict, request_id: str):
+
+def _latest_user_message(flow: dict) -> str:
+    for entry in reversed(flow.get("history") or ()):
+        if entry["role"] == "user":
+            return entry["content"]
+    return ""
+
+
+def route_new_message(flow: dict, request_id: str, on_token=None):
+    """
+    on_token, if given, receives the assistant's reply text
+    while the model is still generating it.
+    """
     flow_type = flow["type"]
-    user_id = flow["user_id"]
 
     # ---------------- MEETING / EQUIPMENT ----------------
-    if flow_type in {"meeting", "equipment"}:
-        llm_result = run_portal_llm(flow)
+    if flow_type in PORTAL_FLOWS:
+        return _portal_reply(flow, run_portal_llm(flow, on_token))
 
-        append_history(flow["flow_id"], "assistant", llm_result["question"] if llm_result["status"] == "incomplete" else "SUMMARY_READY")
+    # ---------------- TICKETS ----------------
+    if flow_type == "ticket":
+        return _ticket_reply(flow, run_ticket_llm(_latest_user_message(flow), on_token))
 
-        if llm_result["status"] == "incomplete":
-            return {
-                "flow_id": flow["flow_id"],
-                "type": flow_type,
-                "step": "collect",
-                "response": llm_result["question"],
-                "summary": None,
-            }
+    raise RuntimeError("Unknown flow type")
 
-        # COMPLETE → CONFIRMATION
-        update_flow_data(flow["flow_id"], llm_result["data"])
-        update_flow_step(flow["flow_id"], "confirm")
 
-        return {
-            "flow_id": flow["flow_id"],
-            "type": flow_type,
-            "step": "confirm",
-            "response": "Please confirm the details. YES / NO",
-            "summary": llm_result["data"],
-        }
+async def aroute_new_message(flow: dict, request_id: str, on_token=None):
+    """
+    Async route_new_message: awaits the model, then updates the
+    flow on the storage executor.
+    """
+    flow_type = flow["type"]
+
+    if flow_type in PORTAL_FLOWS:
+        llm_result = await arun_portal_llm(flow, on_token)
+        return await run_storage(_portal_reply, flow, llm_result)
 
-    # ---------------- TICKETS ----------------
     if flow_type == "ticket":
-        result = run_ticket_llm(flow)
+        result = await arun_ticket_llm(_latest_user_message(flow), on_token)
+        return await run_storage(_ticket_reply, flow, result)
+
+    raise RuntimeError("Unknown flow type")
+
+
+def _portal_reply(flow: dict, llm_result: dict) -> dict:
+    flow_type = flow["type"]
 
-        append_history(flow["flow_id"], "assistant", "TROUBLESHOOTING")
+    append_history(flow["flow_id"], "assistant", llm_result["question"] if llm_result["status"] == "incomplete" else "SUMMARY_READY")
 
+    if llm_result["status"] == "incomplete":
         return {
             "flow_id": flow["flow_id"],
-            "type": "ticket",
+            "type": flow_type,
             "step": "collect",
-            "response": "\n".join(result["steps"]) or "Issue noted.",
+            "response": llm_result["question"],
             "summary": None,
         }
 
-    raise RuntimeError("Unknown flow type")
\ No newline at end of file
+    # COMPLETE → CONFIRMATION
+    update_flow_data(flow["flow_id"], llm_result["data"])
+    update_flow_step(flow["flow_id"], "confirm")
+
+    return {
+        "flow_id": flow["flow_id"],
+        "type": flow_type,
+        "step": "confirm",
+        "response": "Please confirm the details. YES / NO",
+        "summary": llm_result["data"],
+    }
+
+
+def _ticket_reply(flow: dict, result: dict) -> dict:
+    append_history(flow["flow_id"], "assistant", "TROUBLESHOOTING")
+
+    return {
+        "flow_id": flow["flow_id"],
+        "type": "ticket",
+        "step": "collect",
+        "response": "\n".join(result["steps"]) or "Issue noted.",
+        "summary": None,
+    }
@@ -0,0 +1,324 @@
+# backend/chat/flow_store.py
+#
+# Flow storage backends for chat.state_manager.
+#
+#   FLOW_STORE=memory  (default) process-local maps; single worker only
+#   FLOW_STORE=sqlite  SQLite WAL file shared by every worker process
+#                      (FLOW_STORE_PATH, default storage/flows.db)
+#
+# Flows are chat.flow_model.Flow objects (dict-compatible).
+# Every flow carries a "version". put() is a compare-and-set on it:
+# a flow read at version v can only be saved while the stored copy is
+# still at v, otherwise FlowConflict is raised and the caller re-reads.
+# New flows (no "version" yet) are inserted at version 1.
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+from chat.flow_model import Flow
+
+FLOW_STORE = os.getenv("FLOW_STORE", "memory")
+FLOW_STORE_PATH = os.getenv("FLOW_STORE_PATH", os.path.join("storage", "flows.db"))
+
+
+class FlowConflict(Exception):
+    """
+    The flow was changed (or removed) by someone else since it was read.
+    """
+
+
+def _expired(flow: Flow, now: int) -> bool:
+    return flow.expires_at <= now
+
+
+class FlowStore:
+    """
+    Interface shared by the backends.
+    """
+
+    def get(self, flow_id: str, now: int) -> Optional[Tuple[str, Flow]]:
+        """
+        (user_id, flow) for a live flow, else None.
+        """
+        raise NotImplementedError
+
+    def user_flows(self, user_id: str, now: int) -> List[Flow]:
+        """
+        Live flows of a user, oldest first.
+        """
+        raise NotImplementedError
+
+    def put(self, user_id: str, flow: Flow) -> None:
+        """
+        Insert or update; bumps flow.version.
+        Raises FlowConflict on a version mismatch.
+        """
+        raise NotImplementedError
+
+    def delete(self, user_id: str, flow_id: str) -> None:
+        raise NotImplementedError
+
+    def sweep(self, now: int, limit: int) -> int:
+        """
+        Evict up to limit expired flows. Returns how many.
+        """
+        raise NotImplementedError
+
+    def next_expiry(self) -> Optional[int]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+# ======================================================
+# IN-MEMORY (single process)
+# ======================================================
+
+class MemoryFlowStore(FlowStore):
+    """
+    Flows by user and by flow_id, plus an expiry min-heap.
+    Callers share the stored Flow objects, so in-process saves never
+    conflict; versions still advance for parity with other backends.
+    """
+
+    def __init__(self):
+        # { user_id: { flow_id: flow } }
+        self._by_user: Dict[str, Dict[str, Flow]] = {}
+        # flow_id → (user_id, flow)
+        self._by_id: Dict[str, Tuple[str, Flow]] = {}
+        # (expires_at, flow_id); every save pushes a new entry and
+        # entries whose flow was deleted or refreshed are skipped
+        # when popped (lazy deletion)
+        self._heap: List[Tuple[int, str]] = []
+        self._lock = RLock()
+
+    def _drop(self, user_id: str, flow_id: str) -> None:
+        user_flows = self._by_user.get(user_id)
+        if user_flows is not None:
+            user_flows.pop(flow_id, None)
+            if not user_flows:
+                self._by_user.pop(user_id, None)
+
+        entry = self._by_id.get(flow_id)
+        if entry is not None and entry[0] == user_id:
+            del self._by_id[flow_id]
+
+    def get(self, flow_id: str, now: int) -> Optional[Tuple[str, Flow]]:
+        with self._lock:
+            entry = self._by_id.get(flow_id)
+            if entry is None:
+                return None
+
+            if _expired(entry[1], now):
+                self._drop(entry[0], flow_id)
+                return None
+
+            return entry
+
+    def user_flows(self, user_id: str, now: int) -> List[Flow]:
+        with self._lock:
+            user_flows = self._by_user.get(user_id)
+            if not user_flows:
+                return []
+
+            for fid in [fid for fid, f in user_flows.items() if _expired(f, now)]:
+                self._drop(user_id, fid)
+
+            return list(self._by_user.get(user_id, {}).values())
+
+    def put(self, user_id: str, flow: Flow) -> None:
+        flow_id = flow.flow_id
+        with self._lock:
+            entry = self._by_id.get(flow_id)
+            stored = entry[1].version if entry is not None else None
+            if flow.version != stored:
+                raise FlowConflict(flow_id)
+
+            flow.version = (stored or 0) + 1
+
+            if entry is not None and entry[0] != user_id:
+                self._drop(entry[0], flow_id)
+
+            self._by_user.setdefault(user_id, {})[flow_id] = flow
+            self._by_id[flow_id] = (user_id, flow)
+
+            heapq.heappush(self._heap, (flow.expires_at, flow_id))
+
+            # Refreshes leave stale entries behind; rebuild when they dominate
+            if len(self._heap) > 2 * len(self._by_id) + 1024:
+                self._heap = [
+                    (f.expires_at, fid) for fid, (_, f) in self._by_id.items()
+                ]
+                heapq.heapify(self._heap)
+
+    def delete(self, user_id: str, flow_id: str) -> None:
+        with self._lock:
+            self._drop(user_id, flow_id)
+
+    def sweep(self, now: int, limit: int) -> int:
+        evicted = 0
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now and evicted < limit:
+                _, flow_id = heapq.heappop(heap)
+
+                entry = self._by_id.get(flow_id)
+                # Deleted, or refreshed (a newer heap entry exists)
+                if entry is None or not _expired(entry[1], now):
+                    continue
+
+                self._drop(entry[0], flow_id)
+                evicted += 1
+        return evicted
+
+    def next_expiry(self) -> Optional[int]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "live_flows": len(self._by_id),
+                "users": len(self._by_user),
+                "expiry_heap": len(self._heap),
+            }
+
+# ======================================================
+# SQLITE (shared across worker processes)
+# ======================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flows (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    flow_id    TEXT NOT NULL UNIQUE,
+    user_id    TEXT NOT NULL,
+    version    INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    body       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flows_user ON flows (user_id, seq);
+CREATE INDEX IF NOT EXISTS flows_expires ON flows (expires_at);
+"""
+
+
+class SQLiteFlowStore(FlowStore):
+    """
+    One row per flow, WAL mode, one connection per thread.
+    Every read returns a private copy of the flow.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _load(body: str, version: int) -> Flow:
+        flow = Flow.from_dict(json.loads(body))
+        flow.version = version
+        return flow
+
+    def get(self, flow_id: str, now: int) -> Optional[Tuple[str, Flow]]:
+        row = self._conn().execute(
+            "SELECT user_id, body, version FROM flows "
+            "WHERE flow_id = ? AND expires_at > ?",
+            (flow_id, now),
+        ).fetchone()
+        return None if row is None else (row[0], self._load(row[1], row[2]))
+
+    def user_flows(self, user_id: str, now: int) -> List[Flow]:
+        rows = self._conn().execute(
+            "SELECT body, version FROM flows "
+            "WHERE user_id = ? AND expires_at > ? ORDER BY seq",
+            (user_id, now),
+        )
+        return [self._load(body, version) for body, version in rows]
+
+    def put(self, user_id: str, flow: Flow) -> None:
+        flow_id = flow.flow_id
+        expected = flow.version
+        flow.version = (expected or 0) + 1
+        body = json.dumps(flow.to_dict(), separators=(",", ":"))
+
+        conn = self._conn()
+        try:
+            if expected is None:
+                try:
+                    conn.execute(
+                        "INSERT INTO flows (flow_id, user_id, version, expires_at, body) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (flow_id, user_id, flow.version, flow.expires_at, body),
+                    )
+                except sqlite3.IntegrityError:
+                    raise FlowConflict(flow_id)
+            else:
+                cur = conn.execute(
+                    "UPDATE flows SET user_id = ?, version = ?, expires_at = ?, body = ? "
+                    "WHERE flow_id = ? AND version = ?",
+                    (user_id, flow.version, flow.expires_at, body, flow_id, expected),
+                )
+                if cur.rowcount == 0:
+                    raise FlowConflict(flow_id)
+        except FlowConflict:
+            flow.version = expected
+            raise
+
+    def delete(self, user_id: str, flow_id: str) -> None:
+        self._conn().execute(
+            "DELETE FROM flows WHERE flow_id = ? AND user_id = ?",
+            (flow_id, user_id),
+        )
+
+    def sweep(self, now: int, limit: int) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM flows WHERE seq IN ("
+            "SELECT seq FROM flows WHERE expires_at <= ? LIMIT ?)",
+            (now, limit),
+        )
+        return cur.rowcount
+
+    def next_expiry(self) -> Optional[int]:
+        row = self._conn().execute("SELECT MIN(expires_at) FROM flows").fetchone()
+        return row[0]
+
+    def stats(self) -> dict:
+        live, users = self._conn().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT user_id) FROM flows"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "live_flows": live,
+            "users": users,
+        }
+
+
+def open_store(kind: str = None) -> FlowStore:
+    """
+    Backend selected by FLOW_STORE.
+    """
+    kind = kind or FLOW_STORE
+    if kind == "memory":
+        return MemoryFlowStore()
+    if kind == "sqlite":
+        return SQLiteFlowStore(FLOW_STORE_PATH)
+    raise ValueError(f"Unknown FLOW_STORE: {kind} (expected memory or sqlite)")
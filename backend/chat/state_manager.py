@@ -1,11 +1,21 @@
 # backend/chat/state_manager.py
 
+import asyncio
+import os
 import time
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional, List
+from threading import Lock, Thread
+from typing import Callable, Optional, List, Tuple
 
-from llm.orchestrator_llm import run_orchestrator
+from chat.flow_model import Flow, HistoryEntry
+from chat.flow_store import FlowConflict, open_store
+from audit.logger import log_event
+from llm.history import HISTORY_MAX_ENTRIES
+from llm.intent import INTENT_CAPTURE_MESSAGES, aclassify as aclassify_intent, classify as classify_intent
+from llm.orchestrator_llm import arun_orchestrator, run_orchestrator
 
 # ======================================================
 # CONFIGURATION
@@ -13,13 +23,23 @@ from llm.orchestrator_llm import run_orchestrator
 
 FLOW_TTL_SECONDS = 15 * 60  # 15 minutes expiry
 
-# In-memory store (single-node design)
-# {
-#   user_id: {
-#       flow_id: flow_dict
-#   }
-# }
-_FLOW_STORE: Dict[str, Dict[str, dict]] = {}
+# Upper bound on how long the sweeper sleeps between passes
+FLOW_SWEEP_INTERVAL = 5
+
+# Flows evicted per lock hold, so a mass expiry never stalls requests
+FLOW_SWEEP_BATCH = 1000
+
+# Read-modify-write attempts before giving up on a contended flow
+FLOW_CONFLICT_RETRIES = 5
+
+# Flow storage: in-process maps by default, or a store shared by all
+# worker processes (FLOW_STORE=sqlite). See chat.flow_store.
+_STORE = open_store()
+
+# The async chat path runs blocking storage calls here, off the event
+# loop and separate from the default threadpool
+CHAT_STORAGE_WORKERS = int(os.getenv("CHAT_STORAGE_WORKERS", "8"))
+_STORAGE_POOL = ThreadPoolExecutor(CHAT_STORAGE_WORKERS, thread_name_prefix="flow-storage")
 
 # ======================================================
 # INTERNAL HELPERS
@@ -34,64 +54,187 @@ def _today_str() -> str:
     return datetime.utcnow().strftime("%d/%m/%Y")
 
 
-def _ensure_runtime_fields(flow: dict) -> None:
+def _as_flow(flow) -> Flow:
     """
-    Self-heal all mandatory runtime fields.
-    This function GUARANTEES shape compatibility.
+    Flow for a Flow or a legacy flow dict.
+    Flow objects always have every runtime field, so only legacy
+    dicts need healing (id/flow_id, current_date, history, data, step).
     """
+    if isinstance(flow, Flow):
+        return flow
+    return Flow.from_dict(flow, today=_today_str())
 
-    # ---- flow_id / id compatibility (CRITICAL) ----
-    if "id" in flow and "flow_id" not in flow:
-        flow["flow_id"] = flow["id"]
-    elif "flow_id" in flow and "id" not in flow:
-        flow["id"] = flow["flow_id"]
 
-    # ---- Required runtime fields ----
-    if "current_date" not in flow:
-        flow["current_date"] = _today_str()
+def _put_flow(user_id: str, flow: Flow) -> None:
+    _STORE.put(user_id, flow)
+    _SWEEPER.start()
 
-    if "history" not in flow:
-        flow["history"] = []
 
-    if "data" not in flow:
-        flow["data"] = {}
+def _resolve(flow_id: str) -> Optional[Tuple[str, Flow]]:
+    """
+    (user_id, flow) for a live flow, in O(1).
+    """
+    return _STORE.get(flow_id, _now_ts())
+
 
-    if "step" not in flow:
-        flow["step"] = "collect"
+def _mutate(flow_id: str, change: Callable[[Flow], None], user_id: str = None) -> Optional[Flow]:
+    """
+    Apply change() to the current flow and save it, re-reading
+    and retrying when another worker saved first.
+    """
+    for _ in range(FLOW_CONFLICT_RETRIES):
+        entry = _resolve(flow_id)
+        if entry is None or (user_id is not None and entry[0] != user_id):
+            return None
 
+        owner, flow = entry
+        change(flow)
 
-def _cleanup_expired_flows(user_id: str) -> None:
+        try:
+            save_flow(owner, flow)
+            return flow
+        except FlowConflict:
+            continue
+
+    raise FlowConflict(flow_id)
+
+# ======================================================
+# EXPIRY SWEEPER
+# ======================================================
+
+def _sweep_expired(now: int, limit: int = FLOW_SWEEP_BATCH) -> int:
     """
-    Remove expired flows for a user.
+    Evict up to limit expired flows.
+    Returns how many were evicted.
     """
-    user_flows = _FLOW_STORE.get(user_id)
-    if not user_flows:
-        return
+    return _STORE.sweep(now, limit)
 
-    now = _now_ts()
-    expired_ids = [
-        fid for fid, f in user_flows.items()
-        if f.get("expires_at", 0) <= now
-    ]
 
-    for fid in expired_ids:
-        del user_flows[fid]
+class _Sweeper:
+    """
+    Background thread evicting flows as they expire, so abandoned
+    conversations do not hold memory until their user returns.
+    Started on first use.
+    """
 
-    if not user_flows:
-        _FLOW_STORE.pop(user_id, None)
+    def __init__(self):
+        self._thread = None
+        self._lock = Lock()
+        self.evicted_total = 0
+        # (monotonic time, evicted) per pass over the last minute
+        self._recent = deque()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name="flow-expiry-sweeper", daemon=True
+                )
+                self._thread.start()
+
+    def _record(self, evicted: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.evicted_total += evicted
+            self._recent.append((now, evicted))
+            while self._recent and self._recent[0][0] < now - 60:
+                self._recent.popleft()
+
+    def evictions_per_sec(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(n for t, n in self._recent if t >= now - 60)
+        return recent / 60
+
+    def _run(self) -> None:
+        while True:
+            evicted = 0
+            while True:
+                batch = _sweep_expired(_now_ts())
+                evicted += batch
+                if batch < FLOW_SWEEP_BATCH:
+                    break
+            if evicted:
+                self._record(evicted)
+
+            next_expiry = _STORE.next_expiry()
+
+            delay = FLOW_SWEEP_INTERVAL
+            if next_expiry is not None:
+                delay = min(delay, max(0.0, next_expiry - time.time()) + 0.01)
+            time.sleep(delay)
+
+
+_SWEEPER = _Sweeper()
+
+
+def flow_stats() -> dict:
+    """
+    Gauges for monitoring the flow store.
+    """
+    stats = _STORE.stats()
+    stats["evicted_total"] = _SWEEPER.evicted_total
+    stats["evictions_per_sec"] = round(_SWEEPER.evictions_per_sec(), 3)
+    return stats
 
 # ======================================================
 # PUBLIC API
 # ======================================================
 
-def create_flow(user_id: str, message: str, request_id: str) -> Optional[dict]:
+def create_flow(user_id: str, message: str, request_id: str) -> Optional[Flow]:
     """
     Create a NEW flow.
-    Orchestrator is called ONLY here.
+    Orchestrator is called ONLY here, and only when the local
+    intent classifier is not confident (llm.intent).
+    """
+
+    decision = classify_intent(message)
+    if decision is not None:
+        decision["source"] = "classifier"
+    else:
+        decision = dict(run_orchestrator(message), source="orchestrator")
+    return _open_flow(user_id, message, request_id, decision)
+
+
+async def acreate_flow(user_id: str, message: str, request_id: str) -> Optional[Flow]:
+    """
+    Async create_flow.
     """
+    decision = await aclassify_intent(message)
+    if decision is not None:
+        decision["source"] = "classifier"
+    else:
+        decision = dict(await arun_orchestrator(message), source="orchestrator")
+    return await run_storage(_open_flow, user_id, message, request_id, decision)
+
+
+def _open_flow(user_id: str, message: str, request_id: str, decision: dict) -> Optional[Flow]:
+    flow = _flow_for(user_id, decision)
+
+    after = {
+        "route": decision.get("route"),
+        "confidence": decision.get("confidence"),
+        "source": decision["source"],
+    }
+    if INTENT_CAPTURE_MESSAGES:
+        # Opt-in training data for llm.intent (train --audit)
+        after["message"] = message[:500]
+
+    log_event(
+        request_id=request_id,
+        actor_id=user_id,
+        actor_role="user",
+        action="FLOW_ROUTED",
+        entity_type="flow",
+        entity_id=flow.flow_id if flow is not None else None,
+        after=after,
+    )
+    return flow
 
-    decision = run_orchestrator(message)
 
+def _flow_for(user_id: str, decision: dict) -> Optional[Flow]:
     if decision.get("confidence", 0.0) < 0.6:
         return None
 
@@ -108,75 +251,56 @@ def create_flow(user_id: str, message: str, request_id: str) -> Optional[dict]:
 
     flow_id = f"flow-{uuid.uuid4().hex[:8]}"
 
-    flow = {
-        "id": flow_id,
-        "flow_id": flow_id,  
-        "user_id": user_id,
-        "type": flow_type,
-        "data": {},
-        "history": [],
-        "step": "collect",
-        "current_date": _today_str(),
-        "expires_at": _now_ts() + FLOW_TTL_SECONDS,
-    }
+    flow = Flow(
+        flow_id=flow_id,
+        user_id=user_id,
+        type=flow_type,
+        current_date=_today_str(),
+        expires_at=_now_ts() + FLOW_TTL_SECONDS,
+    )
 
-    _FLOW_STORE.setdefault(user_id, {})[flow_id] = flow
+    _put_flow(user_id, flow)
     return flow
 
 
-def get_active_flows(user_id: str) -> List[dict]:
+def get_active_flows(user_id: str) -> List[Flow]:
     """
     Return all active (non-expired) flows for a user.
     """
-    _cleanup_expired_flows(user_id)
-
-    flows = list(_FLOW_STORE.get(user_id, {}).values())
-    for f in flows:
-        _ensure_runtime_fields(f)
-
-    return flows
+    return _STORE.user_flows(user_id, _now_ts())
 
 
-def get_flow(user_id: str, flow_id: str) -> Optional[dict]:
+def get_flow(user_id: str, flow_id: str) -> Optional[Flow]:
     """
     Retrieve a specific flow.
-    Always self-heals runtime fields.
     """
-    _cleanup_expired_flows(user_id)
-
-    flow = _FLOW_STORE.get(user_id, {}).get(flow_id)
-    if not flow:
+    entry = _resolve(flow_id)
+    if entry is None or entry[0] != user_id:
         return None
 
-    _ensure_runtime_fields(flow)
-    return flow
+    return entry[1]
 
 
-def save_flow(user_id: str, flow: dict) -> None:
+def save_flow(user_id: str, flow) -> None:
     """
     Persist updated flow and refresh TTL.
+    Accepts a Flow or a legacy flow dict.
+    Raises FlowConflict if the flow was saved elsewhere since it was read.
     """
-    _ensure_runtime_fields(flow)
-    flow["expires_at"] = _now_ts() + FLOW_TTL_SECONDS
+    flow = _as_flow(flow)
+    flow.expires_at = _now_ts() + FLOW_TTL_SECONDS
 
-    _FLOW_STORE.setdefault(user_id, {})[flow["flow_id"]] = flow
+    _put_flow(user_id, flow)
 
 
 def delete_flow(user_id: str, flow_id: str) -> None:
     """
     Explicitly delete a flow.
     """
-    user_flows = _FLOW_STORE.get(user_id)
-    if not user_flows:
-        return
-
-    user_flows.pop(flow_id, None)
-
-    if not user_flows:
-        _FLOW_STORE.pop(user_id, None)
+    _STORE.delete(user_id, flow_id)
 
 
-def reset_flow(user_id: str, flow_id: str) -> Optional[dict]:
+def reset_flow(user_id: str, flow_id: str) -> Optional[Flow]:
     """
     Full rejection reset:
     - Deletes existing flow
@@ -192,19 +316,15 @@ def reset_flow(user_id: str, flow_id: str) -> Optional[dict]:
 
     new_flow_id = f"flow-{uuid.uuid4().hex[:8]}"
 
-    new_flow = {
-        "id": new_flow_id,
-        "flow_id": new_flow_id,
-        "user_id": user_id, 
-        "type": flow_type,
-        "data": {},
-        "history": [],
-        "step": "collect",
-        "current_date": _today_str(),
-        "expires_at": _now_ts() + FLOW_TTL_SECONDS,
-    }
+    new_flow = Flow(
+        flow_id=new_flow_id,
+        user_id=user_id,
+        type=flow_type,
+        current_date=_today_str(),
+        expires_at=_now_ts() + FLOW_TTL_SECONDS,
+    )
 
-    _FLOW_STORE.setdefault(user_id, {})[new_flow_id] = new_flow
+    _put_flow(user_id, new_flow)
     return new_flow
 
 
@@ -225,48 +345,66 @@ def append_history(*args) -> None:
     elif len(args) == 3:
         flow_id, role, content = args
 
-        # Find owning user deterministically
-        user_id = None
-        for uid, flows in _FLOW_STORE.items():
-            if flow_id in flows:
-                user_id = uid
-                break
-
-        if user_id is None:
+        entry = _resolve(flow_id)
+        if entry is None:
             return
+        user_id = entry[0]
 
     else:
         return
 
-    flow = get_flow(user_id, flow_id)
-    if not flow:
-        return
-
-    flow["history"].append({
-        "role": role,
-        "content": content
-    })
-
-    save_flow(user_id, flow)
-
-def update_flow_data(flow_id: str, updates: dict):
-    for flow in _FLOW_STORE.values():
-        if flow.get("flow_id") == flow_id:
-            flow["data"].update(updates)
-            return
-
+    def change(flow: Flow) -> None:
+        history = flow.history
+        history.append(HistoryEntry(role, content))
+        # Prompts only use the recent window (llm.history), which folds
+        # every user answer: only assistant turns may go
+        excess = len(history) - HISTORY_MAX_ENTRIES
+        if excess > 0:
+            kept = []
+            for h in history:
+                if excess and h.role != "user":
+                    excess -= 1
+                else:
+                    kept.append(h)
+            history[:] = kept
+
+    _mutate(flow_id, change, user_id=user_id)
+
+def update_flow_data(flow_id: str, updates: dict) -> None:
+    """
+    Merge collected fields into a flow's data.
+    """
+    _mutate(flow_id, lambda flow: flow.data.update(updates))
 
 
-def update_flow_step(user_id: str, flow_id: str, step: str) -> None:
+def update_flow_step(*args) -> None:
     """
     Update the flow step safely.
+
+    Supported signatures:
+    1) update_flow_step(user_id, flow_id, step)
+    2) update_flow_step(flow_id, step)   # legacy
     """
-    flow = get_flow(user_id, flow_id)
-    if not flow:
+    if len(args) == 3:
+        user_id, flow_id, step = args
+    elif len(args) == 2:
+        user_id = None
+        flow_id, step = args
+    else:
         return
 
     if not isinstance(step, str):
         return
 
-    flow["step"] = step
-    save_flow(user_id, flow)
\ No newline at end of file
+    def change(flow: Flow) -> None:
+        flow["step"] = step   # interned
+
+    _mutate(flow_id, change, user_id=user_id)
+
+
+async def run_storage(fn: Callable, *args):
+    """
+    await fn(*args) on the storage executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_STORAGE_POOL, fn, *args)
@@ -0,0 +1,119 @@
+# backend/chat/user_queue.py
+#
+# Per-user serialization of chat requests (the async chat routes).
+#
+# Requests of one user run one at a time, in arrival order, so two
+# quick messages can no longer both see "no active flow" and both call
+# the orchestrator. Different users never wait on each other.
+#
+# A request whose key equals one already queued or running for the
+# same user (a client retry; chat.controller keys by Idempotency-Key)
+# is coalesced: it waits for that request and returns the same result
+# instead of running again. The
+# shared work runs in its own task, so a request that is cancelled
+# (client gone) only stops it when nobody else is waiting on it.
+#
+# Each user may have at most CHAT_MAX_PENDING_PER_USER requests queued
+# or running; beyond that UserBusy is raised (the controller answers
+# 429). A waiting request is a suspended coroutine, so the limit only
+# bounds how much work one user can queue.
+#
+# Serialization is per process: with several workers and a shared
+# flow store, sticky routing by user keeps the ordering guarantee.
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Hashable
+
+CHAT_MAX_PENDING_PER_USER = int(os.getenv("CHAT_MAX_PENDING_PER_USER", "4"))
+
+
+class UserBusy(Exception):
+    """
+    Too many requests queued for one user.
+    """
+
+
+class _AsyncUserSlot:
+    __slots__ = ("lock", "pending", "inflight")
+
+    def __init__(self):
+        # asyncio.Lock wakes waiters in FIFO order
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.inflight: Dict[Hashable, "_SharedCall"] = {}
+
+
+class _SharedCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+def _consume(fut: asyncio.Future) -> None:
+    # Nobody may be waiting on a shared call: don't warn about
+    # an exception that was never retrieved
+    if not fut.cancelled():
+        fut.exception()
+
+
+class AsyncUserQueue:
+    def __init__(self, max_pending: int = None):
+        self.max_pending = max_pending or CHAT_MAX_PENDING_PER_USER
+        self._users: Dict[str, _AsyncUserSlot] = {}
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def run(self, user_id: str, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        await fn() after every earlier request of user_id.
+        Requests with an equal key that are already in flight
+        share its result (or exception).
+        """
+        slot = self._users.get(user_id)
+        if slot is None:
+            slot = self._users[user_id] = _AsyncUserSlot()
+
+        call = slot.inflight.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            if slot.pending >= self.max_pending:
+                self.rejected += 1
+                raise UserBusy(user_id)
+
+            # Tasks start in creation order, so the lock keeps arrival order
+            task = asyncio.ensure_future(self._serve(user_id, slot, key, fn))
+            task.add_done_callback(_consume)
+            call = slot.inflight[key] = _SharedCall(task)
+            slot.pending += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def _serve(self, user_id: str, slot: _AsyncUserSlot, key: Hashable, fn):
+        try:
+            async with slot.lock:
+                return await fn()
+        finally:
+            del slot.inflight[key]
+            slot.pending -= 1
+            if slot.pending == 0 and self._users.get(user_id) is slot:
+                del self._users[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "users_active": len(self._users),
+            "pending": sum(s.pending for s in self._users.values()),
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 
 from auth import get_current_user
-from utils.json_store import read_json, write_json
+from lock import LOCKS
+from utils.collection import EQUIPMENT
 from audit import log_event
 from rules.equipment_rules import secret_expired, request_expired
 
@@ -24,61 +25,55 @@ def approve_equipment_by_secret(
     if not secret_code:
         raise HTTPException(status_code=400, detail="Secret code required")
 
-    equipment = read_json("equipment.json")
     now = datetime.utcnow()
 
-    # 🔍 Find matching pending request
-    item = next(
-        (
-            e for e in equipment
-            if e.get("status") == "pending_approval"
-            and e.get("secret_code") == secret_code
-        ),
-        None
-    )
-
-    if not item:
-        raise HTTPException(
-            status_code=404,
-            detail="No pending equipment found for this secret"
+    # Exclusive lock across find → approve → write: two admins using
+    # the same secret can no longer both approve the request
+    with LOCKS.write("equipment.json"):
+        # 🔍 Find matching pending request (indexed lookup)
+        item = EQUIPMENT.find_one(
+            status="pending_approval",
+            secret_code=secret_code
         )
 
-    # ⏱️ Hard expiry (40 min)
-    if request_expired(item["requested_at"]):
-        item.update({
-            "status": "available",
-            "requested_by": None,
+        if not item:
+            raise HTTPException(
+                status_code=404,
+                detail="No pending equipment found for this secret"
+            )
+
+        # ⏱️ Hard expiry (40 min)
+        if request_expired(item["requested_at"]):
+            EQUIPMENT.update(item["equipment_id"], {
+                "status": "available",
+                "requested_by": None,
+                "secret_code": None,
+                "secret_expires_at": None,
+                "requested_at": None
+            })
+
+            raise HTTPException(
+                status_code=410,
+                detail="Request expired"
+            )
+
+        # ⏳ Secret expiry (20 min)
+        if secret_expired(item["secret_expires_at"]):
+            raise HTTPException(
+                status_code=410,
+                detail="Secret expired"
+            )
+
+        # ✅ APPROVE & ASSIGN
+        item = EQUIPMENT.update(item["equipment_id"], {
+            "status": "assigned",
+            "assigned_to": item["requested_by"],
+            "approved_by": user["id"],
+            "approved_at": now.isoformat(),
             "secret_code": None,
-            "secret_expires_at": None,
-            "requested_at": None
+            "secret_expires_at": None
         })
 
-        write_json("equipment.json", equipment)
-
-        raise HTTPException(
-            status_code=410,
-            detail="Request expired"
-        )
-
-    # ⏳ Secret expiry (20 min)
-    if secret_expired(item["secret_expires_at"]):
-        raise HTTPException(
-            status_code=410,
-            detail="Secret expired"
-        )
-
-    # ✅ APPROVE & ASSIGN
-    item.update({
-        "status": "assigned",
-        "assigned_to": item["requested_by"],
-        "approved_by": user["id"],
-        "approved_at": now.isoformat(),
-        "secret_code": None,
-        "secret_expires_at": None
-    })
-
-    write_json("equipment.json", equipment)
-
     log_event(
         user["id"],
         "EQUIPMENT_APPROVED",
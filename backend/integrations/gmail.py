@@ -1,13 +1,13 @@
 import base64
-import requests
 from email.message import EmailMessage
 from config import settings
+from utils.http_client import session, timeout
 
 TOKEN_URL = "https://oauth2.googleapis.com/token"
 SEND_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
 
 def _get_access_token():
-    resp = requests.post(
+    resp = session("gmail").post(
         TOKEN_URL,
         data={
             "client_id": settings.GMAIL_CLIENT_ID,
@@ -15,7 +15,7 @@ def _get_access_token():
             "refresh_token": settings.GMAIL_REFRESH_TOKEN,
             "grant_type": "refresh_token"
         },
-        timeout=10
+        timeout=timeout(10)
     )
     resp.raise_for_status()
     return resp.json()["access_token"]
@@ -30,13 +30,13 @@ def send_email(to: str, subject: str, body: str):
     raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
     token = _get_access_token()
 
-    resp = requests.post(
+    resp = session("gmail").post(
         SEND_URL,
         headers={
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         },
         json={"raw": raw},
-        timeout=10
+        timeout=timeout(10)
     )
     resp.raise_for_status()
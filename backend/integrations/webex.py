@@ -1,5 +1,5 @@
-import requests
 from config import settings
+from utils.http_client import session, timeout
 
 WEBEX_API_URL = "https://webexapis.com/v1/meetings"
 
@@ -31,11 +31,11 @@ def create_webex_meeting(
         "meetingType": "meetingCenter",  # IMPORTANT for bots/accounts
     }
 
-    resp = requests.post(
+    resp = session("webex").post(
         WEBEX_API_URL,
         headers=headers,
         json=payload,
-        timeout=15
+        timeout=timeout(15)
     )
 
     if not resp.ok:
@@ -0,0 +1,436 @@
+# backend/llm/aclient.py
+#
+# asyncio Ollama client for the async chat path.
+#
+# A waiting LLM call is a suspended coroutine instead of a blocked
+# thread, so one worker can hold thousands of chats waiting on the
+# model. Minimal HTTP/1.1 over asyncio streams (stdlib only): JSON
+# POSTs, Content-Length or chunked responses, keep-alive connections
+# reused per host.
+#
+#   OLLAMA_MAX_CONNECTIONS  concurrent requests to Ollama (default 256);
+#                           further calls wait in the event loop
+#   OLLAMA_POOL_IDLE        idle keep-alive connections kept (default 256)
+#   LLM_BATCH_WINDOW_MS     micro-batching window for batch=True calls
+#                           (default 0: off)
+#   LLM_BATCH_MAX           requests released per batch, and in flight per
+#                           model from batch=True calls (default 4, match
+#                           the server's OLLAMA_NUM_PARALLEL)
+#
+# Identical in-flight requests share one upstream call, as in
+# llm.client (LLM_SINGLE_FLIGHT).
+
+import asyncio
+import json
+import os
+import ssl
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from llm import client
+from llm.endpoints import UpstreamHTTPError
+from llm.scheduler import aslot
+from utils.http_client import HTTP_CONNECT_TIMEOUT
+
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "256"))
+OLLAMA_POOL_IDLE = int(os.getenv("OLLAMA_POOL_IDLE", "256"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "0"))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "4"))
+
+READ_TIMEOUT = 120
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _Pool:
+    """
+    Idle keep-alive connections by (scheme, host, port).
+    Bound to the event loop that created it.
+    """
+
+    def __init__(self):
+        self._idle: Dict[Tuple[str, str, int], List[_Connection]] = {}
+        self.slots = asyncio.Semaphore(OLLAMA_MAX_CONNECTIONS)
+        # flight_key → task of the upstream call
+        self.in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.batchers: Dict[str, "_Batcher"] = {}
+
+    async def acquire(self, key) -> Tuple[_Connection, bool]:
+        """
+        (connection, reused)
+        """
+        idle = self._idle.get(key)
+        while idle:
+            conn = idle.pop()
+            if not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port, ssl=ssl.create_default_context() if scheme == "https" else None
+            ),
+            HTTP_CONNECT_TIMEOUT,
+        )
+        return _Connection(reader, writer), False
+
+    def release(self, key, conn: _Connection) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < OLLAMA_POOL_IDLE:
+            idle.append(conn)
+        else:
+            conn.close()
+
+
+_pools: Dict[asyncio.AbstractEventLoop, _Pool] = {}
+
+
+def _pool() -> _Pool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        # Drop pools of closed loops (tests, benchmarks)
+        for old in [l for l in _pools if l.is_closed()]:
+            del _pools[old]
+        pool = _pools[loop] = _Pool()
+    return pool
+
+# ======================================================
+# HTTP
+# ======================================================
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed before response")
+
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+class Unreachable(ConnectionError):
+    """
+    No connection to the endpoint could be made: nothing was sent,
+    so the request may go to another endpoint.
+    """
+
+
+def _timed(aw):
+    # Same per-read timeout as the blocking client
+    return asyncio.wait_for(aw, READ_TIMEOUT)
+
+
+async def _iter_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> AsyncIterator[bytes]:
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await _timed(reader.readline())).split(b";")[0], 16)
+            if size == 0:
+                # trailers, then the blank line
+                while (await _timed(reader.readline())) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            yield await _timed(reader.readexactly(size))
+            await _timed(reader.readexactly(2))
+
+    elif "content-length" in headers:
+        yield await _timed(reader.readexactly(int(headers["content-length"])))
+
+    else:
+        while True:
+            data = await _timed(reader.read(65536))
+            if not data:
+                return
+            yield data
+
+
+class _Response:
+    def __init__(self, pool: _Pool, key, conn: _Connection, status: int, headers: Dict[str, str]):
+        self.status = status
+        self.headers = headers
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        done = False
+        try:
+            async for chunk in _iter_body(self._conn.reader, self.headers):
+                yield chunk
+            done = True
+        finally:
+            self._finish(done)
+
+    async def read(self) -> bytes:
+        return b"".join([c async for c in self.chunks()])
+
+    def _finish(self, complete: bool) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        reusable = (
+            complete
+            and self.headers.get("connection", "").lower() != "close"
+            and ("content-length" in self.headers or "transfer-encoding" in self.headers)
+        )
+        if reusable:
+            self._pool.release(self._key, conn)
+        else:
+            conn.close()
+
+
+async def _post(url: str, payload: dict) -> _Response:
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    host = parts.hostname
+    port = parts.port or (443 if scheme == "https" else 80)
+    key = (scheme, host, port)
+
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"POST {parts.path or '/'} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        "Content-Type: application/json\r\n"
+        "Accept: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n"
+    ).encode("latin-1")
+
+    pool = _pool()
+    # A pooled connection may have been closed by the server while
+    # idle; that is only noticed on use, so retry once on a new one
+    for attempt in (0, 1):
+        try:
+            conn, reused = await pool.acquire(key)
+        except (OSError, asyncio.TimeoutError) as e:
+            # Refused, DNS failure, connect timeout
+            raise Unreachable(f"cannot connect to {parts.netloc}: {e!r}") from e
+        try:
+            conn.writer.write(head + body)
+            await conn.writer.drain()
+            status, headers = await _timed(_read_head(conn.reader))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            conn.close()
+            if reused and attempt == 0:
+                continue
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        return _Response(pool, key, conn, status, headers)
+
+
+# ======================================================
+# OLLAMA
+# ======================================================
+
+def _check(status: int, body: bytes) -> None:
+    if status >= 400:
+        raise UpstreamHTTPError(
+            status, f"Ollama HTTP {status}: {body[:200].decode('utf-8', 'replace')}"
+        )
+
+
+class _Batcher:
+    """
+    Micro-batching for one model: calls arriving within
+    LLM_BATCH_WINDOW_MS of each other are released together, so they
+    land in the model's parallel slots in the same scheduling step
+    instead of trickling in. At most LLM_BATCH_MAX released calls run
+    at once; the rest wait here for one to finish.
+    """
+
+    def __init__(self):
+        self._pending: List[Tuple[str, dict, Hashable, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = 0
+
+    def submit(self, path: str, payload: dict, affinity: Hashable = None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((path, payload, affinity, future))
+
+        if len(self._pending) >= LLM_BATCH_MAX:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(LLM_BATCH_WINDOW_MS / 1e3, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        room = LLM_BATCH_MAX - self._running
+        if room <= 0 or not self._pending:
+            # Released as running calls finish
+            return
+
+        batch, self._pending = self._pending[:room], self._pending[room:]
+        self._running += len(batch)
+        _flight_counts["batches"] += 1
+        for path, payload, affinity, future in batch:
+            task = asyncio.ensure_future(_generate(path, payload, affinity))
+            task.add_done_callback(lambda t, f=future: self._finished(f, t))
+
+    def _finished(self, future: asyncio.Future, task: asyncio.Task) -> None:
+        self._running -= 1
+        _settle(future, task)
+        if self._pending and self._timer is None:
+            self._flush()
+
+
+def _settle(future: asyncio.Future, task: asyncio.Task) -> None:
+    if future.done():
+        # The caller went away
+        _consume(task)
+    elif task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def _consume(task: asyncio.Task) -> None:
+    # Every waiter may have gone away: retrieve the outcome so asyncio
+    # does not log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+_flight_counts = {"upstream": 0, "shared": 0, "batches": 0}
+
+
+def flight_stats() -> dict:
+    """
+    Upstream calls made vs requests that joined an identical one,
+    and micro-batches released.
+    """
+    return dict(_flight_counts)
+
+
+async def aollama_generate(
+    *,
+    model: str,
+    prompt: str = None,
+    messages: list = None,
+    batch: bool = False,
+    affinity: Hashable = None,
+) -> str:
+    """
+    Async ollama_generate.
+    batch=True goes through the model's micro-batching window when
+    LLM_BATCH_WINDOW_MS is set.
+    """
+    path, payload = client.request_for(model, prompt, messages, stream=False)
+    pool = _pool()
+
+    def send():
+        if batch and LLM_BATCH_WINDOW_MS > 0:
+            batcher = pool.batchers.get(model)
+            if batcher is None:
+                batcher = pool.batchers[model] = _Batcher()
+            return batcher.submit(path, payload, affinity)
+        return _generate(path, payload, affinity)
+
+    if not client.LLM_SINGLE_FLIGHT:
+        return await send()
+
+    # The call runs as its own task: a caller that goes away does not
+    # cancel it for the others waiting on the same result
+    key = client.flight_key(path, payload)
+    task = pool.in_flight.get(key)
+    if task is None:
+        _flight_counts["upstream"] += 1
+        task = pool.in_flight[key] = asyncio.ensure_future(send())
+        task.add_done_callback(lambda t: pool.in_flight.pop(key, None))
+        task.add_done_callback(_consume)
+    else:
+        _flight_counts["shared"] += 1
+    return await asyncio.shield(task)
+
+
+async def _generate(path: str, payload: dict, affinity: Hashable = None) -> str:
+    model = payload["model"]
+    endpoints = client.endpoint_pool()
+    tried = []
+
+    async with aslot(model), _pool().slots:
+        while True:
+            try:
+                with endpoints.use(model, affinity, tried) as endpoint:
+                    resp = await _post(endpoint.url + path, payload)
+                    body = await resp.read()
+                    _check(resp.status, body)
+                break
+            except Unreachable:
+                # Nothing was sent: try another endpoint once. A read
+                # timeout is not retried (the generation may be running)
+                tried.append(endpoint)
+                if len(tried) > 1 or not endpoints.alternatives(model, tried):
+                    raise
+
+    data = json.loads(body)
+
+    if "message" in data:
+        return data["message"]["content"]
+    return data.get("response", "")
+
+
+async def aollama_stream(
+    *,
+    model: str,
+    prompt: str = None,
+    messages: list = None,
+    affinity: Hashable = None,
+) -> AsyncIterator[str]:
+    """
+    Async ollama_stream: completion pieces as Ollama produces them.
+    """
+    path, payload = client.request_for(model, prompt, messages, stream=True)
+
+    async with aslot(model), _pool().slots:
+        with client.endpoint_pool().use(model, affinity) as endpoint:
+            resp = await _post(endpoint.url + path, payload)
+            chunks = resp.chunks()
+            try:
+                if resp.status >= 400:
+                    _check(resp.status, b"".join([c async for c in chunks]))
+
+                buffer = b""
+                async for chunk in chunks:
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b"\n")
+                    for line in lines:
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+
+                        if "error" in data:
+                            raise RuntimeError(f"Ollama error: {data['error']}")
+
+                        if "message" in data:
+                            piece = data["message"].get("content", "")
+                        else:
+                            piece = data.get("response", "")
+                        if piece:
+                            yield piece
+            finally:
+                await chunks.aclose()
@@ -0,0 +1,310 @@
+# backend/llm/cache.py
+#
+# Response cache for single-shot LLM calls (orchestrator, ticket model).
+#
+# Entries are addressed by (model name, Modelfile hash, normalized
+# prompt), so editing a Modelfile invalidates its model's entries and
+# "Wifi not working!" hits the entry of "wifi not working".
+#
+#   memory tier  per-model LRU with TTL
+#   disk tier    optional SQLite file shared by every worker and kept
+#                across restarts (LLM_CACHE_PATH)
+#
+# Only successfully parsed model results are stored; callers never put
+# their fallback dicts. Values are kept as JSON text, so every hit is a
+# private copy.
+#
+# Coroutines use acache_for() and aget()/aput(): the memory tier is
+# read on the event loop; opening the disk tier, hashing the Modelfile
+# and disk tier reads and writes run on a small executor of its own.
+#
+#   LLM_CACHE              on | off (default on)
+#   LLM_CACHE_SIZE         entries per model in memory (default 1024)
+#   LLM_CACHE_TTL_SECONDS  entry lifetime, both tiers (default 3600)
+#   LLM_CACHE_PATH         SQLite file for the disk tier (default: none)
+#   LLM_CACHE_DISK_WORKERS threads for async disk tier access (default 4)
+#   LLM_MODELFILE_DIR      where <name>.Modelfile live (default ollama_models/)
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+LLM_CACHE = os.getenv("LLM_CACHE", "on") == "on"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_WORKERS = int(os.getenv("LLM_CACHE_DISK_WORKERS", "4"))
+LLM_MODELFILE_DIR = os.getenv(
+    "LLM_MODELFILE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "ollama_models"),
+)
+
+_EDGE_PUNCT = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    NFKC, case-folded, whitespace collapsed, surrounding punctuation
+    dropped ("  Hi!! " -> "hi").
+    """
+    text = " ".join(unicodedata.normalize("NFKC", prompt).casefold().split())
+    return _EDGE_PUNCT.sub("", text) or text
+
+
+def modelfile_hash(model: str) -> str:
+    """
+    sha256 of the model's Modelfile ("ticket-model" -> ticket.Modelfile),
+    or "" when it is not on disk.
+    """
+    name = model[:-len("-model")] if model.endswith("-model") else model
+    try:
+        with open(os.path.join(LLM_MODELFILE_DIR, f"{name}.Modelfile"), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+# ======================================================
+# DISK TIER
+# ======================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires_at);
+"""
+
+
+class _DiskTier:
+    """
+    One row per entry, WAL mode, one connection per thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        (value, expires_at) of a live entry.
+        """
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def put(self, key: str, model: str, value: str, expires_at: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, model, value, expires_at),
+        )
+
+
+# Disk tier calls from coroutines; chat.state_manager's storage
+# executor is not importable from llm (it imports the llm modules)
+_DISK_POOL = ThreadPoolExecutor(LLM_CACHE_DISK_WORKERS, thread_name_prefix="llm-cache")
+
+
+async def _on_disk_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DISK_POOL, fn, *args)
+
+# ======================================================
+# PER-MODEL CACHE
+# ======================================================
+
+class ModelCache:
+    def __init__(
+        self,
+        model: str,
+        size: int = None,
+        ttl: int = None,
+        disk: Optional[_DiskTier] = None,
+    ):
+        self.model = model
+        self.size = size or LLM_CACHE_SIZE
+        self.ttl = LLM_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.version = modelfile_hash(model)
+        self._disk = disk
+
+        # key → (json value, expires_at wall time)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def key(self, prompt: str) -> str:
+        raw = "\0".join((self.model, self.version, normalize_prompt(prompt)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str) -> Optional[dict]:
+        key = self.key(prompt)
+        value = self._from_memory(key)
+        if value is not None:
+            return value
+
+        entry = self._disk.get(key) if self._disk is not None else None
+        return self._from_disk(key, entry)
+
+    async def aget(self, prompt: str) -> Optional[dict]:
+        """
+        get() for coroutines.
+        """
+        key = self.key(prompt)
+        value = self._from_memory(key)
+        if value is not None:
+            return value
+
+        entry = await _on_disk_pool(self._disk.get, key) if self._disk is not None else None
+        return self._from_disk(key, entry)
+
+    def put(self, prompt: str, value: dict) -> None:
+        """
+        Store a successfully parsed result.
+        """
+        key, entry = self._store(prompt, value)
+        if self._disk is not None:
+            self._disk.put(key, self.model, *entry)
+
+    async def aput(self, prompt: str, value: dict) -> None:
+        """
+        put() for coroutines.
+        """
+        key, entry = self._store(prompt, value)
+        if self._disk is not None:
+            await _on_disk_pool(self._disk.put, key, self.model, *entry)
+
+    def _from_memory(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[0])
+                del self._memory[key]
+        return None
+
+    def _from_disk(self, key: str, entry: Optional[Tuple[str, float]]) -> Optional[dict]:
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return json.loads(entry[0])
+
+    def _store(self, prompt: str, value: dict) -> Tuple[str, Tuple[str, float]]:
+        key = self.key(prompt)
+        entry = (json.dumps(value, separators=(",", ":")), time.time() + self.ttl)
+        with self._lock:
+            self.stores += 1
+            self._remember(key, entry)
+        return key, entry
+
+    def _remember(self, key: str, entry: Tuple[str, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# ======================================================
+# SHARED INSTANCES
+# ======================================================
+
+_caches: Dict[str, ModelCache] = {}
+_caches_lock = Lock()
+_disk: Optional[_DiskTier] = None
+
+
+def cache_for(model: str) -> Optional[ModelCache]:
+    """
+    Shared cache of a model, or None when LLM_CACHE=off.
+    """
+    global _disk
+
+    if not LLM_CACHE:
+        return None
+
+    cache = _caches.get(model)
+    if cache is not None:
+        return cache
+
+    with _caches_lock:
+        cache = _caches.get(model)
+        if cache is None:
+            if _disk is None and LLM_CACHE_PATH:
+                _disk = _DiskTier(LLM_CACHE_PATH)
+            cache = _caches[model] = ModelCache(model, disk=_disk)
+        return cache
+
+
+async def acache_for(model: str) -> Optional[ModelCache]:
+    """
+    cache_for() for coroutines: the first call for a model is built
+    off the event loop.
+    """
+    if not LLM_CACHE:
+        return None
+    cache = _caches.get(model)
+    if cache is not None:
+        return cache
+    return await _on_disk_pool(cache_for, model)
+
+
+def cache_stats() -> dict:
+    """
+    Per-model hit rates.
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {c.model: c.stats() for c in caches}
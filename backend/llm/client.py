@@ -1,27 +1,183 @@
+import json
+import os
+from threading import Event, Lock
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
 import requests
 
-OLLAMA_URL = "http://localhost:11434"
+from llm.endpoints import EndpointPool
+from llm.scheduler import slot
+from utils.http_client import session, timeout
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+
+# Several Ollama servers, see llm.endpoints (default: OLLAMA_URL alone)
+OLLAMA_ENDPOINTS = os.getenv("OLLAMA_ENDPOINTS", "")
+
+_endpoints: Optional[EndpointPool] = None
+
+
+def endpoint_pool() -> EndpointPool:
+    """
+    The shared EndpointPool, rebuilt if the configuration changed.
+    """
+    global _endpoints
+    spec = OLLAMA_ENDPOINTS or OLLAMA_URL
+    pool = _endpoints
+    if pool is None or pool.spec != spec:
+        pool = _endpoints = EndpointPool.from_spec(spec)
+    return pool
+
+
+def endpoint_stats() -> dict:
+    return endpoint_pool().stats()
+
+# Identical (model, prompt) requests already in flight share one
+# upstream call instead of each occupying the model (on | off)
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "on") == "on"
 
-def ollama_generate(*, model: str, prompt: str = None, messages: list = None):
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+_flights: Dict[Tuple[str, str], _Flight] = {}
+_flights_lock = Lock()
+_flight_counts = {"upstream": 0, "shared": 0}
+
+
+def flight_key(path: str, payload: dict) -> Tuple[str, str]:
+    return path, json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def request_for(model: str, prompt: Optional[str], messages: Optional[list], stream: bool):
+    """
+    (API path, JSON payload) of a generation; the endpoint is chosen
+    when it is sent.
+    """
     if messages is not None:
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": False,
-        }
-        url = f"{OLLAMA_URL}/api/chat"
-    else:
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-        }
-        url = f"{OLLAMA_URL}/api/generate"
-
-    resp = requests.post(url, json=payload, timeout=120)
-    resp.raise_for_status()
-    data = resp.json()
+        return "/api/chat", {"model": model, "messages": messages, "stream": stream}
+    return "/api/generate", {"model": model, "prompt": prompt, "stream": stream}
+
+
+def flight_stats() -> dict:
+    """
+    Upstream calls made vs requests that joined an identical one.
+    """
+    with _flights_lock:
+        return dict(_flight_counts, in_flight=len(_flights))
+
+
+def ollama_generate(
+    *,
+    model: str,
+    prompt: str = None,
+    messages: list = None,
+    affinity: Hashable = None,
+):
+    """
+    affinity: key (e.g. a flow id) whose requests should stay on one
+    endpoint, see llm.endpoints.
+    """
+    path, payload = request_for(model, prompt, messages, stream=False)
+
+    if not LLM_SINGLE_FLIGHT:
+        return _generate(path, payload, affinity)
+
+    key = flight_key(path, payload)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+            _flight_counts["upstream"] += 1
+        else:
+            _flight_counts["shared"] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _generate(path, payload, affinity)
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _generate(path: str, payload: dict, affinity: Hashable = None) -> str:
+    model = payload["model"]
+    pool = endpoint_pool()
+    tried = []
+
+    # Admission and priority between models: llm.scheduler
+    with slot(model):
+        while True:
+            try:
+                with pool.use(model, affinity, tried) as endpoint:
+                    # Generation has no side effects: safe to retry on 502/503/504
+                    resp = session("ollama", idempotent=True).post(
+                        endpoint.url + path, json=payload, timeout=timeout(120)
+                    )
+                    resp.raise_for_status()
+                    data = resp.json()
+                break
+            except requests.ConnectionError:
+                # Endpoint unreachable: nothing was generated, try another once
+                tried.append(endpoint)
+                if len(tried) > 1 or not pool.alternatives(model, tried):
+                    raise
 
     if "message" in data:
         return data["message"]["content"]
     return data.get("response", "")
+
+
+def ollama_stream(
+    *,
+    model: str,
+    prompt: str = None,
+    messages: list = None,
+    affinity: Hashable = None,
+) -> Iterator[str]:
+    """
+    Like ollama_generate, but yields the completion in pieces
+    as Ollama produces them.
+    """
+    path, payload = request_for(model, prompt, messages, stream=True)
+
+    with slot(model), endpoint_pool().use(model, affinity) as endpoint, session(
+        "ollama", idempotent=True
+    ).post(endpoint.url + path, json=payload, timeout=timeout(120), stream=True) as resp:
+        resp.raise_for_status()
+
+        # One JSON object per line, the last one has "done": true
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+
+            if "error" in data:
+                raise RuntimeError(f"Ollama error: {data['error']}")
+
+            if "message" in data:
+                piece = data["message"].get("content", "")
+            else:
+                piece = data.get("response", "")
+            if piece:
+                yield piece
+
+            if data.get("done"):
+                break
@@ -0,0 +1,277 @@
+# backend/llm/endpoints.py
+#
+# Several Ollama servers behind one client.
+#
+#   OLLAMA_ENDPOINTS="http://gpu1:11434=orchestrator-model,portal-model;http://gpu2:11434"
+#
+# Endpoints are separated by ";", each optionally followed by "=" and
+# the models it serves (none listed: every model). Unset, the client
+# talks to OLLAMA_URL alone, as before.
+#
+# Routing, per request:
+#   - among live endpoints serving the model, the one with the fewest
+#     requests outstanding from this process (ties rotate)
+#   - a request with an affinity key (the portal passes its flow id)
+#     goes back to the endpoint that served the key last, while that
+#     endpoint is within OLLAMA_AFFINITY_SLACK requests of the least
+#     loaded one: the conversation so far is still in that server's
+#     KV cache, so only the new turn needs prefilling
+#
+# Only transport errors (refused, reset, timed out) and 5xx answers
+# count as failures: a 4xx (unknown model, bad request) or an
+# unparsable body says nothing about the endpoint's health.
+#
+# Ejection: OLLAMA_EJECT_AFTER consecutive failures take an endpoint
+# out of rotation for OLLAMA_EJECT_SECONDS. It then gets traffic again,
+# and a single further failure ejects it again. With more than one
+# endpoint, a background thread also probes every endpoint
+# (GET /api/tags) each OLLAMA_HEALTH_INTERVAL seconds: a failed probe
+# ejects, a successful one reinstates. If every endpoint of a model is
+# ejected, the one due back first is used anyway.
+#
+# llm.scheduler limits are per process, not per endpoint: raise
+# LLM_CONCURRENCY to the total parallel slots of the pool.
+#
+#   OLLAMA_AFFINITY_SLACK   default 2
+#   OLLAMA_AFFINITY_SIZE    affinity keys remembered (default 10000)
+#   OLLAMA_EJECT_AFTER      default 3
+#   OLLAMA_EJECT_SECONDS    default 30
+#   OLLAMA_HEALTH_INTERVAL  default 10
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock, Thread
+from typing import Hashable, Iterable, List, Optional
+
+from utils.http_client import session, timeout
+
+OLLAMA_AFFINITY_SLACK = int(os.getenv("OLLAMA_AFFINITY_SLACK", "2"))
+OLLAMA_AFFINITY_SIZE = int(os.getenv("OLLAMA_AFFINITY_SIZE", "10000"))
+OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+
+
+class UpstreamHTTPError(RuntimeError):
+    """
+    An endpoint answered with an HTTP error status.
+    """
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+
+
+def endpoint_fault(exc: BaseException) -> bool:
+    """
+    Whether a failed request counts against the endpoint.
+    """
+    status = getattr(exc, "status", None)
+    if status is None:
+        # requests.HTTPError
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500
+    if isinstance(exc, ValueError):
+        # Unparsable body (requests' JSONDecodeError is also an OSError)
+        return False
+    return isinstance(exc, (OSError, asyncio.TimeoutError))
+
+
+class Endpoint:
+    __slots__ = ("url", "models", "outstanding", "served", "failures", "ejected_until", "ejections")
+
+    def __init__(self, url: str, models: Optional[Iterable[str]] = None):
+        self.url = url.rstrip("/")
+        self.models = frozenset(models) if models else None
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+
+def parse_endpoints(spec: str) -> List[Endpoint]:
+    """
+    "http://a:11434=m1,m2;http://b:11434" -> [Endpoint, ...]
+    """
+    endpoints = []
+    for item in spec.split(";"):
+        url, _, models = item.strip().partition("=")
+        if url:
+            names = [m.strip() for m in models.split(",") if m.strip()]
+            endpoints.append(Endpoint(url, names))
+    return endpoints
+
+
+class EndpointPool:
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.urls = [e.url for e in endpoints]
+        self.spec = ";".join(self.urls)
+
+        self._lock = Lock()
+        self._turn = 0
+        # affinity key → url of the endpoint that served it last
+        self._affinity: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._health = None
+
+        self.affinity_hits = 0
+        self.affinity_moves = 0
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "EndpointPool":
+        pool = cls(parse_endpoints(spec))
+        pool.spec = spec
+        return pool
+
+    # ---------- routing ----------
+
+    def pick(self, model: str, affinity: Hashable = None, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        """
+        Endpoint for one request; it counts as outstanding until
+        release(). Endpoints in exclude (already tried) are avoided
+        while others serve the model.
+        """
+        if len(self.endpoints) > 1:
+            self._start_health_checks()
+
+        now = time.monotonic()
+        with self._lock:
+            serving = [e for e in self.endpoints if e.serves(model)]
+            if not serving:
+                raise RuntimeError(f"No Ollama endpoint serves {model}")
+            serving = [e for e in serving if e not in exclude] or serving
+
+            live = [e for e in serving if e.ejected_until <= now]
+            if not live:
+                live = [min(serving, key=lambda e: e.ejected_until)]
+            least = min(e.outstanding for e in live)
+
+            chosen = None
+            if affinity is not None:
+                url = self._affinity.get(affinity)
+                pinned = next((e for e in live if e.url == url), None)
+                if pinned is not None and pinned.outstanding <= least + OLLAMA_AFFINITY_SLACK:
+                    chosen = pinned
+                    self.affinity_hits += 1
+                elif url is not None:
+                    self.affinity_moves += 1
+
+            if chosen is None:
+                ties = [e for e in live if e.outstanding == least]
+                chosen = ties[self._turn % len(ties)]
+                self._turn += 1
+
+            if affinity is not None:
+                self._affinity[affinity] = chosen.url
+                self._affinity.move_to_end(affinity)
+                while len(self._affinity) > OLLAMA_AFFINITY_SIZE:
+                    self._affinity.popitem(last=False)
+
+            chosen.outstanding += 1
+            return chosen
+
+    def release(self, endpoint: Endpoint, ok: Optional[bool]) -> None:
+        """
+        ok: the request succeeded (True), failed (False), or ended in a
+        way that says nothing about the endpoint (None): abandoned by the
+        caller, or failed for reasons of its own (see endpoint_fault).
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.failures = 0
+                endpoint.served += 1
+            elif ok is not None:
+                endpoint.failures += 1
+                if endpoint.failures >= OLLAMA_EJECT_AFTER:
+                    self._eject(endpoint)
+
+    @contextmanager
+    def use(self, model: str, affinity: Hashable = None, exclude: Iterable[Endpoint] = ()):
+        """
+        with pool.use(model) as endpoint: one request to endpoint.url.
+        """
+        endpoint = self.pick(model, affinity, exclude)
+        try:
+            yield endpoint
+        except Exception as e:
+            self.release(endpoint, False if endpoint_fault(e) else None)
+            raise
+        except BaseException:
+            self.release(endpoint, None)
+            raise
+        self.release(endpoint, True)
+
+    def alternatives(self, model: str, tried: Iterable[Endpoint]) -> bool:
+        """
+        Whether an endpoint outside tried serves model.
+        """
+        return any(e.serves(model) and e not in tried for e in self.endpoints)
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        # Lock held
+        if endpoint.ejected_until <= time.monotonic():
+            endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + OLLAMA_EJECT_SECONDS
+
+    # ---------- health checks ----------
+
+    def check(self) -> None:
+        """
+        Probe every endpoint once.
+        """
+        for endpoint in self.endpoints:
+            try:
+                resp = session("ollama-health").get(f"{endpoint.url}/api/tags", timeout=timeout(2))
+                healthy = resp.status_code == 200
+            except Exception:
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    endpoint.failures = 0
+                    endpoint.ejected_until = 0.0
+                else:
+                    endpoint.failures = max(endpoint.failures, OLLAMA_EJECT_AFTER)
+                    self._eject(endpoint)
+
+    def _start_health_checks(self) -> None:
+        if self._health is not None:
+            return
+        with self._lock:
+            if self._health is None:
+                self._health = Thread(target=self._run_health, name="ollama-health", daemon=True)
+                self._health.start()
+
+    def _run_health(self) -> None:
+        while True:
+            time.sleep(OLLAMA_HEALTH_INTERVAL)
+            self.check()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "endpoints": {
+                    e.url: {
+                        "outstanding": e.outstanding,
+                        "served": e.served,
+                        "failures": e.failures,
+                        "ejected": e.ejected_until > now,
+                        "ejections": e.ejections,
+                    }
+                    for e in self.endpoints
+                },
+                "affinity_hits": self.affinity_hits,
+                "affinity_moves": self.affinity_moves,
+            }
@@ -0,0 +1,110 @@
+# backend/llm/history.py
+#
+# Token-budgeted conversation window for LLM prompts.
+#
+# The last HISTORY_KEEP_TURNS turns go into the prompt verbatim. Older
+# turns are folded into one compact "collected so far" block:
+#   - the fields already in flow["data"]
+#   - the user's earlier answers (assistant questions are dropped;
+#     the model re-derives them from the Modelfile rules)
+# If the prompt is still over HISTORY_TOKEN_BUDGET, the verbatim window
+# shrinks from its oldest end: assistant turns leaving it are dropped,
+# user turns are folded. User answers are never dropped, so a long
+# enough conversation may exceed the budget. The latest turn is always
+# kept verbatim.
+#
+# Tokens are estimated at ~4 characters each; no tokenizer is needed
+# for a budget that only has to be roughly right.
+
+import json
+import os
+from typing import List, Optional
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "384"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+
+# Stored history entries per flow above which state_manager.append_history
+# drops the oldest assistant turns (user turns are always kept)
+HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "100"))
+
+# Longest folded answer kept, in characters
+FOLDED_ANSWER_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _turn(entry) -> str:
+    return f"{entry['role'].upper()}: {entry['content']}"
+
+
+def _collected_block(data: dict, answers: List[str]) -> Optional[str]:
+    if not data and not answers:
+        return None
+
+    lines = ["collected_so_far:"]
+    if data:
+        lines.append("  fields: " + json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+    for answer in answers:
+        lines.append(f"  - {answer}")
+    return "\n".join(lines)
+
+
+def _fold(entries) -> List[str]:
+    """
+    User answers from entries, oldest first, each kept once
+    (at its latest position).
+    """
+    answers = {}
+    for entry in entries:
+        if entry["role"] != "user":
+            continue
+        content = " ".join(str(entry["content"]).split())
+        if len(content) > FOLDED_ANSWER_CHARS:
+            content = content[:FOLDED_ANSWER_CHARS - 1] + "…"
+        answers.pop(content, None)
+        answers[content] = None
+    return list(answers)
+
+
+def build_prompt(
+    header: List[str],
+    flow: dict,
+    budget: int = None,
+    keep_turns: int = None,
+) -> str:
+    """
+    header lines + collected block + recent turns, within budget.
+    """
+    budget = HISTORY_TOKEN_BUDGET if budget is None else budget
+    keep_turns = HISTORY_KEEP_TURNS if keep_turns is None else keep_turns
+
+    history = list(flow.get("history") or ())
+    data = flow.get("data") or {}
+
+    split = max(0, len(history) - max(keep_turns, 1))
+    fixed = estimate_tokens("\n".join(header))
+
+    def window(split: int):
+        folded = _fold(history[:split])
+        recent = [_turn(h) for h in history[split:]]
+        total = fixed + sum(estimate_tokens(t) + 1 for t in recent)
+        block = _collected_block(data, folded)
+        if block is not None:
+            total += estimate_tokens(block) + 1
+        return folded, recent, total
+
+    folded, recent, total = window(split)
+
+    # Shrink the verbatim window: its user turns move into the fold
+    while total > budget and split < len(history) - 1:
+        split += 1
+        folded, recent, total = window(split)
+
+    parts = list(header)
+    block = _collected_block(data, folded)
+    if block is not None:
+        parts.append(block)
+    parts.extend(recent)
+    return "\n".join(parts)
@@ -0,0 +1,430 @@
+# backend/llm/intent.py
+#
+# Local intent pre-classifier in front of run_orchestrator.
+#
+# Messages are hashed into word 1-2 grams and character 3-grams
+# (normalized like llm.cache keys, so Hinglish spelling variants still
+# share features) and scored by a softmax linear model over the four
+# orchestrator routes. Pure Python: a prediction touches a few dozen
+# weights and takes well under a millisecond.
+#
+# classify() answers only when the top route's probability reaches
+# INTENT_THRESHOLD; everything else still goes to the orchestrator
+# model. Without a trained model file the classifier is off.
+#
+#   INTENT_CLASSIFIER   on | off (default on)
+#   INTENT_MODEL_PATH   trained model (default storage/intent_model.json)
+#   INTENT_THRESHOLD    minimum probability to skip the LLM (default 0.85)
+#   INTENT_CAPTURE_MESSAGES
+#                       on | off (default off). When on, FLOW_ROUTED audit
+#                       events also record the first 500 characters of the
+#                       user's message, for train --audit. The audit log is
+#                       permanent and shown to superusers: enable it only
+#                       where users' chat messages may be kept there.
+#
+# Training / evaluation CLI:
+#
+#   cd backend
+#   python -m llm.intent train [--examples data.jsonl ...] [--modelfile] [--audit]
+#                              [--holdout 0.2] [--out storage/intent_model.json]
+#   python -m llm.intent eval --examples heldout.jsonl
+#
+# Labeled examples are JSON lines {"text": ..., "route": ...}.
+# --modelfile adds the examples embedded in the orchestrator Modelfile;
+# --audit adds FLOW_ROUTED events decided by the orchestrator model;
+# only events recorded with INTENT_CAPTURE_MESSAGES=on carry the
+# message text needed for training.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import zlib
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from llm.cache import LLM_MODELFILE_DIR, normalize_prompt
+
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "on") == "on"
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join("storage", "intent_model.json"))
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.85"))
+INTENT_CAPTURE_MESSAGES = os.getenv("INTENT_CAPTURE_MESSAGES", "off") == "on"
+
+ROUTES = ("meeting_booking", "equipment_assignment", "tickets", "greeting_reply")
+
+FEATURE_BITS = 18
+
+Example = Tuple[str, str]   # (text, route)
+
+# ======================================================
+# FEATURES
+# ======================================================
+
+def features(text: str, bits: int = FEATURE_BITS) -> List[int]:
+    """
+    Hashed feature buckets of a message (each present once).
+    crc32 keeps buckets stable across processes.
+    """
+    mask = (1 << bits) - 1
+    text = normalize_prompt(text)
+    words = text.split()
+
+    grams = ["w:" + w for w in words]
+    grams += ["b:" + a + " " + b for a, b in zip(words, words[1:])]
+    padded = f" {text} "
+    grams += ["c:" + padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    return sorted({zlib.crc32(g.encode("utf-8")) & mask for g in grams})
+
+# ======================================================
+# MODEL
+# ======================================================
+
+class IntentModel:
+    """
+    Softmax regression over hashed binary features.
+    Only buckets seen in training carry weights.
+    """
+
+    def __init__(self, routes: Sequence[str] = ROUTES, bits: int = FEATURE_BITS):
+        self.routes = tuple(routes)
+        self.bits = bits
+        self.bias = [0.0] * len(self.routes)
+        self.weights: Dict[int, List[float]] = {}
+
+    def _scores(self, feats: List[int]) -> List[float]:
+        scores = list(self.bias)
+        if not feats:
+            return scores
+
+        scale = 1.0 / math.sqrt(len(feats))
+        weights = self.weights
+        for f in feats:
+            w = weights.get(f)
+            if w is not None:
+                for k, wk in enumerate(w):
+                    scores[k] += wk * scale
+        return scores
+
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        (route, probability)
+        """
+        probs = self._softmax(self._scores(features(text, self.bits)))
+        k = max(range(len(probs)), key=probs.__getitem__)
+        return self.routes[k], probs[k]
+
+    def fit(
+        self,
+        examples: Sequence[Example],
+        epochs: int = 30,
+        lr: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 0,
+    ) -> "IntentModel":
+        index = {r: k for k, r in enumerate(self.routes)}
+        data = [(features(t, self.bits), index[r]) for t, r in examples if r in index]
+        rng = random.Random(seed)
+        n_routes = len(self.routes)
+
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            step = lr / (1.0 + epoch * 0.1)
+            for feats, y in data:
+                probs = self._softmax(self._scores(feats))
+                grad = [p - (1.0 if k == y else 0.0) for k, p in enumerate(probs)]
+
+                for k in range(n_routes):
+                    self.bias[k] -= step * grad[k]
+
+                if not feats:
+                    continue
+                scale = 1.0 / math.sqrt(len(feats))
+                for f in feats:
+                    w = self.weights.get(f)
+                    if w is None:
+                        w = self.weights[f] = [0.0] * n_routes
+                    for k in range(n_routes):
+                        w[k] -= step * (grad[k] * scale + l2 * w[k])
+        return self
+
+    # ---------------- PERSISTENCE ----------------
+
+    def to_dict(self) -> dict:
+        return {
+            "routes": list(self.routes),
+            "bits": self.bits,
+            "bias": self.bias,
+            "weights": {str(f): [round(x, 6) for x in w] for f, w in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "IntentModel":
+        model = cls(raw["routes"], raw["bits"])
+        model.bias = list(raw["bias"])
+        model.weights = {int(f): w for f, w in raw["weights"].items()}
+        return model
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+# ======================================================
+# SHARED CLASSIFIER
+# ======================================================
+
+_model: Optional[IntentModel] = None
+_loaded = False
+_load_lock = Lock()
+
+
+def _shared_model() -> Optional[IntentModel]:
+    global _model, _loaded
+
+    if _loaded:
+        return _model
+
+    with _load_lock:
+        if not _loaded:
+            try:
+                _model = IntentModel.load(INTENT_MODEL_PATH)
+            except (OSError, ValueError, KeyError):
+                _model = None
+            _loaded = True
+    return _model
+
+
+async def aload() -> None:
+    """
+    Load the shared model without blocking the event loop.
+    Called at startup; a no-op once loaded.
+    """
+    if INTENT_CLASSIFIER and not _loaded:
+        await asyncio.get_running_loop().run_in_executor(None, _shared_model)
+
+
+def reload() -> None:
+    """
+    Pick up a newly trained model file.
+    """
+    global _loaded
+    with _load_lock:
+        _loaded = False
+
+
+def classify(message: str) -> Optional[dict]:
+    """
+    {"route", "confidence"} when the local model is confident enough,
+    else None (ask the orchestrator model).
+    """
+    if not INTENT_CLASSIFIER:
+        return None
+
+    model = _shared_model()
+    if model is None:
+        return None
+
+    route, confidence = model.predict(message)
+    if confidence < INTENT_THRESHOLD:
+        return None
+    return {"route": route, "confidence": round(confidence, 4)}
+
+
+async def aclassify(message: str) -> Optional[dict]:
+    """
+    Async classify: the model file is read off the event loop.
+    """
+    await aload()
+    return classify(message)
+
+# ======================================================
+# TRAINING DATA
+# ======================================================
+
+_MODELFILE_EXAMPLE = re.compile(r'^-\s*"(?P<text>[^"]+)"\s*→\s*(?P<json>\{.*?\})')
+
+
+def examples_from_jsonl(path: str) -> List[Example]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                out.append((row["text"], row["route"]))
+    return out
+
+
+def examples_from_modelfile(path: str = None) -> List[Example]:
+    """
+    The labeled examples in the orchestrator Modelfile.
+    """
+    path = path or os.path.join(LLM_MODELFILE_DIR, "orchestrator.Modelfile")
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            m = _MODELFILE_EXAMPLE.match(line.strip())
+            if m:
+                out.append((m.group("text"), json.loads(m.group("json"))["route"]))
+    return out
+
+
+def examples_from_audit(min_confidence: float = 0.9) -> List[Example]:
+    """
+    Routes the orchestrator model chose (FLOW_ROUTED events).
+    Classifier decisions are skipped so the model never trains on
+    its own output.
+    """
+    from audit.logger import query_events
+
+    out = []
+    cursor = None
+    while True:
+        page = query_events(limit=1000, action="FLOW_ROUTED", cursor=cursor)
+        for event in page["events"]:
+            after = event.get("after") or {}
+            if (
+                after.get("source") == "orchestrator"
+                and after.get("message")
+                and after.get("confidence", 0.0) >= min_confidence
+            ):
+                out.append((after["message"], after["route"]))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return out
+
+# ======================================================
+# EVALUATION
+# ======================================================
+
+def evaluate(model: IntentModel, examples: Sequence[Example], threshold: float) -> dict:
+    """
+    Accuracy overall and on the messages the classifier would answer
+    itself (coverage), plus per-message latency.
+    """
+    latencies = []
+    correct = covered = covered_correct = 0
+
+    for text, route in examples:
+        t0 = time.perf_counter()
+        predicted, confidence = model.predict(text)
+        latencies.append(time.perf_counter() - t0)
+
+        correct += predicted == route
+        if confidence >= threshold:
+            covered += 1
+            covered_correct += predicted == route
+
+    n = len(examples) or 1
+    latencies.sort()
+    return {
+        "examples": len(examples),
+        "accuracy": correct / n,
+        "coverage": covered / n,
+        "covered_accuracy": covered_correct / covered if covered else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3 if latencies else 0.0,
+    }
+
+
+def print_report(report: dict, threshold: float) -> None:
+    print(f"  examples          {report['examples']}")
+    print(f"  accuracy          {report['accuracy']:.1%}")
+    print(f"  coverage @ {threshold:.2f}   {report['coverage']:.1%}  (answered without the LLM)")
+    print(f"  covered accuracy  {report['covered_accuracy']:.1%}")
+    print(f"  latency p50/p99   {report['p50_ms']:.3f} / {report['p99_ms']:.3f} ms")
+
+
+def split(examples: Sequence[Example], holdout: float, seed: int = 0) -> Tuple[List[Example], List[Example]]:
+    data = list(examples)
+    random.Random(seed).shuffle(data)
+    cut = int(len(data) * (1 - holdout))
+    return data[:cut], data[cut:]
+
+# ======================================================
+# CLI
+# ======================================================
+
+def _collect(args) -> List[Example]:
+    examples: List[Example] = []
+    for path in args.examples or ():
+        examples += examples_from_jsonl(path)
+    if getattr(args, "modelfile", False):
+        examples += examples_from_modelfile()
+    if getattr(args, "audit", False):
+        examples += examples_from_audit(args.audit_min_confidence)
+    return [(t, r) for t, r in examples if r in ROUTES]
+
+
+def main(argv: Iterable[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m llm.intent")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train")
+    train.add_argument("--examples", action="append", help="labeled JSON lines (repeatable)")
+    train.add_argument("--modelfile", action="store_true", help="use the orchestrator Modelfile examples")
+    train.add_argument(
+        "--audit", action="store_true",
+        help="use FLOW_ROUTED audit events (recorded with INTENT_CAPTURE_MESSAGES=on)",
+    )
+    train.add_argument("--audit-min-confidence", type=float, default=0.9)
+    train.add_argument("--holdout", type=float, default=0.2)
+    train.add_argument("--epochs", type=int, default=30)
+    train.add_argument("--threshold", type=float, default=INTENT_THRESHOLD)
+    train.add_argument("--out", default=INTENT_MODEL_PATH)
+
+    ev = sub.add_parser("eval")
+    ev.add_argument("--examples", action="append", required=True)
+    ev.add_argument("--model", default=INTENT_MODEL_PATH)
+    ev.add_argument("--threshold", type=float, default=INTENT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "eval":
+        model = IntentModel.load(args.model)
+        print(f"{args.model}:")
+        print_report(evaluate(model, _collect(args), args.threshold), args.threshold)
+        return
+
+    examples = _collect(args)
+    if not examples:
+        parser.error(
+            "no training examples (use --examples, --modelfile, or --audit "
+            "with messages captured under INTENT_CAPTURE_MESSAGES=on)"
+        )
+
+    if args.holdout > 0:
+        train_set, test_set = split(examples, args.holdout)
+        model = IntentModel().fit(train_set, epochs=args.epochs)
+        print(f"held-out ({len(train_set)} train / {len(test_set)} test):")
+        print_report(evaluate(model, test_set, args.threshold), args.threshold)
+
+    # The saved model learns from every example
+    model = IntentModel().fit(examples, epochs=args.epochs)
+    model.save(args.out)
+    print(f"saved {args.out} ({len(examples)} examples, {len(model.weights)} weights)")
+
+
+if __name__ == "__main__":
+    main()
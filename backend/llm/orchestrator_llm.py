@@ -1,6 +1,10 @@
 # backend/llm/orchestrator_llm.py
 
 import json
+from typing import Optional
+
+from llm.aclient import aollama_generate
+from llm.cache import acache_for, cache_for
 from llm.client import ollama_generate
 
 MODEL = "orchestrator-model"
@@ -10,21 +14,62 @@ def run_orchestrator(message: str) -> dict:
     """
     Intent router using CUSTOM Ollama model.
     Model already contains SYSTEM prompt.
+    Decisions for equivalent messages are served from llm.cache.
     """
+    cache = cache_for(MODEL)
+    decision = cache.get(message) if cache else None
+    if decision is not None:
+        return decision
 
     raw = ollama_generate(
         model=MODEL,
         prompt=message,
-    ).strip()
+    )
+    decision = _decision(raw)
+    if decision is None:
+        return _fallback()
+    if cache:
+        cache.put(message, decision)
+    return decision
+
 
+async def arun_orchestrator(message: str) -> dict:
+    """
+    Async run_orchestrator.
+    """
+    cache = await acache_for(MODEL)
+    decision = await cache.aget(message) if cache else None
+    if decision is not None:
+        return decision
+
+    # Routing calls are short and arrive in bursts: let them share
+    # the model's parallel slots (LLM_BATCH_WINDOW_MS)
+    raw = await aollama_generate(
+        model=MODEL,
+        prompt=message,
+        batch=True,
+    )
+    decision = _decision(raw)
+    if decision is None:
+        return _fallback()
+    if cache:
+        await cache.aput(message, decision)
+    return decision
+
+
+def _fallback() -> dict:
+    return {
+        "route": "greeting_reply",
+        "confidence": 0.0,
+    }
+
+
+def _decision(raw: str) -> Optional[dict]:
     try:
-        parsed = json.loads(raw)
+        parsed = json.loads(raw.strip())
         return {
             "route": parsed["route"],
             "confidence": float(parsed["confidence"]),
         }
     except Exception:
-        return {
-            "route": "greeting_reply",
-            "confidence": 0.0,
-        }
+        return None
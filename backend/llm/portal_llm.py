@@ -1,37 +1,58 @@
 # backend/llm/portal_llm.py
 
 import json
-from llm.client import ollama_generate
+from llm.history import build_prompt
+from llm.stream import agenerate, generate
 
 MODEL = "portal-model"
 
 
-def run_portal_llm(flow: dict) -> dict:
+def run_portal_llm(flow: dict, on_token=None) -> dict:
     """
     Portal Management LLM.
     Custom Ollama model with embedded SYSTEM prompt.
+    on_token, if given, receives the follow-up question as it streams.
     """
+    raw = generate(
+        model=MODEL,
+        prompt=_prompt(flow),
+        fields=("question",),
+        on_token=on_token,
+        # Later turns extend this prompt: keep the flow on the endpoint
+        # that has it cached
+        affinity=flow.get("flow_id"),
+    )
+    return _parse(raw)
 
-    parts = []
 
-    # Mandatory context (first)
-    parts.append(f'intent: "{flow["type"]}"')
-    parts.append(f'current_date: "{flow["current_date"]}"')
+async def arun_portal_llm(flow: dict, on_token=None) -> dict:
+    """
+    Async run_portal_llm.
+    """
+    raw = await agenerate(
+        model=MODEL,
+        prompt=_prompt(flow),
+        fields=("question",),
+        on_token=on_token,
+        affinity=flow.get("flow_id"),
+    )
+    return _parse(raw)
+
 
-    # Conversation history
-    for h in flow["history"]:
-        role = h["role"].upper()
-        parts.append(f"{role}: {h['content']}")
+def _prompt(flow: dict) -> str:
+    # Mandatory context (first)
+    header = [
+        f'intent: "{flow["type"]}"',
+        f'current_date: "{flow["current_date"]}"',
+    ]
 
-    prompt = "\n".join(parts)
+    # Conversation history, bounded by the token budget
+    return build_prompt(header, flow)
 
-    raw = ollama_generate(
-        model=MODEL,
-        prompt=prompt,
-    ).strip()
 
+def _parse(raw: str) -> dict:
     try:
-        return json.loads(raw)
+        return json.loads(raw.strip())
     except Exception:
         return {
             "status": "incomplete",
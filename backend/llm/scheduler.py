@@ -0,0 +1,337 @@
+# backend/llm/scheduler.py
+#
+# Admission control in front of the shared Ollama instance.
+#
+# The orchestrator, portal and ticket models share one server, so a
+# surge of troubleshooting used to make every new chat wait for its
+# routing call. Every upstream generation now takes a slot here first:
+#
+#   concurrency   at most LLM_CONCURRENCY generations at once, and at
+#                 most LLM_MODEL_LIMITS[model] of one model, so a
+#                 ticket surge cannot take the slots routing needs
+#   priority      a freed slot goes to the oldest waiter of the most
+#                 urgent class: routing > slot filling > troubleshooting
+#   backpressure  at most LLM_QUEUE_MAX waiters per class (QueueFull,
+#                 answered 429), and a waiter that cannot start within
+#                 its class's LLM_MAX_WAIT_* is dropped (DeadlineExceeded,
+#                 answered 503). When the estimated wait already exceeds
+#                 it, the request is dropped on arrival instead of after
+#                 waiting.
+#
+# Both carry a Retry-After estimate from the queue length and each
+# model's recent generation time.
+#
+# Limits are per process: with several workers, split the server's
+# OLLAMA_NUM_PARALLEL between them.
+#
+#   LLM_SCHEDULER                  on | off (default on)
+#   LLM_CONCURRENCY                generations at once (default 4)
+#   LLM_MODEL_LIMITS               per model caps (default
+#                                  "orchestrator-model=4,portal-model=3,ticket-model=2")
+#   LLM_QUEUE_MAX                  waiters per class (default 64)
+#   LLM_MAX_WAIT_ROUTING           seconds (default 5)
+#   LLM_MAX_WAIT_SLOT_FILLING      seconds (default 15)
+#   LLM_MAX_WAIT_TROUBLESHOOTING   seconds (default 30)
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from threading import Event, Lock
+from typing import Callable, Deque, Dict, List, Optional
+
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "on") == "on"
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MODEL_LIMITS = os.getenv(
+    "LLM_MODEL_LIMITS", "orchestrator-model=4,portal-model=3,ticket-model=2"
+)
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "64"))
+
+ROUTING, SLOT_FILLING, TROUBLESHOOTING = 0, 1, 2
+PRIORITY_NAMES = ("routing", "slot_filling", "troubleshooting")
+
+LLM_MAX_WAIT = (
+    float(os.getenv("LLM_MAX_WAIT_ROUTING", "5")),
+    float(os.getenv("LLM_MAX_WAIT_SLOT_FILLING", "15")),
+    float(os.getenv("LLM_MAX_WAIT_TROUBLESHOOTING", "30")),
+)
+
+MODEL_PRIORITY = {
+    "orchestrator-model": ROUTING,
+    "portal-model": SLOT_FILLING,
+    "ticket-model": TROUBLESHOOTING,
+}
+
+# Generation time assumed for a model until one has been measured (s)
+DEFAULT_SERVICE_TIME = 2.0
+
+# Weight of the newest sample in a model's generation time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """
+    The model server is too busy to take the request.
+    retry_after: whole seconds until a retry is likely to be admitted.
+    """
+
+    status = 503
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+class QueueFull(Overloaded):
+    status = 429
+
+
+class DeadlineExceeded(Overloaded):
+    status = 503
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """
+    "orchestrator-model=4,ticket-model=2" -> {model: limit}
+    """
+    limits = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+_WAITING, _GRANTED, _DROPPED = 0, 1, 2
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "deadline", "wake", "state")
+
+    def __init__(self, model: str, priority: int, deadline: float, wake: Callable[[], None]):
+        self.model = model
+        self.priority = priority
+        self.deadline = deadline
+        self.wake = wake
+        self.state = _WAITING
+
+
+class Scheduler:
+    def __init__(
+        self,
+        concurrency: int = None,
+        limits: Dict[str, int] = None,
+        queue_max: int = None,
+        max_wait: tuple = None,
+    ):
+        self.concurrency = concurrency or LLM_CONCURRENCY
+        self.limits = parse_limits(LLM_MODEL_LIMITS) if limits is None else limits
+        self.queue_max = queue_max or LLM_QUEUE_MAX
+        self.max_wait = max_wait or LLM_MAX_WAIT
+
+        self._lock = Lock()
+        self._queues: List[Deque[_Waiter]] = [deque() for _ in PRIORITY_NAMES]
+        self._running: Dict[str, int] = {}
+        self._total = 0
+        # model → moving average of generation time (s)
+        self._service: Dict[str, float] = {}
+
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    # ---------- bookkeeping (lock held) ----------
+
+    def _limit(self, model: str) -> int:
+        return min(self.limits.get(model, self.concurrency), self.concurrency)
+
+    def _can_run(self, model: str) -> bool:
+        return self._total < self.concurrency and self._running.get(model, 0) < self._limit(model)
+
+    def _start(self, model: str) -> None:
+        self._running[model] = self._running.get(model, 0) + 1
+        self._total += 1
+        self.admitted += 1
+
+    def _estimate(self, model: str, priority: int) -> float:
+        """
+        Expected wait before a new request of model/priority starts.
+        """
+        ahead = sum(len(q) for q in self._queues[:priority + 1])
+        rounds = ahead // max(1, self._limit(model)) + 1
+        return rounds * self._service.get(model, DEFAULT_SERVICE_TIME)
+
+    def _retry_after(self, model: str, priority: int) -> int:
+        return max(1, math.ceil(self._estimate(model, priority)))
+
+    def _dispatch(self) -> None:
+        """
+        Hand freed slots to waiters, most urgent class first,
+        dropping those past their deadline.
+        """
+        now = time.monotonic()
+        for queue in self._queues:
+            for waiter in list(queue):
+                if waiter.deadline <= now:
+                    queue.remove(waiter)
+                    waiter.state = _DROPPED
+                    self.expired += 1
+                    waiter.wake()
+                elif self._can_run(waiter.model):
+                    queue.remove(waiter)
+                    waiter.state = _GRANTED
+                    self._start(waiter.model)
+                    waiter.wake()
+                elif self._total >= self.concurrency:
+                    return
+
+    # ---------- admission ----------
+
+    def _enqueue(self, model: str, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """
+        None when the request may start now, else its queue entry.
+        Raises QueueFull / DeadlineExceeded when it cannot be queued.
+        """
+        priority = MODEL_PRIORITY.get(model, TROUBLESHOOTING)
+        name = PRIORITY_NAMES[priority]
+
+        with self._lock:
+            if self._can_run(model):
+                self._start(model)
+                return None
+
+            retry_after = self._retry_after(model, priority)
+            if len(self._queues[priority]) >= self.queue_max:
+                self.rejected += 1
+                raise QueueFull(f"Too many {name} requests waiting", retry_after)
+
+            budget = self.max_wait[priority]
+            if self._estimate(model, priority) > budget:
+                self.rejected += 1
+                raise DeadlineExceeded(f"{name} request would wait over {budget:g}s", retry_after)
+
+            waiter = _Waiter(model, priority, time.monotonic() + budget, wake)
+            self._queues[priority].append(waiter)
+            return waiter
+
+    def _granted(self, waiter: _Waiter) -> bool:
+        """
+        After the waiter woke, timed out or was cancelled: whether it
+        holds a slot. Removes it from the queue otherwise.
+        """
+        with self._lock:
+            if waiter.state == _GRANTED:
+                return True
+            if waiter.state == _WAITING:
+                self._queues[waiter.priority].remove(waiter)
+                waiter.state = _DROPPED
+                self.expired += 1
+            return False
+
+    def _expired(self, waiter: _Waiter) -> DeadlineExceeded:
+        with self._lock:
+            retry_after = self._retry_after(waiter.model, waiter.priority)
+        name = PRIORITY_NAMES[waiter.priority]
+        return DeadlineExceeded(
+            f"{name} request waited over {self.max_wait[waiter.priority]:g}s", retry_after
+        )
+
+    def _release(self, model: str, elapsed: Optional[float]) -> None:
+        with self._lock:
+            self._running[model] -= 1
+            self._total -= 1
+            if elapsed is not None:
+                prev = self._service.get(model)
+                self._service[model] = (
+                    elapsed if prev is None else prev + SERVICE_TIME_ALPHA * (elapsed - prev)
+                )
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, model: str):
+        """
+        Hold a generation slot for model (blocking).
+        """
+        event = Event()
+        waiter = self._enqueue(model, event.set)
+        if waiter is not None:
+            event.wait(max(0.0, waiter.deadline - time.monotonic()))
+            if not self._granted(waiter):
+                raise self._expired(waiter)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(model, time.monotonic() - started)
+
+    @asynccontextmanager
+    async def aslot(self, model: str):
+        """
+        Async slot(): waiting suspends the coroutine.
+        """
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+
+        waiter = self._enqueue(model, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(woken), max(0.0, waiter.deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if self._granted(waiter):
+                    self._release(model, None)
+                raise
+            if not self._granted(waiter):
+                raise self._expired(waiter)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(model, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": dict(self._running),
+                "queued": {
+                    name: len(q) for name, q in zip(PRIORITY_NAMES, self._queues)
+                },
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "service_seconds": {m: round(s, 3) for m, s in self._service.items()},
+            }
+
+# ======================================================
+# SHARED INSTANCE
+# ======================================================
+
+_SCHEDULER = Scheduler()
+
+
+def slot(model: str):
+    """
+    with slot(model): one upstream generation.
+    """
+    return _SCHEDULER.slot(model) if LLM_SCHEDULER else nullcontext()
+
+
+def aslot(model: str):
+    """
+    async with aslot(model): one upstream generation.
+    """
+    return _SCHEDULER.aslot(model) if LLM_SCHEDULER else nullcontext()
+
+
+def scheduler_stats() -> dict:
+    return _SCHEDULER.stats()
@@ -0,0 +1,187 @@
+# backend/llm/stream.py
+#
+# Incremental extraction of user-facing text from a streamed JSON reply.
+#
+# The models answer with one JSON object, e.g.
+#   {"status": "incomplete", "missing": "date", "question": "Which date?"}
+#   {"steps": ["Restart the router.", "Reconnect to WiFi."], "resolved": true}
+# While it is still being generated, FieldStream picks out the decoded
+# characters of the watched top-level fields (a string, or a list of
+# strings joined by sep), so they can be shown before the object is
+# complete. The full reply is still json-parsed once the stream ends.
+
+from typing import Callable, Hashable, Iterable, List, Optional
+
+from llm.aclient import aollama_generate, aollama_stream
+from llm.client import ollama_generate, ollama_stream
+
+_ESCAPES = {
+    '"': '"', "\\": "\\", "/": "/",
+    "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t",
+}
+
+
+class FieldStream:
+    def __init__(self, fields: Iterable[str], sep: str = "\n"):
+        self.fields = frozenset(fields)
+        self.sep = sep
+        self.text = ""
+
+        self._depth = 0             # {} / [] nesting
+        self._expect_key = False    # at depth 1, next string is a key
+        self._key = None            # current top-level key
+        self._in_list = False       # inside a watched list (depth 2)
+        self._items = 0             # strings seen in that list
+
+        self._in_string = False
+        self._reading_key = False
+        self._emit = False
+        self._escape = None         # None, "" after "\", or "u" + hex digits
+        self._high = None           # pending high surrogate of a \u pair
+        self._key_chars: List[str] = []
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consume the next piece of raw model output.
+        Returns the watched text it completed ("" if none).
+        """
+        out: List[str] = []
+
+        for c in chunk:
+            if self._in_string:
+                if self._escape is not None:
+                    ch = self._unescape(c)
+                    if ch:
+                        self._char(ch, out)
+                elif c == "\\":
+                    self._escape = ""
+                elif c == '"':
+                    self._in_string = False
+                    if self._reading_key:
+                        self._key = "".join(self._key_chars)
+                        self._reading_key = False
+                else:
+                    self._char(c, out)
+                continue
+
+            if c == '"':
+                self._open_string(out)
+            elif c == "{" or c == "[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = c == "{"
+                elif self._depth == 2 and c == "[":
+                    self._in_list = self._key in self.fields
+                    self._items = 0
+            elif c == "}" or c == "]":
+                if self._depth == 2:
+                    self._in_list = False
+                self._depth = max(0, self._depth - 1)
+            elif self._depth == 1:
+                if c == ":":
+                    self._expect_key = False
+                elif c == ",":
+                    self._expect_key = True
+
+        piece = "".join(out)
+        self.text += piece
+        return piece
+
+    # ---------------- INTERNALS ----------------
+
+    def _open_string(self, out: List[str]) -> None:
+        self._in_string = True
+        self._reading_key = self._depth == 1 and self._expect_key
+        self._emit = False
+
+        if self._reading_key:
+            self._key_chars = []
+        elif self._depth == 1:
+            self._emit = self._key in self.fields
+        elif self._depth == 2 and self._in_list:
+            self._emit = True
+            if self._items:
+                out.append(self.sep)
+            self._items += 1
+
+    def _char(self, ch: str, out: List[str]) -> None:
+        if self._reading_key:
+            self._key_chars.append(ch)
+        elif self._emit:
+            out.append(ch)
+
+    def _unescape(self, c: str) -> str:
+        if self._escape == "":
+            if c == "u":
+                self._escape = "u"
+                return ""
+            self._escape = None
+            return _ESCAPES.get(c, c)
+
+        self._escape += c
+        if len(self._escape) < 5:
+            return ""
+
+        try:
+            code = int(self._escape[1:], 16)
+        except ValueError:
+            code = 0xFFFD
+        self._escape = None
+
+        if 0xD800 <= code < 0xDC00:
+            self._high = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._high is not None:
+            code = 0x10000 + ((self._high - 0xD800) << 10) + (code - 0xDC00)
+        self._high = None
+        return chr(code)
+
+
+def generate(
+    *,
+    model: str,
+    prompt: str,
+    fields: Iterable[str],
+    on_token: Optional[Callable[[str], None]] = None,
+    affinity: Hashable = None,
+) -> str:
+    """
+    Full raw completion. With on_token, the completion is streamed
+    and on_token receives the text of fields as it arrives.
+    affinity: see llm.endpoints.
+    """
+    if on_token is None:
+        return ollama_generate(model=model, prompt=prompt, affinity=affinity)
+
+    extractor = FieldStream(fields)
+    parts = []
+    for piece in ollama_stream(model=model, prompt=prompt, affinity=affinity):
+        parts.append(piece)
+        text = extractor.feed(piece)
+        if text:
+            on_token(text)
+    return "".join(parts)
+
+
+async def agenerate(
+    *,
+    model: str,
+    prompt: str,
+    fields: Iterable[str],
+    on_token: Optional[Callable[[str], None]] = None,
+    affinity: Hashable = None,
+) -> str:
+    """
+    Async generate.
+    """
+    if on_token is None:
+        return await aollama_generate(model=model, prompt=prompt, affinity=affinity)
+
+    extractor = FieldStream(fields)
+    parts = []
+    async for piece in aollama_stream(model=model, prompt=prompt, affinity=affinity):
+        parts.append(piece)
+        text = extractor.feed(piece)
+        if text:
+            on_token(text)
+    return "".join(parts)
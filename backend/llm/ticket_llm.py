@@ -1,28 +1,97 @@
 import json
-from llm.client import ollama_generate
+from typing import Optional
+
+from llm.cache import acache_for, cache_for
+from llm.scheduler import Overloaded
+from llm.stream import agenerate, generate
 
 MODEL = "ticket-model"
 
 
-def run_ticket_llm(message: str) -> dict:
+def run_ticket_llm(message: str, on_token=None) -> dict:
     """
     Calls the custom ticket-model.
     The model already contains its SYSTEM prompt.
     Always returns valid JSON.
+    on_token, if given, receives the troubleshooting steps as they stream.
+    Results for equivalent issues are served from llm.cache.
     """
+    cache = cache_for(MODEL)
+    result = cache.get(message) if cache else None
+    if result is not None:
+        return _replay(result, on_token)
 
     try:
-        raw = ollama_generate(
+        raw = generate(
             model=MODEL,
-            prompt=message
+            prompt=message,
+            fields=("steps",),
+            on_token=on_token,
         )
+    except Overloaded:
+        # Not a model failure: let the client retry later
+        raise
+    except Exception:
+        return _fallback()
+
+    result = _parse(raw)
+    if result is None:
+        return _fallback()
+    if cache:
+        cache.put(message, result)
+    return result
 
-        raw = raw.strip()
-        return json.loads(raw)
 
+async def arun_ticket_llm(message: str, on_token=None) -> dict:
+    """
+    Async run_ticket_llm.
+    """
+    cache = await acache_for(MODEL)
+    result = await cache.aget(message) if cache else None
+    if result is not None:
+        return _replay(result, on_token)
+
+    try:
+        raw = await agenerate(
+            model=MODEL,
+            prompt=message,
+            fields=("steps",),
+            on_token=on_token,
+        )
+    except Overloaded:
+        raise
     except Exception:
-        # Absolute safety fallback — never crash chat flow
-        return {
-            "steps": [],
-            "resolved": False
-        }
+        return _fallback()
+
+    result = _parse(raw)
+    if result is None:
+        return _fallback()
+    if cache:
+        await cache.aput(message, result)
+    return result
+
+
+def _replay(result: dict, on_token) -> dict:
+    if on_token is not None and result["steps"]:
+        # Streaming callers still get the text, in one piece
+        on_token("\n".join(result["steps"]))
+    return result
+
+
+def _parse(raw: str) -> Optional[dict]:
+    try:
+        result = json.loads(raw.strip())
+    except Exception:
+        return None
+
+    if not isinstance(result, dict) or not isinstance(result.get("steps"), list):
+        return None
+    return result
+
+
+def _fallback() -> dict:
+    # Absolute safety fallback — never crash chat flow
+    return {
+        "steps": [],
+        "resolved": False
+    }
@@ -1,3 +1,148 @@
 import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
 
-GLOBAL_LOCK = threading.Lock()
+
+class RWLock:
+    """
+    Shared / exclusive lock for one collection.
+    - Many readers OR one writer
+    - Writer-preferring (waiting writers block new readers)
+    - Re-entrant: the writer may take read or write again,
+      a reader may take read again
+    - Read → write upgrade is refused (it would deadlock)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _held_reads(self) -> int:
+        return getattr(self._local, "reads", 0)
+
+    def acquire_read(self) -> float:
+        """
+        Returns seconds spent waiting.
+        """
+        me = threading.get_ident()
+        start = time.perf_counter()
+
+        with self._cond:
+            if self._writer != me and not self._held_reads():
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers += 1
+
+        self._local.reads = self._held_reads() + 1
+        return time.perf_counter() - start
+
+    def release_read(self) -> None:
+        self._local.reads = self._held_reads() - 1
+
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> float:
+        """
+        Returns seconds spent waiting.
+        """
+        me = threading.get_ident()
+        start = time.perf_counter()
+
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return 0.0
+
+            if self._held_reads():
+                raise RuntimeError(
+                    f"Cannot upgrade read lock to write lock on {self.name}"
+                )
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = me
+            self._writer_depth = 1
+
+        return time.perf_counter() - start
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class LockManager:
+    """
+    One RWLock per collection, created on first use,
+    plus wait-time metrics per collection and mode.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, RWLock] = {}
+        self._stats: Dict[str, Dict[str, dict]] = {}
+        self._guard = threading.Lock()
+
+    def get(self, name: str) -> RWLock:
+        lock = self._locks.get(name)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(name, RWLock(name))
+        return lock
+
+    def _record(self, name: str, mode: str, waited: float) -> None:
+        with self._guard:
+            s = self._stats.setdefault(name, {}).setdefault(
+                mode, {"count": 0, "wait_total": 0.0, "wait_max": 0.0}
+            )
+            s["count"] += 1
+            s["wait_total"] += waited
+            s["wait_max"] = max(s["wait_max"], waited)
+
+    @contextmanager
+    def read(self, name: str):
+        lock = self.get(name)
+        self._record(name, "read", lock.acquire_read())
+        try:
+            yield
+        finally:
+            lock.release_read()
+
+    @contextmanager
+    def write(self, name: str):
+        lock = self.get(name)
+        self._record(name, "write", lock.acquire_write())
+        try:
+            yield
+        finally:
+            lock.release_write()
+
+    def stats(self) -> Dict[str, Dict[str, dict]]:
+        """
+        {collection: {"read"|"write": {count, wait_total, wait_max, wait_avg}}}
+        """
+        with self._guard:
+            out = {}
+            for name, modes in self._stats.items():
+                out[name] = {}
+                for mode, s in modes.items():
+                    out[name][mode] = dict(s, wait_avg=s["wait_total"] / s["count"])
+            return out
+
+
+LOCKS = LockManager()
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from uuid import uuid4
 from auth import get_current_user
-from utils.json_store import read_json, write_json
+from utils.collection import MEETINGS, USERS
 from rules.meeting_rules import find_room
 from audit import log_event
 from automation.meeting_automation import handle_meeting_automation
@@ -23,7 +23,7 @@ class MeetingCreate(BaseModel):
 
 @router.post("")
 def create_meeting(req: MeetingCreate, user=Depends(get_current_user)):
-    meetings = read_json("meetings.json")
+    meetings = MEETINGS.all()
 
     # Apply deterministic business rules
     room = find_room(req.dict(), meetings)
@@ -49,20 +49,22 @@ def create_meeting(req: MeetingCreate, user=Depends(get_current_user)):
     }
 
     # 1️⃣ Persist meeting FIRST (never automate before save)
-    meetings.append(record)
-    write_json("meetings.json", meetings)
+    MEETINGS.insert(record)
 
     log_event(user["id"], "MEETING_CREATED", meeting_id)
 
     # 2️⃣ Run automation (WebEx + Gmail)
-    users = read_json("users.json")
-    creator = next(u for u in users if u["id"] == user["id"])
+    creator = USERS.get(user["id"])
     user_email = creator["email"]
 
     handle_meeting_automation(record, user_email)
 
     # 3️⃣ Persist WebEx fields added by automation
-    write_json("meetings.json", meetings)
+    MEETINGS.update(meeting_id, {
+        k: record[k]
+        for k in ("webex_meeting_id", "webex_join_link")
+        if k in record
+    })
 
     return record
 
@@ -70,9 +72,7 @@ def create_meeting(req: MeetingCreate, user=Depends(get_current_user)):
 
 @router.get("")
 def list_meetings(user=Depends(get_current_user)):
-    meetings = read_json("meetings.json")
-
     if user["role"] in {"admin", "superuser"}:
-        return meetings
+        return MEETINGS.all()
 
-    return [m for m in meetings if m["created_by"] == user["id"]]
+    return MEETINGS.find(created_by=user["id"])
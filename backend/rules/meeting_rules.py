@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 import uuid
 
-from utils.json_store import read_json, write_json
+from utils.json_store import insert_record, read_json_view
 from audit import log_event
 
 ROOMS = [
@@ -68,7 +68,7 @@ def suggest_slots(meeting, meetings, attempts=3):
     return suggestions
 
 def create_meeting(user, meeting):
-    meetings = read_json("meetings.json")
+    meetings = read_json_view("meetings.json")
 
     try:
         datetime.strptime(
@@ -93,7 +93,6 @@ def create_meeting(user, meeting):
         **meeting
     }
 
-    meetings.append(record)
-    write_json("meetings.json", meetings)
+    insert_record("meetings.json", record)
     log_event(user["id"], "MEETING_CREATED", record["id"])
     return record
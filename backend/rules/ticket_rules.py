@@ -2,7 +2,7 @@ from collections import defaultdict
 from datetime import datetime
 import uuid
 
-from utils.json_store import read_json, write_json
+from utils.json_store import insert_record, read_json_view
 from audit import log_event
 
 # --------------------------------------------------
@@ -29,8 +29,8 @@ def create_ticket(user, issue: str):
     Called from chat.py when route == ticket
     """
 
-    tickets = read_json("tickets.json")
-    admins = read_json("users.json")
+    tickets = read_json_view("tickets.json")
+    admins = read_json_view("users.json")
 
     admins = [u for u in admins if u.get("role") == "admin"]
 
@@ -45,8 +45,7 @@ def create_ticket(user, issue: str):
         "created_at": datetime.utcnow().isoformat()
     }
 
-    tickets.append(ticket)
-    write_json("tickets.json", tickets)
+    insert_record("tickets.json", ticket)
 
     log_event(user["id"], "TICKET_CREATED", ticket["id"])
 
@@ -0,0 +1,40 @@
+# backend/tests/test_aclient.py
+#
+# llm.aclient without an Ollama server: micro-batching limits.
+
+import asyncio
+
+from llm import aclient, client
+
+MODEL = "orchestrator-model"
+
+
+def test_batcher_caps_calls_in_flight_and_keeps_affinity(monkeypatch):
+    monkeypatch.setattr(aclient, "LLM_BATCH_WINDOW_MS", 5)
+    monkeypatch.setattr(aclient, "LLM_BATCH_MAX", 2)
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", False)
+
+    running = []
+    peak = []
+    affinities = []
+
+    async def fake_generate(path, payload, affinity=None):
+        running.append(1)
+        peak.append(len(running))
+        affinities.append(affinity)
+        await asyncio.sleep(0.01)
+        running.pop()
+        return payload["prompt"]
+
+    monkeypatch.setattr(aclient, "_generate", fake_generate)
+
+    async def main():
+        return await asyncio.gather(*(
+            aclient.aollama_generate(model=MODEL, prompt=f"p{i}", batch=True, affinity=f"f{i}")
+            for i in range(7)
+        ))
+
+    assert asyncio.run(main()) == [f"p{i}" for i in range(7)]
+    assert max(peak) == 2
+    assert sorted(affinities) == sorted(f"f{i}" for i in range(7))
+
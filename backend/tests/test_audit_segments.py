@@ -0,0 +1,59 @@
+# backend/tests/test_audit_segments.py
+#
+# audit.segments shared by several worker processes. Two SegmentedLog
+# instances on one path stand in for two processes: each has its own
+# active index and segment number, only the files are shared.
+
+import json
+
+import pytest
+
+from audit import segments
+from audit.segments import SegmentedLog
+
+
+def _item(actor: str, entity: str):
+    ts = "2026-01-01T00:00:00Z"
+    record = {"ts": ts, "actor": {"id": actor}, "action": "X", "entity": {"id": entity}}
+    return json.dumps(record) + "\n", (ts, actor, "X", entity)
+
+
+def _entities(log, **filters) -> list:
+    return [event["entity"]["id"] for _, event in log.query(**filters)]
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "AUDIT_SEGMENT_BYTES", 500)
+    path = str(tmp_path / "audit.log")
+    return SegmentedLog(path), SegmentedLog(path)
+
+
+def test_query_sees_other_process_appends(logs):
+    a, b = logs
+    assert _entities(a) == []
+    b.append([_item("b", "1"), _item("b", "2")])
+    assert _entities(a, actor_id="b") == ["2", "1"]
+
+
+def test_interleaved_rotation_loses_no_segment(logs):
+    a, b = logs
+    for i in range(40):
+        (a if i % 2 else b).append([_item("a" if i % 2 else "b", str(i))])
+
+    assert len(a._closed_seqs()) > 1
+    expected = [str(i) for i in reversed(range(40))]
+    assert _entities(a) == expected
+    assert _entities(b) == expected
+
+
+def test_cursor_survives_rotation_elsewhere(logs):
+    a, b = logs
+    for i in range(3):
+        a.append([_item("a", str(i))])
+    cursor, _ = next(a.query())
+
+    for i in range(3, 40):
+        b.append([_item("b", str(i))])
+
+    assert [event["entity"]["id"] for _, event in a.query(cursor=cursor)] == ["1", "0"]
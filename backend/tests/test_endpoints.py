@@ -0,0 +1,130 @@
+# backend/tests/test_endpoints.py
+#
+# llm.endpoints through llm.aclient / llm.client against stub Ollama
+# servers (benchmarks.stub_ollama): least-outstanding routing, flow
+# affinity, ejection and failover.
+
+import asyncio
+import socket
+from contextlib import ExitStack
+
+import pytest
+import requests
+
+from benchmarks.stub_ollama import AsyncStubOllama, StubOllama
+from llm import aclient, client, endpoints, scheduler
+from llm.endpoints import UpstreamHTTPError
+
+MODEL = "portal-model"
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    # Count requests, not queueing; every call reaches a stub
+    monkeypatch.setattr(scheduler, "LLM_SCHEDULER", False)
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", False)
+    monkeypatch.setattr(client, "_endpoints", None)
+    monkeypatch.setattr(endpoints, "OLLAMA_EJECT_AFTER", 1)
+
+
+@pytest.fixture
+def stubs(monkeypatch):
+    with ExitStack() as stack:
+        def start(n, **kwargs):
+            started = [stack.enter_context(AsyncStubOllama(**kwargs)) for _ in range(n)]
+            monkeypatch.setattr(client, "OLLAMA_ENDPOINTS", ";".join(s.url for s in started))
+            return started
+        yield start
+
+
+async def _calls(n: int, affinity=None) -> list:
+    return await asyncio.gather(*(
+        aclient.aollama_generate(model=MODEL, prompt=f"call {i}", affinity=affinity)
+        for i in range(n)
+    ))
+
+
+def test_calls_spread_over_least_loaded_endpoints(stubs):
+    servers = stubs(3, base_latency_ms=50)
+    asyncio.run(_calls(30))
+    assert [s.requests for s in servers] == [10, 10, 10]
+
+
+def test_affinity_keeps_a_flow_on_one_endpoint(stubs):
+    servers = stubs(2)
+
+    async def turns():
+        for i in range(6):
+            await aclient.aollama_generate(model=MODEL, prompt=f"turn {i}", affinity="flow-1")
+
+    asyncio.run(turns())
+    assert sorted(s.requests for s in servers) == [0, 6]
+    assert client.endpoint_stats()["affinity_hits"] == 5
+
+
+def test_dead_endpoint_is_ejected_and_calls_fail_over(stubs):
+    servers = stubs(2)
+    dead = servers[1].url
+    servers[1].stop()
+
+    asyncio.run(_calls(10))
+
+    stats = client.endpoint_stats()["endpoints"]
+    assert servers[0].requests == 10
+    assert stats[dead]["ejections"] >= 1
+    assert stats[dead]["served"] == 0
+
+
+@pytest.mark.parametrize("error", [
+    ConnectionRefusedError(),
+    socket.gaierror("Name or service not known"),
+    asyncio.TimeoutError(),
+])
+def test_connect_errors_fail_over(stubs, monkeypatch, error):
+    server, = stubs(1)
+    monkeypatch.setattr(client, "OLLAMA_ENDPOINTS", f"http://unreachable.invalid:11434;{server.url}")
+    open_connection = asyncio.open_connection
+
+    async def fake_open_connection(host, port, **kwargs):
+        if host == "unreachable.invalid":
+            raise error
+        return await open_connection(host, port, **kwargs)
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+
+    asyncio.run(_calls(4))
+    assert server.requests == 4
+    stats = client.endpoint_stats()["endpoints"]
+    assert stats["http://unreachable.invalid:11434"]["ejections"] == 1
+
+
+def test_read_timeout_is_not_retried(stubs, monkeypatch):
+    servers = stubs(2, base_latency_ms=1000)
+    monkeypatch.setattr(aclient, "READ_TIMEOUT", 0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(aclient.aollama_generate(model=MODEL, prompt="slow"))
+    assert sum(s.requests for s in servers) == 1
+
+
+def test_client_errors_do_not_eject(stubs):
+    stubs(2, models=("other-model",))
+
+    for _ in range(4):
+        with pytest.raises(UpstreamHTTPError) as e:
+            asyncio.run(aclient.aollama_generate(model=MODEL, prompt="hi"))
+        assert e.value.status == 404
+
+    stats = client.endpoint_stats()["endpoints"]
+    assert all(s["ejections"] == 0 and s["failures"] == 0 for s in stats.values())
+
+
+def test_sync_client_errors_do_not_eject(monkeypatch):
+    with StubOllama(models=("other-model",)) as a, StubOllama(models=("other-model",)) as b:
+        monkeypatch.setattr(client, "OLLAMA_ENDPOINTS", f"{a.url};{b.url}")
+        for _ in range(4):
+            with pytest.raises(requests.HTTPError):
+                client.ollama_generate(model=MODEL, prompt="hi")
+
+        stats = client.endpoint_stats()["endpoints"]
+        assert all(s["ejections"] == 0 for s in stats.values())
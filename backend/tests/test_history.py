@@ -0,0 +1,76 @@
+# backend/tests/test_history.py
+#
+# Prompt length of the token-budgeted history window (llm.history) at
+# 5, 20 and 50 turns, and that no user answer is ever lost from the
+# prompt or from stored history.
+
+import pytest
+
+from chat import state_manager
+from llm import history
+
+HEADER = ['intent: "meeting"', 'current_date: "01/07/2026"']
+
+QUESTION = "What should the meeting title be?"
+
+
+def _flow(turns: int, answer_chars: int = 40) -> dict:
+    entries = []
+    for i in range(turns):
+        if i % 2 == 0:
+            answer = f"answer {i} " + "x" * answer_chars
+            entries.append({"role": "user", "content": answer[:answer_chars]})
+        else:
+            entries.append({"role": "assistant", "content": QUESTION})
+    return {"type": "meeting", "data": {"title": "Q3 sync"}, "history": entries}
+
+
+def _answers(flow: dict) -> list:
+    return [h["content"] for h in flow["history"] if h["role"] == "user"]
+
+
+@pytest.mark.parametrize("turns", [5, 20, 50])
+def test_prompt_stays_within_budget(turns):
+    flow = _flow(turns, answer_chars=12)
+    prompt = history.build_prompt(HEADER, flow, budget=384)
+    assert history.estimate_tokens(prompt) <= 384
+
+
+def test_prompt_grows_slower_than_full_history():
+    # Past the budget assistant turns leave the prompt, answers are folded
+    sizes = [len(history.build_prompt(HEADER, _flow(t))) for t in (20, 50)]
+    full = [len("\n".join(history._turn(h) for h in _flow(t)["history"])) for t in (20, 50)]
+    assert sizes[1] < full[1]
+    assert sizes[1] - sizes[0] < 0.6 * (full[1] - full[0])
+
+
+@pytest.mark.parametrize("turns", [5, 20, 50])
+def test_prompt_keeps_every_user_answer(turns):
+    flow = _flow(turns)
+    prompt = history.build_prompt(HEADER, flow, budget=64)
+    for answer in _answers(flow):
+        assert answer in prompt
+
+
+def test_tight_budget_drops_assistant_turns_first():
+    flow = _flow(21)
+    prompt = history.build_prompt(HEADER, flow, budget=64)
+    assert QUESTION not in prompt
+    assert prompt.endswith(history._turn(flow["history"][-1]))
+
+
+def test_stored_history_cap_keeps_user_turns(monkeypatch):
+    monkeypatch.setattr(state_manager, "HISTORY_MAX_ENTRIES", 10)
+    flow = state_manager._as_flow({"flow_id": "f-history", "type": "meeting"})
+    state_manager.save_flow("u-history", flow)
+    try:
+        for i in range(30):
+            role = "user" if i % 2 == 0 else "assistant"
+            state_manager.append_history("u-history", "f-history", role, f"{role} {i}")
+
+        stored = state_manager.get_flow("u-history", "f-history")["history"]
+        users = [h["content"] for h in stored if h["role"] == "user"]
+        assert users == [f"user {i}" for i in range(0, 30, 2)]
+        assert len(stored) == 15
+    finally:
+        state_manager.delete_flow("u-history", "f-history")
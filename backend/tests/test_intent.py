@@ -0,0 +1,28 @@
+# backend/tests/test_intent.py
+#
+# llm.intent: the async path reads the model file off the event loop.
+
+import asyncio
+import threading
+
+from llm import intent
+
+
+def test_aclassify_loads_the_model_off_the_event_loop(monkeypatch, tmp_path):
+    monkeypatch.setattr(intent, "INTENT_CLASSIFIER", True)
+    monkeypatch.setattr(intent, "INTENT_MODEL_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(intent, "_loaded", False)
+    loaded_on = []
+
+    def load(path):
+        loaded_on.append(threading.current_thread())
+        raise OSError(path)
+
+    monkeypatch.setattr(intent.IntentModel, "load", staticmethod(load))
+
+    async def main():
+        return await intent.aclassify("book a room"), await intent.aclassify("hi")
+
+    assert asyncio.run(main()) == (None, None)
+    assert len(loaded_on) == 1
+    assert loaded_on[0] is not threading.main_thread()
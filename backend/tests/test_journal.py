@@ -0,0 +1,229 @@
+# backend/tests/test_journal.py
+#
+# Crash recovery of journaled collections (utils.journal and
+# utils.json_store): torn trailing lines, a journal left behind by a
+# crash during compaction, and compaction racing with appends.
+
+import json
+import os
+import threading
+
+import pytest
+
+from utils import codec, journal, json_store
+from utils.sqlite_store import SQLiteStore, migrate_json_files
+
+FILE = "meetings.json"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_store, "BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(json_store, "STORAGE_BACKEND", "json")
+    monkeypatch.setattr(json_store, "JOURNALED", {FILE})
+    json_store.clear_cache()
+    yield tmp_path
+    json_store.clear_cache()
+
+
+def _journal(tmp_path) -> str:
+    return os.path.join(tmp_path, "meetings.journal")
+
+
+def _ids(records) -> list:
+    return [r["id"] for r in records]
+
+# ---------- utils.journal ----------
+
+def test_read_skips_torn_tail_and_stops_before_it(tmp_path):
+    path = str(tmp_path / "x.journal")
+    journal.reset(path, "digest")
+    journal.append(path, {"op": "insert", "record": {"id": "a"}})
+    complete = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"op":"insert","record":{"id":"b"')
+
+    base, ops, end = journal.read(path)
+
+    assert base == "digest"
+    assert ops == [{"op": "insert", "record": {"id": "a"}}]
+    assert end == complete
+
+
+def test_append_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / "x.journal")
+    journal.reset(path, "digest")
+    with open(path, "ab") as f:
+        f.write(b'{"op":"ins')
+
+    size = journal.append(path, {"op": "insert", "record": {"id": "c"}})
+
+    base, ops, end = journal.read(path)
+    assert size == end == os.path.getsize(path)
+    assert ops == [{"op": "insert", "record": {"id": "c"}}]
+
+
+def test_corrupted_middle_line_is_skipped(tmp_path):
+    path = str(tmp_path / "x.journal")
+    journal.reset(path, "digest")
+    with open(path, "ab") as f:
+        f.write(b"garbage\n")
+    journal.append(path, {"op": "insert", "record": {"id": "d"}})
+
+    _, ops, _ = journal.read(path)
+    assert ops == [{"op": "insert", "record": {"id": "d"}}]
+
+
+def test_apply_patch_rename_and_delete():
+    records = [{"id": "a", "v": 1}, {"id": "b", "v": 2}]
+    journal.apply(records, [
+        {"op": "patch", "id": "a", "patch": {"id": "a2", "v": 3}},
+        {"op": "delete", "id": "b"},
+        {"op": "patch", "id": "a2", "patch": {"v": 4}},
+        {"op": "delete", "id": "missing"},
+    ], "id")
+    assert records == [{"id": "a2", "v": 4}]
+
+# ---------- json_store._load_journaled ----------
+
+def test_kill_mid_append_replays_complete_ops(store):
+    json_store.insert_record(FILE, {"id": "m1"})
+    json_store.insert_record(FILE, {"id": "m2"})
+    # Process killed while writing the third op
+    with open(_journal(store), "ab") as f:
+        f.write(b'{"op":"insert","record":{"id":"m3"')
+    json_store.clear_cache()
+
+    assert _ids(json_store.read_json(FILE)) == ["m1", "m2"]
+
+    # The next append repairs the tail
+    json_store.insert_record(FILE, {"id": "m4"})
+    json_store.clear_cache()
+    assert _ids(json_store.read_json(FILE)) == ["m1", "m2", "m4"]
+
+
+def test_stale_journal_is_not_replayed_twice(store):
+    json_store.insert_record(FILE, {"id": "m1"})
+    json_store.update_record(FILE, "m1", {"title": "x"})
+    stale = open(_journal(store), "rb").read()
+
+    json_store.compact(FILE)
+    # Crash between writing the new snapshot and resetting the journal:
+    # the old journal (with ops already folded in) is still there
+    with open(_journal(store), "wb") as f:
+        f.write(stale)
+    json_store.clear_cache()
+
+    assert json_store.read_json(FILE) == [{"id": "m1", "title": "x"}]
+
+    # Appending starts a fresh journal for the current snapshot
+    json_store.insert_record(FILE, {"id": "m2"})
+    json_store.clear_cache()
+    assert _ids(json_store.read_json(FILE)) == ["m1", "m2"]
+
+
+def test_cached_entry_replays_only_the_journal_tail(store):
+    json_store.insert_record(FILE, {"id": "m1"})
+    json_store.compact(FILE)
+    assert _ids(json_store.read_json(FILE)) == ["m1"]
+
+    # Another process appends
+    journal.append(_journal(store), {"op": "insert", "record": {"id": "m2"}})
+
+    replays = json_store.cache_stats()["replays"]
+    assert _ids(json_store.read_json(FILE)) == ["m1", "m2"]
+    assert json_store.cache_stats()["replays"] == replays + 1
+
+
+def test_snapshot_replaced_elsewhere_invalidates_cache(store):
+    json_store.insert_record(FILE, {"id": "m1"})
+    json_store.read_json(FILE)
+
+    # Another process compacts: new snapshot, journal reset
+    payload = codec.encode([{"id": "m1"}, {"id": "m9"}], "compact")
+    with open(store / FILE, "wb") as f:
+        f.write(payload)
+    journal.reset(_journal(store), journal.snapshot_digest(payload))
+
+    assert _ids(json_store.read_json(FILE)) == ["m1", "m9"]
+
+
+def test_compaction_racing_appends_loses_nothing(store, monkeypatch):
+    monkeypatch.setattr(json_store, "JOURNAL_COMPACT_BYTES", 10 ** 9)
+    stop = threading.Event()
+
+    def compactor():
+        # Yield between compactions: the write lock is not fair between writers
+        while not stop.wait(0.001):
+            json_store.compact(FILE)
+
+    def writer(n):
+        for i in range(100):
+            json_store.insert_record(FILE, {"id": f"w{n}-{i}"})
+
+    thread = threading.Thread(target=compactor)
+    thread.start()
+    try:
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for w in writers:
+            w.start()
+        for w in writers:
+            w.join()
+    finally:
+        stop.set()
+        thread.join()
+
+    json_store.clear_cache()
+    assert len(json_store.read_json(FILE)) == 400
+
+# ---------- migration ----------
+
+def test_migration_replays_journal_and_reads_binary(store):
+    json_store.insert_record(FILE, {"id": "m1"})
+    json_store.compact(FILE)
+    json_store.insert_record(FILE, {"id": "m2"})
+    json_store.delete_record(FILE, "m1")
+    with open(store / "users.json", "wb") as f:
+        f.write(codec.encode([{"id": "u1"}], "binary"))
+
+    db = SQLiteStore(str(store / "migrated.db"))
+    counts = migrate_json_files(str(store), db)
+
+    assert counts == {"meetings": 1, "users": 1}
+    assert _ids(db.load("meetings", [])) == ["m2"]
+    assert json.loads(json.dumps(db.load("users", []))) == [{"id": "u1"}]
+
+
+def test_duplicate_ids_are_rejected_by_name(store):
+    db = SQLiteStore(str(store / "migrated.db"))
+    db.replace("meetings", [{"id": "m0"}])
+
+    with pytest.raises(ValueError, match="Duplicate id in meetings: m1"):
+        db.replace("meetings", [{"id": "m1"}, {"id": "m1"}])
+    assert _ids(db.load("meetings", [])) == ["m0"]
+
+    with open(store / FILE, "w") as f:
+        json.dump([{"id": "m1"}, {"id": "m1"}], f)
+    with pytest.raises(ValueError, match="meetings.json: Duplicate id in meetings: m1"):
+        migrate_json_files(str(store), db)
+
+
+def test_convert_does_not_change_the_format_of_other_writes(store, monkeypatch):
+    json_store.write_json(FILE, [{"id": "m1"}])
+    encode = codec.encode
+    raced = []
+
+    def encode_racing_another_write(data, fmt):
+        # Another collection is written while meetings.json is converted
+        if fmt == "binary" and not raced:
+            raced.append(1)
+            writer = threading.Thread(target=json_store.write_json, args=("users.json", [{"id": "u1"}]))
+            writer.start()
+            writer.join()
+        return encode(data, fmt)
+
+    monkeypatch.setattr(codec, "encode", encode_racing_another_write)
+
+    assert json_store.convert(FILE, "binary") == json_store.STORAGE_FORMAT
+    assert codec.detect((store / FILE).read_bytes()) == "binary"
+    assert codec.detect((store / "users.json").read_bytes()) == json_store.STORAGE_FORMAT
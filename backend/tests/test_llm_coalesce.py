@@ -0,0 +1,101 @@
+# backend/tests/test_llm_coalesce.py
+#
+# Upstream calls made for bursts of LLM requests, counted at stub
+# Ollama servers (benchmarks.stub_ollama): single-flight in llm.client
+# and llm.aclient, and aclient micro-batching.
+
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks.stub_ollama import AsyncStubOllama, StubOllama
+from llm import aclient, client, scheduler
+
+MODEL = "orchestrator-model"
+BURST = 50
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    # Count calls, not queueing: the stub serves every request in parallel
+    monkeypatch.setattr(scheduler, "LLM_SCHEDULER", False)
+    monkeypatch.setattr(client, "OLLAMA_ENDPOINTS", "")
+    monkeypatch.setattr(client, "_endpoints", None)
+
+
+def _sync_burst(prompt: str) -> None:
+    start = threading.Barrier(BURST)
+
+    def call():
+        start.wait()
+        client.ollama_generate(model=MODEL, prompt=prompt)
+
+    threads = [threading.Thread(target=call) for _ in range(BURST)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize("flight", [False, True])
+def test_sync_identical_calls_share_one_upstream_call(monkeypatch, flight):
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", flight)
+    with StubOllama(base_latency_ms=100) as stub:
+        monkeypatch.setattr(client, "OLLAMA_URL", stub.url)
+        _sync_burst("hi")
+        assert stub.requests == (1 if flight else BURST)
+
+
+@pytest.mark.parametrize("flight", [False, True])
+def test_async_identical_calls_share_one_upstream_call(monkeypatch, flight):
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", flight)
+    with AsyncStubOllama(base_latency_ms=100) as stub:
+        monkeypatch.setattr(client, "OLLAMA_URL", stub.url)
+
+        async def burst():
+            return await asyncio.gather(*(
+                aclient.aollama_generate(model=MODEL, prompt="hi") for _ in range(BURST)
+            ))
+
+        replies = asyncio.run(burst())
+        assert len(set(replies)) == 1
+        assert stub.requests == (1 if flight else BURST)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call(monkeypatch):
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", True)
+    with AsyncStubOllama(base_latency_ms=100) as stub:
+        monkeypatch.setattr(client, "OLLAMA_URL", stub.url)
+
+        async def main():
+            first = asyncio.ensure_future(aclient.aollama_generate(model=MODEL, prompt="hi"))
+            second = asyncio.ensure_future(aclient.aollama_generate(model=MODEL, prompt="hi"))
+            await asyncio.sleep(0.02)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(main())
+        assert stub.requests == 1
+
+
+def test_micro_batches_cap_calls_at_the_model(monkeypatch):
+    monkeypatch.setattr(client, "LLM_SINGLE_FLIGHT", True)
+    monkeypatch.setattr(aclient, "LLM_BATCH_WINDOW_MS", 10)
+    monkeypatch.setattr(aclient, "LLM_BATCH_MAX", 4)
+    prompts = [f"prompt {i % 20}" for i in range(BURST)]
+
+    with AsyncStubOllama(base_latency_ms=50) as stub:
+        monkeypatch.setattr(client, "OLLAMA_URL", stub.url)
+        batches = aclient.flight_stats()["batches"]
+
+        async def burst():
+            return await asyncio.gather(*(
+                aclient.aollama_generate(model=MODEL, prompt=p, batch=True) for p in prompts
+            ))
+
+        assert len(asyncio.run(burst())) == BURST
+        # One upstream call per distinct prompt, at most LLM_BATCH_MAX at once
+        assert stub.requests == 20
+        assert stub.max_in_flight <= 4
+        assert aclient.flight_stats()["batches"] - batches >= 5
@@ -0,0 +1,115 @@
+# backend/tests/test_user_queue.py
+#
+# chat.user_queue: per-user ordering, coalescing, and cancellation of
+# a request other requests are coalesced onto.
+
+import asyncio
+
+import pytest
+
+from chat.user_queue import AsyncUserQueue, UserBusy
+
+
+def test_requests_of_one_user_run_in_order():
+    async def main():
+        queue = AsyncUserQueue()
+        order = []
+
+        async def work(n):
+            await asyncio.sleep(0.01 * (3 - n))
+            order.append(n)
+            return n
+
+        results = await asyncio.gather(*(
+            queue.run("u", n, lambda n=n: work(n)) for n in range(3)
+        ))
+        return results, order
+
+    assert asyncio.run(main()) == ([0, 1, 2], [0, 1, 2])
+
+
+def test_identical_requests_run_once():
+    async def main():
+        queue = AsyncUserQueue()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*(queue.run("u", "k", work) for _ in range(3)))
+        return results, len(calls), queue.coalesced
+
+    assert asyncio.run(main()) == (["ok"] * 3, 1, 2)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        queue = AsyncUserQueue()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.ensure_future(queue.run("u", "k", work))
+        await started.wait()
+        follower = asyncio.ensure_future(queue.run("u", "k", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, queue.stats()["pending"]
+
+    assert asyncio.run(main()) == ("ok", 0)
+
+
+def test_cancelled_sole_request_stops_its_work():
+    async def main():
+        queue = AsyncUserQueue()
+        finished = []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        request = asyncio.ensure_future(queue.run("u", "k", work))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0.08)
+        return finished, queue.stats()["users_active"]
+
+    assert asyncio.run(main()) == ([], 0)
+
+
+def test_too_many_pending_requests_are_rejected():
+    async def main():
+        queue = AsyncUserQueue(max_pending=1)
+        first = asyncio.ensure_future(queue.run("u", 1, lambda: asyncio.sleep(0.01)))
+        await asyncio.sleep(0)
+        with pytest.raises(UserBusy):
+            await queue.run("u", 2, lambda: asyncio.sleep(0))
+        await first
+
+    asyncio.run(main())
+
+
+def test_controller_coalesces_only_retries_of_one_request():
+    from starlette.requests import Request
+
+    from chat.controller import _key
+
+    def request(headers=()):
+        return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+    # Two identical messages are two turns
+    assert _key(request(), "chat") != _key(request(), "chat")
+
+    retry = [("idempotency-key", "abc")]
+    assert _key(request(retry), "chat") == _key(request(retry), "chat")
+    assert _key(request(retry), "chat") != _key(request(retry), "stream")
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from uuid import uuid4
-from auth import get_current_user
-from utils.json_store import read_json, write_json
+from auth import get_current_user, invalidate_principal
+from lock import LOCKS
+from utils.collection import TICKETS, USERS
 from audit import log_event
 from llm.ticket_llm import troubleshoot
-from rules.ticket_rules import assign_admin
 
 router = APIRouter(prefix="/tickets")
 
@@ -22,8 +22,6 @@ class TicketReply(BaseModel):
 
 @router.post("")
 def create_ticket(req: TicketCreate, user=Depends(get_current_user)):
-    tickets = read_json("tickets.json")
-
     ticket_id = f"TCK-{uuid4().hex[:8]}"
     record = {
         "id": ticket_id,
@@ -35,8 +33,7 @@ def create_ticket(req: TicketCreate, user=Depends(get_current_user)):
         "history": []
     }
 
-    tickets.append(record)
-    write_json("tickets.json", tickets)
+    TICKETS.insert(record)
 
     log_event(user["id"], "TICKET_CREATED", ticket_id)
 
@@ -44,23 +41,35 @@ def create_ticket(req: TicketCreate, user=Depends(get_current_user)):
 
 @router.post("/ai")
 def ai_troubleshoot(req: TicketReply, user=Depends(get_current_user)):
-    tickets = read_json("tickets.json")
-
-    ticket = next((t for t in tickets if t["id"] == req.ticket_id), None)
+    ticket = TICKETS.get(req.ticket_id)
     if not ticket or ticket["created_by"] != user["id"]:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
     if ticket["attempts"] >= 2:
         raise HTTPException(status_code=409, detail="AI attempts exhausted")
 
+    # LLM call runs outside the lock; attempts are re-checked on commit
     result = troubleshoot(ticket["issue"])
-    ticket["attempts"] += 1
-    ticket["history"].append({"ai": result})
 
-    if result["resolved"]:
-        ticket["status"] = "resolved"
+    with LOCKS.write("tickets.json"):
+        ticket = TICKETS.get(req.ticket_id)
+        if not ticket:
+            # Deleted while the LLM call ran
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        if ticket["attempts"] >= 2:
+            raise HTTPException(status_code=409, detail="AI attempts exhausted")
+
+        patch = {
+            "attempts": ticket["attempts"] + 1,
+            "history": [*ticket["history"], {"ai": result}],
+        }
+
+        if result["resolved"]:
+            patch["status"] = "resolved"
+
+        TICKETS.update(ticket["id"], patch)
 
-    write_json("tickets.json", tickets)
     log_event(user["id"], "TICKET_AI_ATTEMPT", ticket["id"])
 
     return result
@@ -69,23 +78,30 @@ def ai_troubleshoot(req: TicketReply, user=Depends(get_current_user)):
 
 @router.post("/escalate/{ticket_id}")
 def escalate(ticket_id: str, user=Depends(get_current_user)):
-    tickets = read_json("tickets.json")
-    users = read_json("users.json")
-
-    ticket = next((t for t in tickets if t["id"] == ticket_id), None)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    # Exclusive lock across read → assign → write so two escalations
+    # cannot both see the same admin load and overwrite each other
+    with LOCKS.write("tickets.json"):
+        ticket = TICKETS.get(ticket_id)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        # Least-loaded active admin (same rule as rules.ticket_rules.assign_admin)
+        admins = USERS.find(role="admin", active=True)
+        admin = min(
+            admins,
+            key=lambda a: TICKETS.count(assigned_admin=a["id"]),
+            default=None
+        )
+
+        if not admin:
+            raise HTTPException(status_code=503, detail="No admin available")
+
+        admin_id = admin["id"]
+        TICKETS.update(ticket_id, {
+            "assigned_admin": admin_id,
+            "status": "escalated"
+        })
 
-    admins = [u for u in users if u["role"] == "admin" and u["active"]]
-    admin_id = assign_admin(tickets, admins)
-
-    if not admin_id:
-        raise HTTPException(status_code=503, detail="No admin available")
-
-    ticket["assigned_admin"] = admin_id
-    ticket["status"] = "escalated"
-
-    write_json("tickets.json", tickets)
     log_event(user["id"], "TICKET_ESCALATED", ticket_id)
 
     return {"assigned_admin": admin_id}
@@ -94,36 +110,30 @@ def escalate(ticket_id: str, user=Depends(get_current_user)):
 
 @router.get("")
 def list_tickets(user=Depends(get_current_user)):
-    tickets = read_json("tickets.json")
-
     if user["role"] == "admin":
-        return [t for t in tickets if t["assigned_admin"] == user["id"]]
+        return TICKETS.find(assigned_admin=user["id"])
 
     if user["role"] == "superuser":
-        return tickets
+        return TICKETS.all()
 
-    return [t for t in tickets if t["created_by"] == user["id"]]
+    return TICKETS.find(created_by=user["id"])
 
 @router.post("/close/{ticket_id}")
 def close_ticket(ticket_id: str, user=Depends(get_current_user)):
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
 
-    tickets = read_json("tickets.json")
-    users = read_json("users.json")
-
-    ticket = next((t for t in tickets if t["id"] == ticket_id), None)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-
-    ticket["status"] = "closed"
+    # Lock order: tickets → users
+    with LOCKS.write("tickets.json"), LOCKS.write("users.json"):
+        ticket = TICKETS.get(ticket_id)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
 
-    # Suspend user
-    ticket_owner = next(u for u in users if u["id"] == ticket["created_by"])
-    ticket_owner["active"] = False
+        TICKETS.update(ticket_id, {"status": "closed"})
 
-    write_json("tickets.json", tickets)
-    write_json("users.json", users)
+        # Suspend user
+        USERS.update(ticket["created_by"], {"active": False})
+        invalidate_principal(ticket["created_by"])
 
     log_event(user["id"], "TICKET_CLOSED_AND_USER_SUSPENDED", ticket_id)
 
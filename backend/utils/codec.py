@@ -0,0 +1,103 @@
+# backend/utils/codec.py
+#
+# Snapshot encodings for utils.json_store.
+#
+#   pretty  → indented JSON (human-readable, debugging)
+#   compact → JSON without whitespace (orjson when installed)
+#   binary  → MAGIC + codec byte + payload
+#             msgpack when installed, stdlib marshal otherwise
+#
+# decode() detects the format from the content, so files written in
+# any format can be read regardless of the current setting.
+
+import json
+import marshal
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary codec
+    msgpack = None
+
+FORMATS = ("pretty", "compact", "binary")
+
+MAGIC = b"\x00IDSK"
+_MSGPACK = b"m"
+_MARSHAL = b"M"
+
+
+def _to_json_types(data):
+    return json.loads(json.dumps(data))
+
+
+def encode(data, fmt: str = "pretty") -> bytes:
+    if fmt == "pretty":
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        return json.dumps(data, indent=2).encode("utf-8")
+
+    if fmt == "compact":
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    if fmt == "binary":
+        if msgpack is not None:
+            return MAGIC + _MSGPACK + msgpack.packb(data, use_bin_type=True)
+        try:
+            return MAGIC + _MARSHAL + marshal.dumps(data)
+        except ValueError:
+            # marshal only takes exact builtin types (no dict subclasses)
+            return MAGIC + _MARSHAL + marshal.dumps(_to_json_types(data))
+
+    raise ValueError(f"Unknown storage format: {fmt} (expected one of {FORMATS})")
+
+
+def detect(content: bytes) -> str:
+    if content.startswith(MAGIC):
+        return "binary"
+    stripped = content.lstrip()
+    if stripped[:2] in (b"[\n", b"{\n") or b"\n  " in stripped[:64]:
+        return "pretty"
+    return "compact"
+
+
+def decode(content: bytes):
+    """
+    Parse snapshot bytes in any supported format.
+    Returns None for empty content; raises ValueError when corrupted.
+    """
+    if content.startswith(MAGIC):
+        codec = content[len(MAGIC):len(MAGIC) + 1]
+        payload = content[len(MAGIC) + 1:]
+
+        if codec == _MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack snapshot but msgpack is not installed")
+            try:
+                return msgpack.unpackb(payload, raw=False)
+            except Exception as e:
+                raise ValueError(f"Corrupted msgpack snapshot: {e}")
+
+        if codec == _MARSHAL:
+            try:
+                return marshal.loads(payload)
+            except (EOFError, TypeError, ValueError) as e:
+                raise ValueError(f"Corrupted marshal snapshot: {e}")
+
+        raise ValueError(f"Unknown binary codec: {codec!r}")
+
+    content = content.strip()
+    if not content:
+        return None
+
+    try:
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Corrupted JSON snapshot: {e}")
@@ -0,0 +1,262 @@
+# backend/utils/collection.py
+#
+# Indexed collection layer above utils.json_store.
+#
+# A Collection keeps a primary-key map and hash indexes on declared
+# fields, so handlers get O(1) lookups by id and O(k) lookups such as
+# "tickets assigned to admin X" instead of scanning the whole list.
+#
+# Indexes are maintained incrementally for writes made through the
+# Collection, and rebuilt once (O(n)) when the underlying document
+# changed some other way (write_json, transaction, another process).
+# Records returned are read-only (FrozenDict); mutate through
+# insert / update / delete or json_store.transaction().
+
+from typing import Dict, Iterable, List, Optional
+
+from lock import LOCKS
+from utils.json_store import (
+    FrozenDict,
+    delete_record,
+    document_version,
+    freeze,
+    insert_record,
+    read_json_view,
+    sqlite_backend,
+    update_record,
+)
+from utils.sqlite_store import collection_name, key_field
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class _State:
+    """
+    Index snapshot for one document version.
+    Records live in insertion-ordered slots; indexes map
+    value → ordered set of slots.
+    """
+
+    def __init__(self, version, key: str, fields: Iterable[str]):
+        self.version = version
+        self.key = key
+        self.records: Dict[int, FrozenDict] = {}
+        self.by_key: Dict[object, int] = {}
+        self.indexes: Dict[str, Dict[object, Dict[int, None]]] = {
+            f: {} for f in fields
+        }
+        self._next = 0
+
+    def add(self, record) -> None:
+        slot = self._next
+        self._next += 1
+        self.records[slot] = record
+        self._index(slot, record)
+
+    def _index(self, slot: int, record) -> None:
+        if not isinstance(record, dict):
+            return
+
+        rid = record.get(self.key)
+        if rid is not None and _hashable(rid):
+            self.by_key[rid] = slot
+
+        for field, index in self.indexes.items():
+            value = record.get(field)
+            if _hashable(value):
+                index.setdefault(value, {})[slot] = None
+
+    def _unindex(self, slot: int, record) -> None:
+        if not isinstance(record, dict):
+            return
+
+        rid = record.get(self.key)
+        if rid is not None and _hashable(rid) and self.by_key.get(rid) == slot:
+            del self.by_key[rid]
+
+        for field, index in self.indexes.items():
+            value = record.get(field)
+            if not _hashable(value):
+                continue
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(slot, None)
+                if not bucket:
+                    del index[value]
+
+    def replace(self, record_id, record) -> None:
+        slot = self.by_key.get(record_id)
+        if slot is None:
+            return
+
+        # Same slot, so collection order is unchanged
+        self._unindex(slot, self.records[slot])
+        self.records[slot] = record
+        self._index(slot, record)
+
+    def remove(self, record_id) -> None:
+        slot = self.by_key.get(record_id)
+        if slot is not None:
+            self._unindex(slot, self.records.pop(slot))
+
+
+class Collection:
+    """
+    Indexed access to one list collection.
+
+        TICKETS.get("TCK-1a2b3c4d")
+        TICKETS.find(assigned_admin="a1")
+        EQUIPMENT.find(status="pending_approval", secret_code=code)
+    """
+
+    def __init__(self, filename: str, indexes: Iterable[str] = ()):
+        self.filename = filename
+        self.key = key_field(collection_name(filename))
+        self.fields = tuple(indexes)
+        self._state: Optional[_State] = None
+
+    # ---------------- INTERNAL ----------------
+
+    def _sqlite(self):
+        store = sqlite_backend()
+        if store is None:
+            return None
+
+        name = collection_name(self.filename)
+        for field in self.fields:
+            store.ensure_index(name, field)
+        return store
+
+    def _current(self) -> _State:
+        """
+        Index state matching the stored document.
+        Caller holds the collection lock.
+        """
+        version = document_version(self.filename)
+        state = self._state
+
+        if state is None or state.version != version:
+            state = _State(version, self.key, self.fields)
+            for record in read_json_view(self.filename):
+                state.add(record)
+            self._state = state
+
+        return state
+
+    def _lookup(self, state: _State, filters: dict) -> List[FrozenDict]:
+        indexed = [f for f in filters if f in state.indexes and _hashable(filters[f])]
+
+        rest = dict(filters)
+
+        if self.key in filters and _hashable(filters[self.key]):
+            slot = state.by_key.get(rest.pop(self.key))
+            slots = [] if slot is None else [slot]
+        elif indexed:
+            # Smallest bucket first, filter the rest linearly
+            field = min(indexed, key=lambda f: len(state.indexes[f].get(filters[f], ())))
+            slots = sorted(state.indexes[field].get(rest.pop(field), ()))
+        else:
+            slots = state.records.keys()
+
+        records = state.records
+        if not rest:
+            return [records[slot] for slot in slots]
+
+        return [
+            records[slot] for slot in slots
+            if all(records[slot].get(k) == v for k, v in rest.items())
+        ]
+
+    # ---------------- READ ----------------
+
+    def get(self, record_id) -> Optional[FrozenDict]:
+        store = self._sqlite()
+        if store is not None:
+            record = store.get(collection_name(self.filename), record_id)
+            return None if record is None else freeze(record)
+
+        with LOCKS.read(self.filename):
+            state = self._current()
+            slot = state.by_key.get(record_id)
+            return None if slot is None else state.records[slot]
+
+    def find(self, **filters) -> List[FrozenDict]:
+        """
+        Records whose top-level fields equal all filters,
+        in collection order.
+        """
+        store = self._sqlite()
+        if store is not None:
+            return [
+                freeze(r)
+                for r in store.query(collection_name(self.filename), filters)
+            ]
+
+        with LOCKS.read(self.filename):
+            return self._lookup(self._current(), filters)
+
+    def find_one(self, **filters) -> Optional[FrozenDict]:
+        found = self.find(**filters)
+        return found[0] if found else None
+
+    def count(self, **filters) -> int:
+        return len(self.find(**filters))
+
+    def all(self):
+        return read_json_view(self.filename)
+
+    # ---------------- WRITE ----------------
+
+    def insert(self, record: dict) -> dict:
+        if self._sqlite() is not None:
+            return insert_record(self.filename, record)
+
+        with LOCKS.write(self.filename):
+            state = self._current()
+            insert_record(self.filename, record)
+
+            state.add(freeze(record))
+            state.version = document_version(self.filename)
+        return record
+
+    def update(self, record_id, patch: dict) -> Optional[dict]:
+        if self._sqlite() is not None:
+            return update_record(self.filename, record_id, patch)
+
+        with LOCKS.write(self.filename):
+            state = self._current()
+            updated = update_record(self.filename, record_id, patch)
+            if updated is None:
+                return None
+
+            state.replace(record_id, freeze(updated))
+            state.version = document_version(self.filename)
+        return updated
+
+    def delete(self, record_id) -> bool:
+        if self._sqlite() is not None:
+            return delete_record(self.filename, record_id)
+
+        with LOCKS.write(self.filename):
+            state = self._current()
+            if not delete_record(self.filename, record_id):
+                return False
+
+            state.remove(record_id)
+            state.version = document_version(self.filename)
+        return True
+
+# ======================================================
+# APPLICATION COLLECTIONS
+# ======================================================
+
+USERS = Collection("users.json", indexes=("username", "role"))
+MEETINGS = Collection("meetings.json", indexes=("created_by",))
+TICKETS = Collection("tickets.json", indexes=("created_by", "assigned_admin", "status"))
+EQUIPMENT = Collection("equipment.json", indexes=("status", "secret_code"))
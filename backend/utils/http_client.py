@@ -0,0 +1,97 @@
+# backend/utils/http_client.py
+#
+# Shared, connection-pooled HTTP sessions for outbound calls
+# (Ollama, Gmail, Webex). One requests.Session per upstream keeps
+# TCP/TLS connections alive between calls instead of reconnecting
+# on every request.
+#
+# Retries use urllib3 backoff (HTTP_BACKOFF * 2^n seconds):
+#   - connection errors are always retried (nothing reached the server)
+#   - 502/503/504 are retried only for idempotent upstreams (Ollama
+#     generation), never for side-effecting POSTs such as sending an
+#     email or creating a meeting
+#   - read errors are never retried: a read timeout already waited the
+#     full read timeout (120 s for a generation), and repeating it
+#     would multiply the worst-case wait
+#
+#   HTTP_POOL_SIZE        connections kept per upstream host (default 10)
+#   HTTP_RETRIES          retry attempts (default 2)
+#   HTTP_BACKOFF          backoff factor in seconds (default 0.3)
+#   HTTP_CONNECT_TIMEOUT  connect timeout in seconds (default 3.05)
+
+import os
+from threading import Lock
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+
+_RETRY_STATUS = (502, 503, 504)
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = Lock()
+
+
+def _retry(idempotent: bool) -> Retry:
+    if idempotent:
+        return Retry(
+            total=HTTP_RETRIES,
+            connect=HTTP_RETRIES,
+            read=0,
+            status=HTTP_RETRIES,
+            backoff_factor=HTTP_BACKOFF,
+            status_forcelist=_RETRY_STATUS,
+            allowed_methods=None,      # retry POST too
+            raise_on_status=False,
+        )
+    return Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=0,
+        status=0,
+        backoff_factor=HTTP_BACKOFF,
+    )
+
+
+def session(name: str, idempotent: bool = False) -> requests.Session:
+    """
+    Shared pooled session for one upstream ("ollama", "gmail", ...).
+    idempotent is fixed by the first call for a name.
+    """
+    s = _sessions.get(name)
+    if s is not None:
+        return s
+
+    with _sessions_lock:
+        s = _sessions.get(name)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=_retry(idempotent),
+            )
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _sessions[name] = s
+        return s
+
+
+def timeout(read: float) -> Tuple[float, float]:
+    """
+    (connect, read) timeout for requests.
+    """
+    return (HTTP_CONNECT_TIMEOUT, read)
+
+
+def close_all() -> None:
+    with _sessions_lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
@@ -0,0 +1,179 @@
+# backend/utils/journal.py
+#
+# Append-only mutation journal for list collections.
+#
+# <collection>.journal holds one JSON object per line:
+#   {"op": "base",   "snapshot": "<digest of snapshot bytes>"}   (first line)
+#   {"op": "insert", "record": {...}}
+#   {"op": "patch",  "id": "...", "patch": {...}}
+#   {"op": "delete", "id": "..."}
+#
+# The base line ties the journal to one snapshot. If a crash happens
+# after a new snapshot is written but before the journal is reset, the
+# digests no longer match and the stale journal is ignored instead of
+# being replayed twice. A torn last line (crash mid-append) is skipped
+# on read and cut off before the next append.
+
+import hashlib
+import json
+import os
+from typing import List, Optional, Tuple
+
+_DELETED = object()
+
+
+def snapshot_digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _dumps(op: dict) -> bytes:
+    return (json.dumps(op, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def read(path: str, offset: int = 0) -> Tuple[Optional[str], List[dict], int]:
+    """
+    Read complete lines starting at offset.
+    Returns (base digest if the header was read, ops, end offset).
+    The end offset stops after the last newline, so a torn
+    trailing line is re-read once it is complete (or repaired).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            buf = f.read()
+    except FileNotFoundError:
+        return None, [], 0
+
+    end = buf.rfind(b"\n")
+    if end < 0:
+        return None, [], offset
+
+    base = None
+    ops = []
+
+    for line in buf[:end].split(b"\n"):
+        try:
+            op = json.loads(line)
+        except ValueError:
+            # Corrupted line: skip it, keep replaying the rest
+            continue
+
+        if not isinstance(op, dict):
+            continue
+
+        if op.get("op") == "base":
+            base = op.get("snapshot")
+        else:
+            ops.append(op)
+
+    return base, ops, offset + end + 1
+
+
+def reset(path: str, digest: str, fsync: bool = False) -> int:
+    """
+    Atomically replace the journal with just a base line.
+    Returns the new journal size.
+    """
+    line = _dumps({"op": "base", "snapshot": digest})
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(line)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+    return len(line)
+
+
+def _last_newline_end(f, end: int) -> int:
+    """
+    Offset just past the last newline before end (0 if none).
+    """
+    chunk = 4096
+    pos = end
+    while pos > 0:
+        start = max(0, pos - chunk)
+        f.seek(start)
+        idx = f.read(pos - start).rfind(b"\n")
+        if idx >= 0:
+            return start + idx + 1
+        pos = start
+    return 0
+
+
+def append(path: str, op: dict, fsync: bool = False) -> int:
+    """
+    Append one op. The journal must exist (see reset()).
+    A torn trailing line is truncated first.
+    Returns the new journal size.
+    """
+    line = _dumps(op)
+
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                end = _last_newline_end(f, end)
+                f.truncate(end)
+
+        f.seek(end)
+        f.write(line)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+    return end + len(line)
+
+
+def apply(records: list, ops: List[dict], key: str) -> list:
+    """
+    Replay ops onto records in place.
+    Patches / deletes of unknown ids are ignored.
+    """
+    index = None
+    deleted = False
+
+    for op in ops:
+        kind = op.get("op")
+
+        if kind == "insert":
+            records.append(op.get("record"))
+            if index is not None:
+                rec = records[-1]
+                if isinstance(rec, dict):
+                    index[rec.get(key)] = len(records) - 1
+            continue
+
+        if kind not in ("patch", "delete"):
+            continue
+
+        if index is None:
+            index = {
+                r.get(key): i
+                for i, r in enumerate(records)
+                if isinstance(r, dict)
+            }
+
+        i = index.get(op.get("id"))
+        if i is None:
+            continue
+
+        if kind == "patch":
+            records[i].update(op.get("patch") or {})
+            new_id = records[i].get(key)
+            if new_id != op.get("id"):
+                index.pop(op.get("id"), None)
+                index[new_id] = i
+        else:
+            records[i] = _DELETED
+            index.pop(op.get("id"), None)
+            deleted = True
+
+    if deleted:
+        records[:] = [r for r in records if r is not _DELETED]
+
+    return records
@@ -1,9 +1,220 @@
 import json
 import os
-from lock import GLOBAL_LOCK
+import pickle
+import queue
+from contextlib import contextmanager
+from threading import Lock, Thread
+from typing import Dict, Optional
+
+from lock import LOCKS
+from utils import codec, journal
+from utils.sqlite_store import DEFAULT_DB_NAME, SQLiteStore, collection_name, key_field
 
 BASE_PATH = "storage"
 
+# "json"   → one JSON document per file (default)
+# "sqlite" → utils.sqlite_store, one row per record (WAL mode)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH")
+
+# Snapshot encoding for the JSON backend (see utils.codec):
+# "pretty" (indented, debugging), "compact" (production), "binary".
+# Reads detect the format, so it can be switched at any time.
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "pretty")
+
+# JSON backend only: collections stored as snapshot + <collection>.journal.
+# Record-level writes append one line instead of rewriting the file.
+JOURNALED = {
+    name.strip()
+    for name in os.getenv("STORAGE_JOURNALED", "meetings.json,tickets.json").split(",")
+    if name.strip()
+}
+JOURNAL_COMPACT_BYTES = int(os.getenv("STORAGE_JOURNAL_COMPACT_BYTES", str(1024 * 1024)))
+JOURNAL_FSYNC = os.getenv("STORAGE_JOURNAL_FSYNC", "0") == "1"
+
+# ======================================================
+# DOCUMENT CACHE
+# ======================================================
+#
+# Parsed documents are cached per filename and validated against
+# (st_mtime_ns, st_size, st_ino) of the file on every read, so an
+# unchanged file is never re-parsed and a file replaced by another
+# process (or by hand) is picked up on the next read.
+#
+# Each entry keeps a pickle snapshot of the document. Callers that
+# mutate get a private copy restored from the snapshot (much cheaper
+# than json.loads); read-only callers share one frozen view.
+
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict used for cached views.
+    Still a real dict, so json / FastAPI serialization just works.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached document view is read-only; use read_json() to mutate")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+_view_lock = Lock()
+
+
+def _private(obj):
+    return pickle.loads(pickle.dumps(obj, protocol=_PICKLE_PROTOCOL))
+
+
+def _plain(obj):
+    """
+    Exactly what a JSON round trip would store: plain dicts / lists,
+    no aliasing of the caller's objects, no frozen views.
+    """
+    return json.loads(json.dumps(obj))
+
+
+class _Entry:
+    """
+    Cached document. Never handed out directly: callers get a
+    pickle copy or the frozen view. Only mutated (via apply())
+    under the collection's write lock.
+    """
+
+    __slots__ = ("key", "journal_pos", "_data", "_blob", "_view", "_positions")
+
+    def __init__(self, key, data=None, blob=None, journal_pos=None):
+        self.key = key
+        self.journal_pos = journal_pos
+        self._data = data
+        self._blob = blob
+        self._view = None
+        self._positions = None
+
+    def data(self):
+        if self._data is None:
+            self._data = pickle.loads(self._blob)
+        return self._data
+
+    def copy(self):
+        if self._blob is None:
+            self._blob = pickle.dumps(self._data, protocol=_PICKLE_PROTOCOL)
+        return pickle.loads(self._blob)
+
+    def frozen(self):
+        if self._view is None:
+            # One reader builds the view, concurrent readers wait for it
+            with _view_lock:
+                if self._view is None:
+                    self._view = freeze(self.data())
+        return self._view
+
+    def position(self, key_name: str, record_id) -> Optional[int]:
+        """
+        Index of the record with this id (last one wins, like replay).
+        """
+        if self._positions is None:
+            self._positions = {
+                r.get(key_name): i
+                for i, r in enumerate(self.data())
+                if isinstance(r, dict)
+            }
+        return self._positions.get(record_id)
+
+    def apply(self, op: dict, key_name: str, key) -> None:
+        """
+        Apply one journal op in place. The frozen view, if built, is
+        updated incrementally (new tuple, old one stays valid for
+        readers still holding it) instead of being re-frozen.
+        """
+        data = self.data()
+        kind = op.get("op")
+
+        if kind == "insert":
+            record = op.get("record")
+            data.append(record)
+            if self._positions is not None and isinstance(record, dict):
+                self._positions[record.get(key_name)] = len(data) - 1
+            if self._view is not None:
+                self._view = self._view + (freeze(record),)
+
+        elif kind == "patch":
+            i = self.position(key_name, op.get("id"))
+            if i is not None:
+                data[i].update(op.get("patch") or {})
+                new_id = data[i].get(key_name)
+                if new_id != op.get("id"):
+                    self._positions.pop(op.get("id"), None)
+                    self._positions[new_id] = i
+                if self._view is not None:
+                    self._view = self._view[:i] + (freeze(data[i]),) + self._view[i + 1:]
+
+        elif kind == "delete":
+            i = self.position(key_name, op.get("id"))
+            if i is not None:
+                del data[i]
+                self._positions = None
+                if self._view is not None:
+                    self._view = self._view[:i] + self._view[i + 1:]
+
+        self._blob = None
+        self.key = key
+
+
+_CACHE: Dict[str, _Entry] = {}
+_STATS = {"hits": 0, "misses": 0, "replays": 0}
+_stats_lock = Lock()
+
+
+def _stat_key(st: os.stat_result) -> tuple:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _count(kind: str) -> None:
+    with _stats_lock:
+        _STATS[kind] += 1
+
+
+def cache_stats() -> dict:
+    """
+    Hit / miss counters of the document cache.
+    "replays" counts journal tails applied to a cached snapshot.
+    """
+    with _stats_lock:
+        stats = dict(_STATS)
+    stats["entries"] = len(_CACHE)
+    return stats
+
+
+def clear_cache() -> None:
+    """
+    Drop all cached documents (counters are kept).
+    """
+    _CACHE.clear()
+
+# ======================================================
+# FILE ACCESS
+# ======================================================
+
 def _path(name: str) -> str:
     return os.path.join(BASE_PATH, name)
 
@@ -19,6 +230,241 @@ def _default_for(filename: str):
     return {}
 
 
+def _journal_path(filename: str) -> str:
+    return _path(collection_name(filename) + ".journal")
+
+
+def _file_key(path: str) -> Optional[tuple]:
+    try:
+        return _stat_key(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+def _load(filename: str) -> Optional[_Entry]:
+    """
+    Return an up-to-date cache entry for filename, or None when the
+    file is missing, empty or corrupted. Caller holds the
+    collection lock (read or write).
+    """
+    if filename in JOURNALED:
+        return _load_journaled(filename)
+
+    path = _path(filename)
+
+    try:
+        with open(path, "rb") as f:
+            key = _stat_key(os.fstat(f.fileno()))
+
+            entry = _CACHE.get(filename)
+            if entry is not None and entry.key == key:
+                _count("hits")
+                return entry
+
+            _count("misses")
+            content = f.read()
+    except OSError:
+        _CACHE.pop(filename, None)
+        return None
+
+    try:
+        data = codec.decode(content)
+    except ValueError:
+        data = None
+
+    if data is None:
+        _CACHE.pop(filename, None)
+        return None
+
+    entry = _Entry(key, data=data)
+    _CACHE[filename] = entry
+    return entry
+
+
+def _load_journaled(filename: str) -> _Entry:
+    """
+    Snapshot + journal replay. Always returns an entry (an empty
+    collection when neither file exists). Cache key is the pair of
+    (snapshot, journal) stat keys; when only the journal grew, just
+    its tail is replayed onto the cached snapshot.
+    """
+    path = _path(filename)
+    jpath = _journal_path(filename)
+    key_name = key_field(collection_name(filename))
+
+    jkey = _file_key(jpath)
+    content = b""
+
+    try:
+        with open(path, "rb") as f:
+            skey = _stat_key(os.fstat(f.fileno()))
+
+            entry = _CACHE.get(filename)
+            if entry is not None and entry.key[0] == skey:
+                if entry.key[1] == jkey:
+                    _count("hits")
+                    return entry
+
+                # Same snapshot, same journal file, journal only grew
+                if (
+                    entry.journal_pos is not None
+                    and jkey is not None
+                    and entry.key[1] is not None
+                    and jkey[2] == entry.key[1][2]
+                    and jkey[1] >= entry.journal_pos
+                ):
+                    _, ops, pos = journal.read(jpath, entry.journal_pos)
+                    data = journal.apply(entry.copy(), ops, key_name)
+
+                    _count("replays")
+                    fresh = _Entry((skey, jkey), data=data, journal_pos=pos)
+                    _CACHE[filename] = fresh
+                    return fresh
+
+            content = f.read()
+    except FileNotFoundError:
+        skey = None
+
+    _count("misses")
+
+    try:
+        data = codec.decode(content)
+    except ValueError:
+        data = None
+
+    if not isinstance(data, list):
+        data = []
+
+    base, ops, pos = journal.read(jpath)
+    if jkey is not None and base == journal.snapshot_digest(content):
+        journal.apply(data, ops, key_name)
+        journal_pos = pos
+    else:
+        # Missing journal, or a stale one left by a crash during compaction
+        journal_pos = None
+
+    entry = _Entry((skey, jkey), data=data, journal_pos=journal_pos)
+    _CACHE[filename] = entry
+    return entry
+
+
+_SQLITE = None
+
+
+def _sqlite():
+    """
+    Lazily open the SQLite store when STORAGE_BACKEND=sqlite.
+    """
+    global _SQLITE
+    if _SQLITE is None:
+        _SQLITE = SQLiteStore(SQLITE_PATH or _path(DEFAULT_DB_NAME))
+    return _SQLITE
+
+
+def _use_sqlite() -> bool:
+    return STORAGE_BACKEND == "sqlite"
+
+
+def sqlite_backend() -> Optional[SQLiteStore]:
+    """
+    The SQLite store when STORAGE_BACKEND=sqlite, else None.
+    """
+    return _sqlite() if _use_sqlite() else None
+
+
+def document_version(filename: str):
+    """
+    Opaque token that changes whenever the stored document changes
+    (file stat keys of snapshot and journal). None if it does not exist.
+    Used by utils.collection to know when to rebuild indexes.
+    """
+    with LOCKS.read(filename):
+        entry = _load(filename)
+        return None if entry is None else entry.key
+
+
+def load_document(filename: str):
+    """
+    The document as stored by the JSON backend, journal replayed, or
+    None when it is missing, empty or corrupted. Reads the files
+    whatever STORAGE_BACKEND is (utils.sqlite_store migration).
+    """
+    with LOCKS.read(filename):
+        if os.path.exists(_journal_path(filename)):
+            entry = _load_journaled(filename)
+        else:
+            entry = _load(filename)
+        return None if entry is None else entry.copy()
+
+
+def _read_unlocked(filename: str):
+    entry = _load(filename)
+    if entry is None:
+        return _default_for(filename)
+    return entry.copy()
+
+
+def _write_unlocked(filename: str, data, fmt: Optional[str] = None) -> None:
+    path = _path(filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    payload = codec.encode(data, fmt or STORAGE_FORMAT)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+
+    os.replace(tmp, path)
+
+    blob = pickle.dumps(data, protocol=_PICKLE_PROTOCOL)
+    skey = _stat_key(os.stat(path))
+
+    if filename not in JOURNALED:
+        _CACHE[filename] = _Entry(skey, blob=blob)
+        return
+
+    # New snapshot → journal restarts, tied to the new snapshot
+    jpath = _journal_path(filename)
+    pos = journal.reset(jpath, journal.snapshot_digest(payload), JOURNAL_FSYNC)
+    _CACHE[filename] = _Entry((skey, _file_key(jpath)), blob=blob, journal_pos=pos)
+
+
+def _journal_append(filename: str, op: dict) -> _Entry:
+    """
+    Append one op to the journal and apply it to the cached entry.
+    Caller holds the collection write lock.
+    """
+    op = _plain(op)
+    entry = _load_journaled(filename)
+    jpath = _journal_path(filename)
+
+    if entry.journal_pos is None:
+        # No (valid) journal yet: start one for the current snapshot
+        try:
+            with open(_path(filename), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = b""
+        os.makedirs(os.path.dirname(jpath), exist_ok=True)
+        journal.reset(jpath, journal.snapshot_digest(content), JOURNAL_FSYNC)
+
+    size = journal.append(jpath, op, JOURNAL_FSYNC)
+
+    key_name = key_field(collection_name(filename))
+    entry.apply(op, key_name, (entry.key[0], _file_key(jpath)))
+    entry.journal_pos = size
+
+    if size > JOURNAL_COMPACT_BYTES:
+        _COMPACTOR.schedule(filename)
+
+    return entry
+
+
+def _find(entry: _Entry, key_name: str, record_id) -> Optional[dict]:
+    i = entry.position(key_name, record_id)
+    return None if i is None else entry.data()[i]
+
+
 def read_json(filename: str):
     """
     Thread-safe, crash-proof JSON reader.
@@ -26,33 +472,280 @@ def read_json(filename: str):
     - Handles empty file
     - Handles corrupted JSON
     - Returns correct default type
+
+    The result is a private copy the caller may mutate and pass back
+    to write_json(). Use read_json_view() for read-only access.
     """
-    with GLOBAL_LOCK:
-        path = _path(filename)
+    if _use_sqlite():
+        return _sqlite().load(collection_name(filename), _default_for(filename))
 
-        if not os.path.exists(path):
-            return _default_for(filename)
+    with LOCKS.read(filename):
+        return _read_unlocked(filename)
 
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if not content:
-                    return _default_for(filename)
-                return json.loads(content)
-        except (json.JSONDecodeError, OSError):
-            return _default_for(filename)
+
+def read_json_view(filename: str):
+    """
+    Read-only variant of read_json().
+    Returns a shared, frozen view of the cached document
+    (dicts are FrozenDict, lists are tuples). No copy is made.
+    """
+    if _use_sqlite():
+        return freeze(read_json(filename))
+
+    with LOCKS.read(filename):
+        entry = _load(filename)
+        if entry is None:
+            return freeze(_default_for(filename))
+        return entry.frozen()
 
 
 def write_json(filename: str, data):
     """
     Thread-safe, atomic JSON writer.
+    Refreshes the document cache with what was written.
     """
-    with GLOBAL_LOCK:
-        path = _path(filename)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if _use_sqlite():
+        _sqlite().replace(collection_name(filename), data)
+        return
+
+    with LOCKS.write(filename):
+        _write_unlocked(filename, data)
+
+
+@contextmanager
+def transaction(filename: str):
+    """
+    Read-modify-write under the collection's exclusive lock.
+
+        with transaction("tickets.json") as tickets:
+            ...mutate tickets...
+
+    The document is written back only if the block exits normally;
+    raising inside the block discards the changes. Nest transactions
+    on several files in a fixed order (e.g. tickets → users).
+    """
+    with LOCKS.write(filename):
+        data = read_json(filename)
+        yield data
+        write_json(filename, data)
+
+# ======================================================
+# RECORD API
+# ======================================================
+#
+# Single-record operations on list collections. With the SQLite
+# backend they touch one row; journaled JSON collections append one
+# journal line; other JSON files fall back to a locked
+# read-modify-write of the whole file.
+
+def get_record(filename: str, record_id) -> Optional[dict]:
+    """
+    Return a copy of the record with the given id, or None.
+    """
+    if _use_sqlite():
+        return _sqlite().get(collection_name(filename), record_id)
+
+    key = key_field(collection_name(filename))
+    with LOCKS.read(filename):
+        entry = _load(filename)
+        if entry is None:
+            return None
+        record = _find(entry, key, record_id)
+        return None if record is None else _private(record)
+
+
+def insert_record(filename: str, record: dict) -> dict:
+    """
+    Append one record to a list collection.
+    """
+    if _use_sqlite():
+        return _sqlite().insert(collection_name(filename), record)
+
+    with LOCKS.write(filename):
+        if filename in JOURNALED:
+            _journal_append(filename, {"op": "insert", "record": record})
+            return record
+
+        records = _read_unlocked(filename)
+        records.append(_plain(record))
+        _write_unlocked(filename, records)
+    return record
+
+
+def update_record(filename: str, record_id, patch: dict) -> Optional[dict]:
+    """
+    Shallow-merge patch into one record.
+    Returns the updated record, or None if it does not exist.
+    """
+    if _use_sqlite():
+        return _sqlite().update(collection_name(filename), record_id, patch)
+
+    key = key_field(collection_name(filename))
+    with LOCKS.write(filename):
+        if filename in JOURNALED:
+            entry = _load_journaled(filename)
+            if _find(entry, key, record_id) is None:
+                return None
+
+            entry = _journal_append(
+                filename, {"op": "patch", "id": record_id, "patch": patch}
+            )
+            return _private(_find(entry, key, patch.get(key, record_id)))
+
+        records = _read_unlocked(filename)
+        record = next((r for r in records if r.get(key) == record_id), None)
+        if record is None:
+            return None
+
+        record.update(_plain(patch))
+        _write_unlocked(filename, records)
+    return record
+
+
+def delete_record(filename: str, record_id) -> bool:
+    """
+    Remove one record. Returns False if it does not exist.
+    """
+    if _use_sqlite():
+        return _sqlite().delete(collection_name(filename), record_id)
+
+    key = key_field(collection_name(filename))
+    with LOCKS.write(filename):
+        if filename in JOURNALED:
+            entry = _load_journaled(filename)
+            if _find(entry, key, record_id) is None:
+                return False
+
+            _journal_append(filename, {"op": "delete", "id": record_id})
+            return True
+
+        records = _read_unlocked(filename)
+        remaining = [r for r in records if r.get(key) != record_id]
+        if len(remaining) == len(records):
+            return False
+
+        _write_unlocked(filename, remaining)
+    return True
+
+
+def query_records(filename: str, **filters) -> list:
+    """
+    Records whose top-level fields equal all given filters.
+    query_records("tickets.json", assigned_admin="a1")
+    """
+    if _use_sqlite():
+        return _sqlite().query(collection_name(filename), filters)
+
+    with LOCKS.read(filename):
+        entry = _load(filename)
+        if entry is None:
+            return []
+        return _private([
+            r for r in entry.data()
+            if all(r.get(k) == v for k, v in filters.items())
+        ])
+
+# ======================================================
+# JOURNAL COMPACTION
+# ======================================================
+
+def compact(filename: str) -> None:
+    """
+    Fold the journal into a new snapshot and restart the journal.
+    """
+    if filename not in JOURNALED or _use_sqlite():
+        return
+
+    with LOCKS.write(filename):
+        entry = _load_journaled(filename)
+        _write_unlocked(filename, entry.data())
+
+
+class _Compactor:
+    """
+    Background thread compacting journals that grew past
+    JOURNAL_COMPACT_BYTES. Started on first use.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()
+        self._lock = Lock()
+        self._thread = None
+
+    def schedule(self, filename: str) -> None:
+        with self._lock:
+            if filename in self._pending:
+                return
+            self._pending.add(filename)
+
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name="json-store-compactor", daemon=True
+                )
+                self._thread.start()
+
+        self._queue.put(filename)
+
+    def _run(self) -> None:
+        while True:
+            filename = self._queue.get()
+            with self._lock:
+                self._pending.discard(filename)
+
+            try:
+                compact(filename)
+            except OSError:
+                # Retried on the next append past the threshold
+                pass
+
+
+_COMPACTOR = _Compactor()
+
+# ======================================================
+# FORMAT CONVERSION CLI
+# ======================================================
+
+def convert(filename: str, fmt: str) -> str:
+    """
+    Rewrite one stored document in the given format.
+    Journaled collections are compacted on the way.
+    Returns the format it was stored in before.
+    """
+    with LOCKS.write(filename):
+        try:
+            with open(_path(filename), "rb") as f:
+                before = codec.detect(f.read())
+        except FileNotFoundError:
+            before = "missing"
+
+        data = _read_unlocked(filename)
+        _write_unlocked(filename, data, fmt)
+
+    return before
+
+
+if __name__ == "__main__":
+    # python -m utils.json_store convert <pretty|compact|binary> [storage_dir] [files...]
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] != "convert" or sys.argv[2] not in codec.FORMATS:
+        print(
+            "usage: python -m utils.json_store convert "
+            "<pretty|compact|binary> [storage_dir] [files...]",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    target = sys.argv[2]
+    if len(sys.argv) > 3:
+        BASE_PATH = sys.argv[3]
 
-        tmp = path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+    names = sys.argv[4:] or sorted(
+        n for n in os.listdir(BASE_PATH) if n.endswith(".json")
+    )
 
-        os.replace(tmp, path)
+    for name in names:
+        before = convert(name, target)
+        size = os.path.getsize(_path(name))
+        print(f"{name}: {before} -> {target} ({size} bytes)")
@@ -0,0 +1,110 @@
+# backend/utils/passwords.py
+#
+# Salted password hashing (stdlib hashlib.scrypt).
+#
+# Stored format:  scrypt$<log2 n>$<r>$<p>$<salt b64>$<hash b64>
+#
+# The work factor is tunable through PASSWORD_SCRYPT_LOG2_N (default 14,
+# i.e. n=16384, ~16 MiB and tens of ms per hash). Existing hashes keep
+# their own parameters; needs_rehash() reports hashes (or legacy
+# plaintext passwords) that should be upgraded on the next login.
+#
+# hashlib.scrypt releases the GIL, so verification scales on a thread
+# pool without blocking the event loop.
+
+import base64
+import hashlib
+import hmac
+import os
+
+SCHEME = "scrypt"
+
+SCRYPT_LOG2_N = int(os.getenv("PASSWORD_SCRYPT_LOG2_N", "14"))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, log2_n: int, r: int, p: int) -> bytes:
+    n = 1 << log2_n
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r + (1 << 20),
+        dklen=HASH_BYTES,
+    )
+
+
+def _parse(stored: str):
+    """
+    (log2_n, r, p, salt, digest) for a scrypt hash, None otherwise.
+    """
+    parts = stored.split("$") if isinstance(stored, str) else ()
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        return (
+            int(parts[1]), int(parts[2]), int(parts[3]),
+            base64.b64decode(parts[4]), base64.b64decode(parts[5]),
+        )
+    except ValueError:
+        return None
+
+
+def is_hashed(stored) -> bool:
+    return _parse(stored) is not None
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_LOG2_N, SCRYPT_R, SCRYPT_P)
+    return "$".join((
+        SCHEME, str(SCRYPT_LOG2_N), str(SCRYPT_R), str(SCRYPT_P),
+        _b64(salt), _b64(digest),
+    ))
+
+
+def verify_password(password: str, stored) -> bool:
+    """
+    Constant-time check against a scrypt hash.
+    Legacy plaintext values are still accepted so they can be
+    upgraded on login (see needs_rehash).
+    """
+    if not isinstance(stored, str):
+        return False
+
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+    log2_n, r, p, salt, digest = parsed
+    return hmac.compare_digest(_scrypt(password, salt, log2_n, r, p), digest)
+
+
+def needs_rehash(stored) -> bool:
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    return parsed[:3] != (SCRYPT_LOG2_N, SCRYPT_R, SCRYPT_P)
+
+
+# Verified against when the username does not exist, so unknown users
+# cost the same as a wrong password (no user enumeration by timing).
+_DUMMY_HASH = None
+
+
+def dummy_verify(password: str) -> bool:
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password("not-a-real-password")
+    verify_password(password, _DUMMY_HASH)
+    return False
@@ -0,0 +1,319 @@
+# backend/utils/sqlite_store.py
+#
+# SQLite storage engine (stdlib sqlite3, WAL mode).
+# Stores each collection as one row per record so appends and
+# single-record updates no longer rewrite the whole collection.
+# utils.json_store uses it when STORAGE_BACKEND=sqlite.
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional
+
+DEFAULT_DB_NAME = "intellidesk.db"
+
+# Primary key field per collection (default "id")
+KEY_FIELDS: Dict[str, str] = {
+    "equipment": "equipment_id",
+}
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    rid        TEXT,
+    body       TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS records_collection_rid
+    ON records (collection, rid);
+CREATE INDEX IF NOT EXISTS records_collection_seq
+    ON records (collection, seq);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+"""
+
+
+def collection_name(filename: str) -> str:
+    """
+    "tickets.json" -> "tickets"
+    """
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def key_field(collection: str) -> str:
+    return KEY_FIELDS.get(collection, "id")
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _rid(collection: str, record: dict) -> Optional[str]:
+    value = record.get(key_field(collection))
+    return None if value is None else str(value)
+
+
+class SQLiteStore:
+    """
+    Record-level store.
+    - One connection per thread
+    - WAL journal: readers never block the writer
+    - Writes run in BEGIN IMMEDIATE transactions
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._indexed = set()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    # ---------------- CONNECTION ----------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        return _WriteTxn(self._conn())
+
+    # ---------------- RECORD API ----------------
+
+    def get(self, collection: str, record_id) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT body FROM records WHERE collection = ? AND rid = ?",
+            (collection, str(record_id)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, collection: str, record: dict) -> dict:
+        with self._write() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO records (collection, rid, body) VALUES (?, ?, ?)",
+                    (collection, _rid(collection, record), _dumps(record)),
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(
+                    f"Duplicate {key_field(collection)} in {collection}: "
+                    f"{_rid(collection, record)}"
+                )
+        return record
+
+    def update(self, collection: str, record_id, patch: dict) -> Optional[dict]:
+        """
+        Shallow-merge patch into the record. Returns the updated
+        record, or None when it does not exist.
+        """
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT seq, body FROM records WHERE collection = ? AND rid = ?",
+                (collection, str(record_id)),
+            ).fetchone()
+            if not row:
+                return None
+
+            record = json.loads(row[1])
+            record.update(patch)
+
+            conn.execute(
+                "UPDATE records SET rid = ?, body = ? WHERE seq = ?",
+                (_rid(collection, record), _dumps(record), row[0]),
+            )
+        return record
+
+    def delete(self, collection: str, record_id) -> bool:
+        with self._write() as conn:
+            cur = conn.execute(
+                "DELETE FROM records WHERE collection = ? AND rid = ?",
+                (collection, str(record_id)),
+            )
+        return cur.rowcount > 0
+
+    def query(self, collection: str, filters: Optional[dict] = None) -> List[dict]:
+        """
+        Equality filter on top-level fields, in insertion order.
+        query("tickets", {"assigned_admin": "a1", "status": "escalated"})
+        """
+        sql = "SELECT body FROM records WHERE collection = ?"
+        params: list = [collection]
+
+        for field, value in (filters or {}).items():
+            if not _FIELD_RE.match(field):
+                raise ValueError(f"Invalid field name: {field}")
+
+            if value is None:
+                sql += f" AND json_extract(body, '$.{field}') IS NULL"
+            else:
+                sql += f" AND json_extract(body, '$.{field}') = ?"
+                params.append(value)
+
+        sql += " ORDER BY seq"
+        return [json.loads(r[0]) for r in self._conn().execute(sql, params)]
+
+    def ensure_index(self, collection: str, field: str) -> None:
+        """
+        Expression index on one top-level field of a collection.
+        """
+        if (collection, field) in self._indexed:
+            return
+
+        if not _FIELD_RE.match(field) or not _FIELD_RE.match(collection):
+            raise ValueError(f"Invalid index: {collection}.{field}")
+
+        self._conn().execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{collection}_{field} "
+            f"ON records (collection, json_extract(body, '$.{field}'))"
+        )
+        self._indexed.add((collection, field))
+
+    # ---------------- COLLECTION API (compat shim) ----------------
+
+    def exists(self, collection: str) -> bool:
+        conn = self._conn()
+        if conn.execute(
+            "SELECT 1 FROM documents WHERE name = ?", (collection,)
+        ).fetchone():
+            return True
+        return conn.execute(
+            "SELECT 1 FROM records WHERE collection = ? LIMIT 1", (collection,)
+        ).fetchone() is not None
+
+    def load(self, collection: str, default=None):
+        """
+        Whole collection as a list, or the stored document for
+        non-list files. Returns default when nothing is stored.
+        """
+        row = self._conn().execute(
+            "SELECT body FROM documents WHERE name = ?", (collection,)
+        ).fetchone()
+        if row:
+            return json.loads(row[0])
+
+        records = self.query(collection)
+        if not records and default is not None:
+            return default
+        return records
+
+    def replace(self, collection: str, data) -> None:
+        """
+        Replace a whole collection (what write_json() means).
+        Raises ValueError, leaving the collection as it was, if two
+        records share a key.
+        """
+        rows = None
+        if isinstance(data, list):
+            rows, seen = [], set()
+            for r in data:
+                rid = _rid(collection, r) if isinstance(r, dict) else None
+                if rid is not None:
+                    if rid in seen:
+                        raise ValueError(
+                            f"Duplicate {key_field(collection)} in {collection}: {rid}"
+                        )
+                    seen.add(rid)
+                rows.append((collection, rid, _dumps(r)))
+
+        with self._write() as conn:
+            conn.execute("DELETE FROM records WHERE collection = ?", (collection,))
+            conn.execute("DELETE FROM documents WHERE name = ?", (collection,))
+
+            if rows is not None:
+                conn.executemany(
+                    "INSERT INTO records (collection, rid, body) VALUES (?, ?, ?)",
+                    rows,
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO documents (name, body) VALUES (?, ?)",
+                    (collection, _dumps(data)),
+                )
+
+
+class _WriteTxn:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+# ======================================================
+# ONE-SHOT MIGRATION
+# ======================================================
+
+def migrate_json_files(base_path: str, store: SQLiteStore) -> Dict[str, int]:
+    """
+    Import every storage/*.json collection into the store, journals
+    replayed (see utils.json_store). Existing collections are
+    replaced. Returns record counts; raises ValueError naming the
+    file if a collection has duplicate keys.
+    """
+    # json_store imports this module
+    from utils import json_store
+
+    names = set()
+    for name in os.listdir(base_path):
+        if name.endswith(".json"):
+            names.add(name)
+        elif name.endswith(".journal"):
+            # Journaled collection whose snapshot was never written
+            names.add(collection_name(name) + ".json")
+
+    imported = {}
+    previous = json_store.BASE_PATH
+    json_store.BASE_PATH = base_path
+    json_store.clear_cache()
+
+    try:
+        for name in sorted(names):
+            # Any snapshot format (utils.codec) plus its journal
+            data = json_store.load_document(name)
+            if data is None:
+                print(f"skipping {name}: empty or unreadable", file=sys.stderr)
+                continue
+
+            collection = collection_name(name)
+            try:
+                store.replace(collection, data)
+            except ValueError as e:
+                raise ValueError(f"{name}: {e}") from None
+            imported[collection] = len(data) if isinstance(data, list) else 1
+    finally:
+        json_store.BASE_PATH = previous
+        json_store.clear_cache()
+
+    return imported
+
+if __name__ == "__main__":
+    # python -m utils.sqlite_store [storage_dir] [db_path]
+    base = sys.argv[1] if len(sys.argv) > 1 else "storage"
+    db = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base, DEFAULT_DB_NAME)
+
+    counts = migrate_json_files(base, SQLiteStore(db))
+    for collection, count in counts.items():
+        print(f"{collection}: {count}")
@@ -32,7 +32,7 @@ export default function Chatbot() {
     setError(null);
 
     try {
-      const response = await fetch("/api/chat", {
+      const response = await fetch("/api/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -41,22 +41,55 @@ export default function Chatbot() {
         body: JSON.stringify({ message: text }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error("Failed to reach IntelliDesk service");
       }
 
-      const data = await response.json();
-
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: "assistant",
-          text:
-            typeof data.response === "string"
-              ? data.response
-              : "Sorry, I couldn't understand that.",
-        },
-      ]);
+      // Assistant bubble filled in as tokens arrive
+      setMessages((prev) => [...prev, { role: "assistant", text: "" }]);
+      const setReply = (update) =>
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, text: update(last.text) }];
+        });
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-Sent Events are separated by a blank line
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+          const raw = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+
+          if (event === "token") {
+            setLoading(false);
+            setReply((prev) => prev + data.text);
+          } else if (event === "done") {
+            // Final reply may differ from the streamed text (e.g. confirmation)
+            setReply(() =>
+              typeof data.response === "string"
+                ? data.response
+                : "Sorry, I couldn't understand that."
+            );
+          } else if (event === "error") {
+            setMessages((prev) => prev.slice(0, -1));
+            const retry = data.retry_after
+              ? ` Please try again in ${data.retry_after}s.`
+              : "";
+            throw new Error((data.detail || "Something went wrong") + retry);
+          }
+        }
+      }
     } catch (err) {
       setError(err.message || "Something went wrong");
     } finally {
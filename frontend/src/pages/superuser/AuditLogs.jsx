@@ -7,14 +7,17 @@ import EmptyState from "../../components/EmptyState";
 
 export default function AuditLogs() {
   const [logs, setLogs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     async function load() {
       try {
         const data = await getAuditLogs();
-        setLogs(data);
+        setLogs(data.logs);
+        setNextCursor(data.nextCursor);
       } catch {
         setError("Failed to load audit logs");
       } finally {
@@ -24,6 +27,19 @@ export default function AuditLogs() {
     load();
   }, []);
 
+  async function loadMore() {
+    setLoadingMore(true);
+    try {
+      const data = await getAuditLogs({ cursor: nextCursor });
+      setLogs(prev => [...prev, ...data.logs]);
+      setNextCursor(data.nextCursor);
+    } catch {
+      setError("Failed to load audit logs");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   if (loading) return <Spinner />;
   if (error) return <ErrorBanner message={error} />;
   if (logs.length === 0)
@@ -42,6 +58,12 @@ export default function AuditLogs() {
         ]}
         rows={logs}
       />
+
+      {nextCursor && (
+        <button className="mt-4" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </section>
   );
 }
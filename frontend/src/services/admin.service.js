@@ -10,10 +10,28 @@ export const getAdminOverview = async () => {
 
 /**
  * GET /api/admin/audit-log
+ * params: actor_id, action, entity_id, entity_type, since, until, cursor, limit
+ * Response: { events: [...], next_cursor }
+ * Returns { logs: [{ timestamp, actor, action, target }], nextCursor };
+ * pass nextCursor back as params.cursor for the next page (null: none).
  */
-export const getAuditLogs = async () => {
-  const res = await api.get("/api/admin/audit-log");
-  return res.data;
+export const getAuditLogs = async (params = {}) => {
+  const res = await api.get("/api/admin/audit-log", { params });
+  return {
+    logs: res.data.events.map(toAuditRow),
+    nextCursor: res.data.next_cursor,
+  };
+};
+
+const toAuditRow = (event) => {
+  const actor = event.actor || {};
+  const entity = event.entity || {};
+  return {
+    timestamp: event.ts,
+    actor: actor.role ? `${actor.id} (${actor.role})` : actor.id,
+    action: event.action,
+    target: entity.id ? `${entity.type} ${entity.id}` : entity.type,
+  };
 };
 
 /**